@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from app.services import services
+from app.utils.metrics import upstream_health
+
+router = APIRouter()
+
+# 服務以延遲參照持有，第一次健康檢查時才載入
+job_queue = services.proxy("job_queue")
+telegram_bot = services.proxy("telegram_bot")
+tronscan_api = services.proxy("tronscan_api")
+update_poller = services.proxy("update_poller")
+
+# 連續失敗達此次數視為上游異常
+UPSTREAM_FAILURE_THRESHOLD = 3
+
+
+@router.get("")
+async def health_check():
+    """健康檢查端點：回報上游連線狀態與各佇列深度"""
+    upstreams = upstream_health.snapshot()
+    degraded = any(
+        state["consecutive_failures"] >= UPSTREAM_FAILURE_THRESHOLD for state in upstreams.values()
+    )
+    return {
+        "status": "degraded" if degraded else "ok",
+        "upstreams": upstreams,
+        "queues": {
+            "jobs": job_queue.depth,
+            "outbound": telegram_bot.outbound.pending,
+            "tronscan_rate_limit": tronscan_api.limiter.waiting
+        },
+        "polling": update_poller.stats(),
+        "services": services.stats()
+    }
@@ -0,0 +1,119 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services import services
+from app.utils.metrics import metrics
+
+router = APIRouter()
+
+# 服務以延遲參照持有，抓取指標時才載入
+ai_service = services.proxy("ai_service")
+update_deduplicator = services.proxy("update_deduplicator")
+image_analysis_cache = services.proxy("image_analysis_cache")
+job_queue = services.proxy("job_queue")
+telegram_bot = services.proxy("telegram_bot")
+tronscan_api = services.proxy("tronscan_api")
+wallet_watchlist = services.proxy("wallet_watchlist")
+
+
+def _job_queue_depth():
+    return [((job_type,), stats["pending"]) for job_type, stats in job_queue.stats()["types"].items()]
+
+
+def _job_queue_running():
+    return [((job_type,), stats["running"]) for job_type, stats in job_queue.stats()["types"].items()]
+
+
+def _job_queue_rejected():
+    return [((job_type,), stats["rejected"]) for job_type, stats in job_queue.stats()["types"].items()]
+
+
+def _cache_events():
+    samples = []
+    for cache_name, stats in (
+        ("tronscan", tronscan_api.cache.stats()),
+        ("ai_response", ai_service.response_cache.stats()),
+        ("image_analysis", image_analysis_cache.stats())
+    ):
+        for event in ("hits", "misses", "evictions"):
+            samples.append(((cache_name, event), stats.get(event, 0)))
+    return samples
+
+
+def _ai_requests():
+    return [((path,), stats["count"]) for path, stats in ai_service.stats()["paths"].items()]
+
+
+def _ai_tokens():
+    return [((kind,), count) for kind, count in ai_service.stats()["tokens"].items()]
+
+
+def _block_scanner_events():
+    stats = tronscan_api.scanner.stats()
+    return [((event,), stats[event]) for event in (
+        "pages", "events", "matched", "errors", "backfills", "rechecks", "rescans", "reverifies"
+    )]
+
+
+def _outbound_events():
+    stats = telegram_bot.outbound.stats()
+    return [((event,), stats[event]) for event in ("sent", "failed", "retries", "dropped")]
+
+
+metrics.gauge(
+    "wallet_tracker_job_queue_depth", "Jobs waiting in the job queue",
+    ("job_type",), _job_queue_depth
+)
+metrics.gauge(
+    "wallet_tracker_job_queue_running", "Jobs currently running",
+    ("job_type",), _job_queue_running
+)
+metrics.gauge(
+    "wallet_tracker_job_queue_rejected_total", "Jobs rejected because the queue was full",
+    ("job_type",), _job_queue_rejected, metric_type="counter"
+)
+metrics.gauge(
+    "wallet_tracker_telegram_outbound_pending", "Outbound Telegram messages waiting to be sent",
+    (), lambda: [((), telegram_bot.outbound.pending)]
+)
+metrics.gauge(
+    "wallet_tracker_telegram_outbound_total", "Outbound Telegram message outcomes",
+    ("event",), _outbound_events, metric_type="counter"
+)
+metrics.gauge(
+    "wallet_tracker_tronscan_rate_limit_waiting", "TronScan requests waiting for a rate limit token",
+    (), lambda: [((), tronscan_api.limiter.waiting)]
+)
+metrics.gauge(
+    "wallet_tracker_cache_events_total", "Cache hits, misses and evictions",
+    ("cache", "event"), _cache_events, metric_type="counter"
+)
+metrics.gauge(
+    "wallet_tracker_duplicate_updates_total", "Redelivered Telegram updates that were dropped",
+    (), lambda: [((), update_deduplicator.duplicates)], metric_type="counter"
+)
+metrics.gauge(
+    "wallet_tracker_watched_wallets", "Wallets on the watchlist",
+    (), lambda: [((), wallet_watchlist.stats()["wallets"])]
+)
+metrics.gauge(
+    "wallet_tracker_block_scanner_lag_seconds", "How far the block scanner checkpoint trails the chain head",
+    (), lambda: [((), tronscan_api.scanner.lag)] if tronscan_api.scanner.enabled else []
+)
+metrics.gauge(
+    "wallet_tracker_block_scanner_total", "Block scanner pages, events, matches, backfills and confirmation rechecks",
+    ("event",), _block_scanner_events, metric_type="counter"
+)
+metrics.gauge(
+    "wallet_tracker_ai_requests_total", "AI replies by serving path",
+    ("path",), _ai_requests, metric_type="counter"
+)
+metrics.gauge(
+    "wallet_tracker_ai_tokens_total", "OpenAI tokens spent",
+    ("kind",), _ai_tokens, metric_type="counter"
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """以 Prometheus 文字格式輸出指標"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
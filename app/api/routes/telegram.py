@@ -1,16 +1,72 @@
-from fastapi import APIRouter, Request, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, Request, HTTPException, Depends, Response
 from app.core.config import get_settings
-from app.services.telegram import telegram_bot
-from app.services.tronscan import tronscan_api
-from app.services.ai import ai_service
-from app.models.telegram import TelegramMessage
+from app.services import services
+from app.services.queue import JOB_WALLET_QUERY, JOB_IMAGE, JOB_AI_REPLY, JOB_REPLY
+from app.models.telegram import MessageRecord, TelegramMessage, parse_update
+from app.utils.helpers import chunk_text
+from app.utils.image import encode_image, select_photo_size
+from app.utils.metrics import metrics
+import asyncio
+import html
 import logging
-import base64
+import hashlib
+import time
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 settings = get_settings()
 
+# 服務以延遲參照持有，第一次使用時才匯入，未用到的服務（例如 webhook 模式下的輪詢）不會載入
+telegram_bot = services.proxy("telegram_bot")
+tronscan_api = services.proxy("tronscan_api")
+ai_service = services.proxy("ai_service")
+image_analysis_cache = services.proxy("image_analysis_cache")
+update_deduplicator = services.proxy("update_deduplicator")
+wallet_watchlist = services.proxy("wallet_watchlist")
+update_poller = services.proxy("update_poller")
+shared_state = services.proxy("shared_state")
+job_queue = services.proxy("job_queue")
+
+# webhook 處理時間直方圖（秒）
+webhook_latency = metrics.histogram(
+    "wallet_tracker_webhook_duration_seconds",
+    "Time spent handling a Telegram webhook request"
+)
+
+# webhook 固定回應內容，預先序列化
+OK_RESPONSE_BODY = b'{"ok":true}'
+
+# 佇列已滿時的回覆任務，保留引用避免被回收
+_overflow_replies = set()
+
+# 關鍵字對應的貼圖
+STICKERS = {
+    "查收": "CAACAgUAAxkBAAM3Z6BCS_8OxFi3hPqLGSbXA_DGe88AAhQOAAJIVcFWGeRHkOJd6382BA",
+    "錯誤": "CAACAgUAAxkBAAICnGe1kMxEm_Yb8sqoLdBrh4wzqacBAAKEDwACp3ugVg-wZAirnX4uNgQ",
+    "成功": "CAACAgUAAxkBAAIBx2e1T865MArKuXWmO6v2fI7N3c-DAALSDwACRKowVx4O9BSYF3_zNgQ"
+}
+
+FORMAT_ERROR_MESSAGE = (
+    "⚠️ 格式錯誤！請按照以下格式輸入：\n\n"
+    "查收\n"
+    "錢包地址\n"
+    "金額"
+)
+
+BATCH_FORMAT_ERROR_MESSAGE = (
+    "⚠️ 格式錯誤！批次查詢請每行輸入一組：\n\n"
+    "查收\n"
+    "錢包地址 金額\n"
+    "錢包地址 金額"
+)
+
+WATCH_FORMAT_ERROR_MESSAGE = (
+    "⚠️ 格式錯誤！請按照以下格式輸入：\n\n"
+    "監控\n"
+    "錢包地址\n"
+    "金額"
+)
+
 async def handle_wallet_query(message: TelegramMessage, query: dict):
     """處理錢包查詢邏輯"""
     try:
@@ -23,12 +79,12 @@ async def handle_wallet_query(message: TelegramMessage, query: dict):
         # 查詢交易
         result = await tronscan_api.verify_transaction(
             query["wallet_address"],
-            query.get("amount", 0)
+            query["amount"]
         )
 
         # 處理錯誤情況
         if "error" in result:
-            error_msg = f"❌ 查詢出錯: {result['error']['message']}"
+            error_msg = f"❌ 查詢出錯: {html.escape(result['error']['message'])}"
             await telegram_bot.send_message(message.chat.id, error_msg)
             return
 
@@ -50,7 +106,7 @@ async def handle_wallet_query(message: TelegramMessage, query: dict):
                 f"請確認：\n"
                 f"1. 錢包地址是否正確\n"
                 f"2. 交易是否在過去 96 小時內\n"
-                f"3. 交易金額是否正確（允許 ±2 USDT 誤差）"
+                f"3. 交易金額是否正確（允許 ±{settings.VERIFY_AMOUNT_TOLERANCE} USDT 誤差）"
             )
 
         await telegram_bot.send_message(message.chat.id, response)
@@ -62,22 +118,93 @@ async def handle_wallet_query(message: TelegramMessage, query: dict):
             "🚨 處理查詢時發生錯誤，請稍後重試。"
         )
 
-async def handle_image_message(message: TelegramMessage, file_id: str):
+def format_batch_line(position: int, query: dict, result: dict) -> str:
+    """格式化批次查詢中的單筆結果，使用者輸入的欄位需跳脫後才能放進 HTML 回覆"""
+    header = f"{position}. {html.escape(query['wallet_address'])} / {query['amount']} USDT"
+    if "error" in result:
+        return f"{header}\n   ❌ 查詢出錯: {html.escape(result['error']['message'])}"
+    if not result["verified"]:
+        return f"{header}\n   ❌ {result.get('reason', '未找到符合的交易')}"
+    tx = result["transaction"]
+    status = '已確認' if tx['confirmed'] else '待確認'
+    return (
+        f"{header}\n"
+        f"   ✅ {result['formatted_amount']:.2f} USDT（{status}）\n"
+        f"   🔗 https://tronscan.org/#/transaction/{tx['transaction_id']}"
+    )
+
+async def handle_wallet_batch(message: TelegramMessage, queries: list):
+    """處理批次錢包查詢，彙整成一則（必要時分段）回覆"""
+    try:
+        await telegram_bot.send_message(
+            message.chat.id,
+            f"🔍 正在批次查詢 {len(queries)} 筆交易，請稍候..."
+        )
+
+        results = await tronscan_api.verify_transactions(
+            [(query["wallet_address"], query["amount"]) for query in queries]
+        )
+
+        verified = sum(1 for result in results if result.get("verified"))
+        lines = [f"📋 批次查詢結果：{verified}/{len(queries)} 筆符合\n"]
+        lines += [
+            format_batch_line(position, query, result)
+            for position, (query, result) in enumerate(zip(queries, results), 1)
+        ]
+
+        for chunk in chunk_text("\n".join(lines)):
+            await telegram_bot.send_message(message.chat.id, chunk)
+
+    except Exception as e:
+        logger.error(f"Error handling wallet batch: {str(e)}")
+        await telegram_bot.send_message(
+            message.chat.id,
+            "🚨 處理查詢時發生錯誤，請稍後重試。"
+        )
+
+async def handle_image_message(message: TelegramMessage, photos: list):
     """處理圖片消息"""
     try:
+        # 選擇足以讓模型辨識的最小尺寸，避免下載原圖
+        photo = select_photo_size(
+            photos, settings.IMAGE_TARGET_SIZE, settings.TELEGRAM_MAX_DOWNLOAD_BYTES
+        )
+        if photo is None:
+            raise ValueError("No photo size within download limit")
+        file_unique_id = photo.get("file_unique_id")
+
+        # 相同圖片（如重複轉發的截圖）直接使用快取結果，不需下載；未命中時之後以內容雜湊再查，只計一次
+        analysis = await image_analysis_cache.get(file_unique_id, count_miss=False)
+        if analysis is not None:
+            await telegram_bot.send_message(message.chat.id, analysis)
+            return
+
         # 獲取圖片數據
-        image_info = await telegram_bot.get_file(file_id)
+        image_info = await telegram_bot.get_file(photo["file_id"])
         if not image_info.get("ok"):
             raise ValueError("Failed to get image file info")
 
         # 下載圖片
         image_data = await telegram_bot.download_file(image_info["result"]["file_path"])
+
+        # file_unique_id 未命中時以內容雜湊再查一次
+        content_hash = await asyncio.to_thread(lambda: hashlib.sha256(image_data).hexdigest())
+        analysis = await image_analysis_cache.get(content_hash)
+        if analysis is not None:
+            await image_analysis_cache.set(analysis, file_unique_id)
+            await telegram_bot.send_message(message.chat.id, analysis)
+            return
         
-        # 將圖片數據轉換為base64
-        image_base64 = base64.b64encode(image_data).decode()
+        # 在執行緒中縮圖並轉換為 base64，避免阻塞事件迴圈
+        image_base64 = await asyncio.to_thread(
+            encode_image, image_data, settings.IMAGE_TARGET_SIZE, settings.IMAGE_JPEG_QUALITY
+        )
+        del image_data
 
         # 使用AI分析圖片
         analysis = await ai_service.analyze_image(image_base64)
+        if analysis != ai_service.IMAGE_ANALYSIS_FALLBACK:
+            await image_analysis_cache.set(analysis, file_unique_id, content_hash)
         
         # 發送分析結果
         await telegram_bot.send_message(message.chat.id, analysis)
@@ -89,70 +216,201 @@ async def handle_image_message(message: TelegramMessage, file_id: str):
             "🚨 處理圖片時發生錯誤，請稍後重試。"
         )
 
-@router.post("/telegram")
-async def telegram_webhook(request: Request, background_tasks: BackgroundTasks):
-    """處理 Telegram webhook 請求"""
+async def stream_ai_reply(chat_id: int, user_message: str) -> bool:
+    """串流 AI 回覆：收到第一段文字即發送訊息，之後合併多段內容再編輯同一則訊息
+
+    尚未送出任何內容就失敗時回傳 False，由呼叫端改用一般回覆。
+    """
+    text = ""
+    shown = ""
+    message_id = None
+    last_edit = 0.0
+    stream = ai_service.stream_response(user_message)
     try:
-        data = await request.json()
-        
-        # 驗證 webhook 請求
-        if "message" not in data:
-            return {"ok": True}
-
-        message = TelegramMessage.from_webhook(data["message"])
-
-        # 處理圖片消息
-        if "photo" in data["message"]:
-            # 獲取最高質量的圖片
-            file_id = data["message"]["photo"][-1]["file_id"]
-            background_tasks.add_task(handle_image_message, message, file_id)
-            return {"ok": True}
-
-        # 處理文本消息
-        if not message.text:
-            return {"ok": True}
-
-        # 檢查是否是查帳請求
-        if "查收" in message.text:
-            query = telegram_bot.parse_wallet_query(message.text)
-            if not query:
-                await telegram_bot.send_message(
-                    message.chat.id,
-                    "⚠️ 格式錯誤！請按照以下格式輸入：\n\n"
-                    "查收\n"
-                    "錢包地址\n"
-                    "金額"
-                )
-                return {"ok": True}
-
-            # 在背景處理錢包查詢
-            background_tasks.add_task(handle_wallet_query, message, query)
-            return {"ok": True}
-
-        # 使用 AI 處理其他消息
-        ai_response = await ai_service.get_response(message.text)
-        await telegram_bot.send_message(message.chat.id, ai_response)
+        async for delta in stream:
+            text += delta
+            now = time.monotonic()
+            if message_id is None:
+                result = await telegram_bot.send_message(chat_id, text, parse_mode=None)
+                if not result.get("ok"):
+                    return False
+                message_id = result["result"]["message_id"]
+                shown, last_edit = text, now
+            elif now - last_edit >= settings.AI_STREAM_EDIT_INTERVAL:
+                await telegram_bot.edit_message(chat_id, message_id, text)
+                shown, last_edit = text, now
+    except Exception as e:
+        logger.error(f"Error streaming AI response: {str(e)}")
+    finally:
+        await stream.aclose()
 
-        # 如果消息中包含特定關鍵字，發送對應的貼圖
-        stickers = {
-            "查收": "CAACAgUAAxkBAAM3Z6BCS_8OxFi3hPqLGSbXA_DGe88AAhQOAAJIVcFWGeRHkOJd6382BA",
-            "錯誤": "CAACAgUAAxkBAAICnGe1kMxEm_Yb8sqoLdBrh4wzqacBAAKEDwACp3ugVg-wZAirnX4uNgQ",
-            "成功": "CAACAgUAAxkBAAIBx2e1T865MArKuXWmO6v2fI7N3c-DAALSDwACRKowVx4O9BSYF3_zNgQ"
-        }
+    if message_id is None:
+        return False
+    if text != shown:
+        await telegram_bot.edit_message(chat_id, message_id, text)
+    return True
+
+async def handle_ai_message(message: TelegramMessage):
+    """使用 AI 回覆一般消息，並依關鍵字發送貼圖"""
+    try:
+        if not settings.AI_STREAM_REPLIES:
+            # get_response 自行查詢固定回覆與快取
+            ai_response = await ai_service.get_response(message.text)
+            await telegram_bot.send_message(message.chat.id, ai_response)
+        else:
+            ai_response = ai_service.cached_response(message.text)
+            if ai_response is not None:
+                await telegram_bot.send_message(message.chat.id, ai_response)
+            elif not await stream_ai_reply(message.chat.id, message.text):
+                ai_response = await ai_service.get_response(message.text)
+                await telegram_bot.send_message(message.chat.id, ai_response)
 
-        for keyword, sticker_id in stickers.items():
+        # 如果消息中包含特定關鍵字，發送對應的貼圖
+        for keyword, sticker_id in STICKERS.items():
             if keyword in message.text:
                 await telegram_bot.send_sticker(message.chat.id, sticker_id)
                 break
 
-        return {"ok": True}
+    except Exception as e:
+        logger.error(f"Error handling AI message: {str(e)}")
+
+async def handle_reply(message: TelegramMessage, text: str):
+    """發送固定回覆"""
+    await telegram_bot.send_message(message.chat.id, text)
+
+def enqueue_job(message: TelegramMessage, job_type: str, func, *args) -> bool:
+    """將工作放入佇列，佇列已滿時在背景回覆使用者稍後再試並回傳 False"""
+    if job_queue.submit(job_type, func, message, *args):
+        return True
+
+    task = asyncio.create_task(telegram_bot.send_message(
+        message.chat.id,
+        "⏳ 目前處理量較大，請稍後再試。"
+    ))
+    _overflow_replies.add(task)
+    task.add_done_callback(_overflow_replies.discard)
+    return False
+
+def dispatch_update(record: MessageRecord) -> bool:
+    """依消息內容放入對應的工作，回傳是否成功排入"""
+    message = record.to_model()
+
+    # 處理圖片消息
+    if record.photos is not None:
+        return enqueue_job(message, JOB_IMAGE, handle_image_message, record.photos)
+
+    text = record.text
+    # 指令只看第一行，避免一般對話中提到關鍵字時被當成指令
+    command = text.strip().split('\n', 1)[0].strip()
+
+    # 檢查是否是取消監控請求
+    if command == "取消監控":
+        lines = text.strip().split('\n')
+        wallet_address = lines[1].strip() if len(lines) > 1 else ""
+        removed = wallet_watchlist.remove(record.chat_id, wallet_address)
+        reply = f"🛑 已取消 {removed} 筆監控" if removed else "⚠️ 找不到此錢包的監控"
+        return enqueue_job(message, JOB_REPLY, handle_reply, reply)
+
+    # 檢查是否是監控請求
+    if command == "監控":
+        query = telegram_bot.parse_wallet_query(text, keyword="監控")
+        if not query or query["amount"] is None:
+            return enqueue_job(message, JOB_REPLY, handle_reply, WATCH_FORMAT_ERROR_MESSAGE)
+
+        error = wallet_watchlist.add(record.chat_id, query["wallet_address"], query["amount"])
+        if error:
+            reply = f"⚠️ {error}"
+        else:
+            reply = (
+                f"👀 開始監控錢包，收到款項時會通知你\n\n"
+                f"📥 錢包地址: {html.escape(query['wallet_address'])}\n"
+                f"💰 金額: {query['amount']} USDT"
+            )
+        return enqueue_job(message, JOB_REPLY, handle_reply, reply)
+
+    # 檢查是否是查帳請求
+    if "查收" in text:
+        batch = telegram_bot.parse_wallet_batch(text)
+        if not batch:
+            return enqueue_job(message, JOB_REPLY, handle_reply, FORMAT_ERROR_MESSAGE)
+
+        if len(batch) == 1:
+            # 沒有金額時不能以 0 比對，否則任何小額轉帳都會被當成符合
+            query = batch[0]
+            if query["amount"] is None:
+                return enqueue_job(message, JOB_REPLY, handle_reply, FORMAT_ERROR_MESSAGE)
+            else:
+                # 放入工作佇列處理錢包查詢
+                return enqueue_job(message, JOB_WALLET_QUERY, handle_wallet_query, query)
+
+        if any(query["amount"] is None for query in batch):
+            return enqueue_job(message, JOB_REPLY, handle_reply, BATCH_FORMAT_ERROR_MESSAGE)
+        elif len(batch) > settings.BATCH_VERIFY_MAX_ITEMS:
+            return enqueue_job(
+                message, JOB_REPLY, handle_reply,
+                f"⚠️ 每次最多查詢 {settings.BATCH_VERIFY_MAX_ITEMS} 筆"
+            )
+        else:
+            return enqueue_job(message, JOB_WALLET_QUERY, handle_wallet_batch, batch)
+
+    # 使用 AI 處理其他消息
+    return enqueue_job(message, JOB_AI_REPLY, handle_ai_message)
+
+async def process_update(data: dict) -> None:
+    """處理單一 Telegram 更新，webhook 與 long polling 共用；耗時工作皆放入佇列"""
+    # 只處理含文字或圖片的一般消息，其餘更新不建立模型
+    record = MessageRecord.from_update(data)
+    if record is None:
+        return
+    if record.update_id is None:
+        dispatch_update(record)
+        return
+
+    # 重送的更新直接略過，不做任何處理
+    if await update_deduplicator.seen(record.update_id):
+        return
+    accepted = False
+    try:
+        accepted = dispatch_update(record)
+    finally:
+        # 成功排入後才寫入已處理紀錄，否則撤銷登記讓重送可以再被處理
+        if accepted:
+            await update_deduplicator.commit(record.update_id)
+        else:
+            await update_deduplicator.forget(record.update_id)
+
+@router.post("/telegram")
+async def telegram_webhook(request: Request):
+    """處理 Telegram webhook 請求，所有耗時工作皆放入佇列後立即回應"""
+    started = time.perf_counter()
+    try:
+        # 先以原始內容過濾不處理的更新，再用較快的 JSON 解碼器解析
+        data = parse_update(await request.body())
+        if data is not None:
+            await process_update(data)
+        return Response(content=OK_RESPONSE_BODY, media_type="application/json")
 
     except Exception as e:
         logger.error(f"Error processing webhook: {str(e)}")
         # 在生產環境中，我們不應該暴露具體錯誤信息
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        webhook_latency.observe(time.perf_counter() - started)
 
 @router.get("/health")
 async def health_check():
     """健康檢查端點"""
-    return {"status": "ok", "service": "telegram-webhook"}
\ No newline at end of file
+    return {
+        "status": "ok",
+        "service": "telegram-webhook",
+        "queue": job_queue.stats(),
+        "dedup": update_deduplicator.stats(),
+        "outbound": telegram_bot.outbound.stats(),
+        "watchlist": wallet_watchlist.stats(),
+        "image_cache": image_analysis_cache.stats(),
+        "ai": ai_service.stats(),
+        "polling": update_poller.stats(),
+        "shared_state": shared_state.stats(),
+        "block_scanner": tronscan_api.scanner.stats(),
+        "webhook_latency": webhook_latency.labels().snapshot()
+    }
\ No newline at end of file
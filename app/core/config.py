@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from typing import Optional
+from decimal import Decimal
 from functools import lru_cache
 import os
 from pathlib import Path
@@ -13,20 +14,125 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = False
     
+    # Server Settings
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 1  # 大於 1 時必須設定 SHARED_STATE_PATH，且不支援錢包監控
+    
     # Telegram Settings
     TELEGRAM_BOT_TOKEN: str
     TELEGRAM_WEBHOOK_URL: str
+    TELEGRAM_API_BASE_URL: str = "https://api.telegram.org"
+    TELEGRAM_INGESTION_MODE: str = "webhook"  # webhook 或 polling
+    TELEGRAM_POLL_TIMEOUT: int = 25  # 秒，getUpdates long polling 逾時
+    TELEGRAM_POLL_LIMIT: int = 100
+    TELEGRAM_GLOBAL_RATE: float = 30.0  # 每秒訊息數
+    TELEGRAM_CHAT_RATE: float = 1.0  # 單一私聊每秒訊息數
+    TELEGRAM_GROUP_RATE: float = 20 / 60  # 單一群組每秒訊息數
+    TELEGRAM_CHAT_BURST: int = 3
+    TELEGRAM_SEND_BUFFER: int = 1000
+    TELEGRAM_SEND_MAX_RETRIES: int = 3
+    TELEGRAM_MAX_DOWNLOAD_BYTES: int = 10 * 1024 * 1024
     
     # TronScan Settings
     TRONSCAN_API_KEY: str
     TRONSCAN_API_BASE_URL: str = "https://apilist.tronscanapi.com/api"
+    TRONSCAN_CACHE_TTL: int = 30  # 秒，0 表示停用快取
+    TRONSCAN_CACHE_MAXSIZE: int = 1024
+    TRONSCAN_PAGE_SIZE: int = 50
+    TRONSCAN_MAX_PAGES: int = 10
+    TRONSCAN_RATE_LIMIT: float = 5.0  # 每秒請求數
+    TRONSCAN_RATE_BURST: int = 10
+    TRONSCAN_MAX_RETRIES: int = 3
+    TRONSCAN_BACKOFF_BASE: float = 0.5  # 秒
+    TRONSCAN_BACKOFF_MAX: float = 10.0  # 秒
+    TRONSCAN_INGESTION_MODE: str = "wallet"  # wallet：逐錢包查詢；scanner：掃描 USDT 合約的轉帳事件流
+    
+    # Block Scanner Settings（TRONSCAN_INGESTION_MODE=scanner 時使用）
+    SCANNER_STATE_PATH: Optional[str] = "scanner.db"  # 留空則不保存掃描進度與索引
+    SCANNER_INTERVAL: float = 3.0  # 秒，約一個區塊
+    SCANNER_INDEX_LAG: float = 3.0  # 秒，只掃描此時間之前的事件，等待上游建立索引
+    SCANNER_RESCAN_DELAY: float = 60.0  # 秒，每段範圍在此延遲後再掃描一次，補上較晚建立索引的轉帳；0 表示停用
+    SCANNER_PAGE_SIZE: int = 50
+    SCANNER_MAX_PAGES: int = 20  # 每輪最多頁數，未掃完的部分下一輪立即接續
+    SCANNER_CONFIRM_DELAY: float = 60.0  # 秒，符合的轉帳出塊後等待此時間再重新查詢確認狀態
+    SCANNER_MAX_LAG: float = 60.0  # 秒，進度落後超過此時間時改回逐錢包查詢
+    SCANNER_MAX_CATCHUP: float = 900.0  # 秒，保存的進度超過此時間則捨棄並重新回補
+    SCANNER_TRACK_TTL: float = 6 * 3600  # 秒，錢包超過此時間未被查詢就移出索引
+    
+    # HTTP Client Settings
+    TRONSCAN_POOL_SIZE: int = 20
+    TELEGRAM_POOL_SIZE: int = 30
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 15.0
+    HTTP_TOTAL_TIMEOUT: float = 30.0
+    HTTP_KEEPALIVE_TIMEOUT: float = 60.0
+    HTTP_DNS_CACHE_TTL: int = 300
+    
+    # Verification Settings
+    USDT_CONTRACT_ADDRESS: str = "TR7NHqjeKQxGTCi8q8ZY4pPvMSEuxgjLj6t"
+    VERIFY_AMOUNT_TOLERANCE: Decimal = Decimal("2")  # 允許的金額誤差（USDT）
+    BATCH_VERIFY_MAX_ITEMS: int = 50
+    BATCH_VERIFY_CONCURRENCY: int = 5
+    
+    # Watchlist Settings
+    WATCH_MIN_INTERVAL: float = 15.0  # 秒，剛註冊時的輪詢間隔
+    WATCH_MAX_INTERVAL: float = 300.0  # 秒
+    WATCH_BACKOFF_AGE: float = 120.0  # 秒，每經過此時間輪詢間隔加倍
+    WATCH_TTL: float = 6 * 3600  # 秒，超過後停止監控
+    WATCH_BATCH_SIZE: int = 20
+    WATCH_MAX_PER_CHAT: int = 20
+    WATCH_MAX_WALLETS: int = 10000
+    
+    # Transaction Store Settings
+    TRANSACTION_STORE_PATH: Optional[str] = "transactions.db"  # 留空則停用本地資料庫
+    TRANSACTION_RETENTION_HOURS: int = 168
+    TRANSACTION_SYNC_LAG: int = 120  # 秒，增量同步時重新查詢的索引延遲緩衝
+    TRANSACTION_PRUNE_INTERVAL: int = 600  # 秒
+    
+    # Job Queue Settings
+    QUEUE_WORKERS: int = 8
+    QUEUE_MAX_DEPTH: int = 200
+    QUEUE_WALLET_QUERY_CONCURRENCY: int = 6
+    QUEUE_IMAGE_CONCURRENCY: int = 2
+    QUEUE_AI_REPLY_CONCURRENCY: int = 4
+    QUEUE_SHUTDOWN_TIMEOUT: float = 10.0  # 秒
+    
+    # Update Deduplication Settings
+    DEDUP_CAPACITY: int = 10000
+    DEDUP_DB_PATH: Optional[str] = None  # 設定後以 SQLite 持久化
+    
+    # Shared State Settings（多 worker 共用的快取、去重與限流額度）
+    SHARED_STATE_PATH: Optional[str] = None  # 留空則各行程獨立
+    SHARED_STATE_PRUNE_INTERVAL: int = 300  # 秒
+    SHARED_LEASE_TTL: float = 15.0  # 秒，long polling 由持有租約的 worker 執行
+    
+    # Image Analysis Cache Settings
+    IMAGE_CACHE_PATH: Optional[str] = "image_cache.db"  # 留空則停用快取
+    IMAGE_CACHE_MAX_BYTES: int = 50 * 1024 * 1024
+    IMAGE_TARGET_SIZE: int = 1024  # 送給模型的圖片最長邊（像素）
+    IMAGE_JPEG_QUALITY: int = 85
     
     # OpenAI Settings
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-4"
+    OPENAI_API_BASE_URL: Optional[str] = None  # 留空使用官方端點
+    AI_MAX_CONCURRENCY: int = 4
+    AI_RESPONSE_CACHE_TTL: int = 600  # 秒
+    AI_RESPONSE_CACHE_MAXSIZE: int = 512
+    AI_STREAM_REPLIES: bool = True  # 以編輯訊息的方式逐步顯示 AI 回覆
+    AI_STREAM_EDIT_INTERVAL: float = 1.5  # 秒，合併編輯以符合 Telegram 頻率限制
+    AI_PRELOAD_CLIENT: bool = False  # 啟動完成後在背景預先載入 openai；預設在第一則 AI 訊息時才匯入
     
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # text 或 json
+    LOG_FILE: Optional[str] = "app.log"  # 留空則只輸出到標準輸出
+    LOG_FILE_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT: int = 5
+    LOG_QUEUE_SIZE: int = 10000  # 佇列已滿時捨棄新紀錄
+    LOG_ERROR_BURST: int = 10  # 同一位置的警告與錯誤每個窗口最多輸出筆數，0 表示不限制
+    LOG_ERROR_WINDOW: float = 60.0  # 秒
     
     class Config:
         env_file = ROOT_DIR / ".env"
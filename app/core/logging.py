@@ -1,39 +1,178 @@
+from typing import Dict, List, Optional, Tuple
+import copy
+import json
 import logging
-from logging.config import dictConfig
+import logging.handlers
+import queue
+import sys
+import time
 from app.core.config import get_settings
 
-settings = get_settings()
-
-LOGGING_CONFIG = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "default": {
-            "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            "datefmt": "%Y-%m-%d %H:%M:%S",
-        },
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "default",
-            "stream": "ext://sys.stdout",
-        },
-        "file": {
-            "class": "logging.handlers.RotatingFileHandler",
-            "formatter": "default",
-            "filename": "app.log",
-            "maxBytes": 10485760,  # 10MB
-            "backupCount": 5,
-        },
-    },
-    "root": {
-        "level": settings.LOG_LEVEL,
-        "handlers": ["console", "file"],
-    },
-}
-
-def setup_logging():
-    """配置日誌系統"""
-    dictConfig(LOGGING_CONFIG)
-    logging.info(f"Logging setup completed. Level: {settings.LOG_LEVEL}")
\ No newline at end of file
+DEFAULT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DEFAULT_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+# 改由佇列輸出的第三方 logger，避免其 handler 在事件迴圈中直接寫入
+ROUTED_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+# openai 用戶端底層的 httpx 會以 INFO 記錄每個請求，上游呼叫已由 metrics 統計
+QUIET_LOGGERS = ("httpx",)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """以單行 JSON 輸出日誌，方便集中式日誌系統解析"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record, DEFAULT_DATEFMT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            payload["suppressed"] = suppressed
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class ErrorRateLimitFilter(logging.Filter):
+    """限制同一位置重複的警告與錯誤：每個時間窗口最多輸出 burst 筆，其餘只計數
+
+    以 logger 名稱與程式行號分組，因此訊息內容不同（例如不同的狀態碼）仍視為同一來源。
+    窗口結束後的第一筆紀錄會附上被略過的數量。
+    """
+
+    def __init__(self, burst: int, window: float):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._state: Dict[Tuple[str, int], List[float]] = {}
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.burst <= 0:
+            return True
+
+        key = (record.name, record.lineno)
+        now = time.monotonic()
+        state = self._state.get(key)
+        if state is None or now - state[0] >= self.window:
+            skipped = int(state[2]) if state is not None else 0
+            self._state[key] = [now, 1, 0]
+            if skipped:
+                record.msg = f"{record.msg} (suppressed {skipped} similar messages)"
+                record.suppressed = skipped
+            return True
+
+        if state[1] < self.burst:
+            state[1] += 1
+            return True
+        state[2] += 1
+        self.suppressed += 1
+        return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """佇列已滿時直接捨棄紀錄，確保記錄日誌永遠不會阻塞事件迴圈"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """只合併訊息參數；例外堆疊的格式化留給背景執行緒（佇列僅在同一行程內使用）"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def create_formatter(log_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonFormatter()
+    return logging.Formatter(DEFAULT_FORMAT, DEFAULT_DATEFMT)
+
+
+def create_handlers(
+    log_file: Optional[str],
+    log_format: str = "text",
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5
+) -> List[logging.Handler]:
+    """建立實際輸出的 handler（標準輸出與輪替檔案）"""
+    formatter = create_formatter(log_format)
+    handlers: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def start_queue_logging(
+    handlers: List[logging.Handler],
+    level: str,
+    queue_size: int,
+    rate_limit: Optional[logging.Filter] = None
+) -> logging.handlers.QueueListener:
+    """將 root logger 改為只寫入佇列，由背景執行緒的 QueueListener 負責實際輸出"""
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    if rate_limit is not None:
+        queue_handler.addFilter(rate_limit)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    for name in ROUTED_LOGGERS:
+        routed = logging.getLogger(name)
+        routed.handlers = []
+        routed.propagate = True
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def setup_logging() -> None:
+    """配置日誌系統，重複呼叫時不會重複建立"""
+    global _listener
+    if _listener is not None:
+        return
+
+    settings = get_settings()
+    handlers = create_handlers(
+        settings.LOG_FILE, settings.LOG_FORMAT, settings.LOG_FILE_MAX_BYTES, settings.LOG_FILE_BACKUP_COUNT
+    )
+    rate_limit = ErrorRateLimitFilter(settings.LOG_ERROR_BURST, settings.LOG_ERROR_WINDOW)
+    _listener = start_queue_logging(handlers, settings.LOG_LEVEL, settings.LOG_QUEUE_SIZE, rate_limit)
+    logging.info(f"Logging setup completed. Level: {settings.LOG_LEVEL}")
+
+
+def shutdown_logging() -> None:
+    """停止背景執行緒，並輸出佇列中剩餘的紀錄"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
@@ -0,0 +1,126 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from collections import OrderedDict
+from dataclasses import dataclass
+import importlib
+import inspect
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+Hook = Callable[[Any], Union[None, Awaitable[None]]]
+
+
+@dataclass
+class ServiceSpec:
+    target: str  # "模組路徑:屬性名稱"
+    start: Optional[Hook] = None
+    stop: Optional[Hook] = None
+    eager: bool = False  # 啟動時就建立並執行 start，否則在第一次取用時才匯入
+
+
+class ServiceProxy:
+    """服務的延遲參照：模組層級可先持有，第一次存取屬性時才經由註冊表載入服務"""
+
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry: "ServiceRegistry", name: str):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._registry.get(self._name), attribute)
+
+    def __repr__(self) -> str:
+        return f"<ServiceProxy {self._name}>"
+
+
+class ServiceRegistry:
+    """服務註冊表：服務模組在第一次取用時才匯入，啟動依註冊順序、關閉依相反順序
+
+    只有實際建立過的服務會在關閉時執行 stop，未使用的服務完全不會載入。
+    """
+
+    def __init__(self):
+        self._specs: "OrderedDict[str, ServiceSpec]" = OrderedDict()
+        self._instances: Dict[str, Any] = {}
+        self._started: List[str] = []
+        self.startup_seconds: Dict[str, float] = {}
+
+    def register(
+        self,
+        name: str,
+        target: str,
+        start: Optional[Hook] = None,
+        stop: Optional[Hook] = None,
+        eager: bool = False
+    ) -> None:
+        """註冊服務；target 為 "模組路徑:屬性名稱"，指向模組層級的服務實例"""
+        self._specs[name] = ServiceSpec(target, start, stop, eager)
+
+    def get(self, name: str) -> Any:
+        """取得服務，尚未載入時匯入所在模組"""
+        instance = self._instances.get(name)
+        if instance is None:
+            module_path, _, attribute = self._specs[name].target.partition(":")
+            instance = self._instances[name] = getattr(importlib.import_module(module_path), attribute)
+        return instance
+
+    def proxy(self, name: str) -> ServiceProxy:
+        """回傳延遲參照，供路由等模組在匯入時持有而不載入服務"""
+        if name not in self._specs:
+            raise KeyError(name)
+        return ServiceProxy(self, name)
+
+    @staticmethod
+    async def _call(hook: Hook, instance: Any) -> None:
+        result = hook(instance)
+        if inspect.isawaitable(result):
+            await result
+
+    async def startup(self) -> None:
+        """依註冊順序啟動標記為 eager 的服務"""
+        for name, spec in self._specs.items():
+            if not spec.eager:
+                continue
+            started = time.perf_counter()
+            instance = self.get(name)
+            if spec.start is not None:
+                await self._call(spec.start, instance)
+            self._started.append(name)
+            self.startup_seconds[name] = time.perf_counter() - started
+
+    async def shutdown(self) -> None:
+        """依相反順序關閉所有已建立的服務，單一服務失敗不影響其他服務"""
+        for name in reversed(self._specs):
+            spec = self._specs[name]
+            instance = self._instances.get(name)
+            if instance is None:
+                instance = self._loaded_instance(spec)
+            if instance is None or spec.stop is None:
+                continue
+            try:
+                await self._call(spec.stop, instance)
+            except Exception as e:
+                logger.error(f"Error stopping service {name}: {str(e)}")
+        self._started.clear()
+
+    @staticmethod
+    def _loaded_instance(spec: ServiceSpec) -> Optional[Any]:
+        """服務模組已被其他服務直接匯入時（例如監控清單 import tronscan_api）也需要關閉"""
+        module_path, _, attribute = spec.target.partition(":")
+        module = sys.modules.get(module_path)
+        return getattr(module, attribute, None) if module is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """回傳服務載入狀態與啟動耗時"""
+        return {
+            "registered": list(self._specs),
+            "loaded": list(self._instances),
+            "started": list(self._started),
+            "startup_seconds": self.startup_seconds
+        }
+
+
+services = ServiceRegistry()
@@ -1,18 +1,63 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import Settings
-from app.api.routes import telegram, health
+from app.core.config import get_settings
+from app.core.logging import setup_logging, shutdown_logging
+from app.services import services
+from app.api.routes import telegram, health, metrics
+import asyncio
 import logging
 
 # 初始化設定
-settings = Settings()
-logging.config.fileConfig('logging.conf')
+settings = get_settings()
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# 背景預熱任務，保留引用避免被回收
+_warm_up_tasks = set()
+
+
+async def start_polling() -> None:
+    """long polling 模式下啟動 getUpdates 迴圈"""
+    shared_state = services.get("shared_state")
+    update_poller = services.get("update_poller")
+    if shared_state.enabled:
+        # 多 worker 時只由持有租約的 worker 呼叫 getUpdates
+        shared_state.start_lease(
+            "update_poller",
+            settings.SHARED_LEASE_TTL,
+            lambda: update_poller.start(telegram.process_update),
+            update_poller.stop
+        )
+    else:
+        await update_poller.start(telegram.process_update)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Application startup...")
+    await services.startup()
+    if settings.TELEGRAM_INGESTION_MODE == "polling":
+        await start_polling()
+    if settings.AI_PRELOAD_CLIENT:
+        # 服務就緒後才在背景載入 openai，不延遲健康檢查
+        task = asyncio.create_task(services.get("ai_service").warm_up())
+        _warm_up_tasks.add(task)
+        task.add_done_callback(_warm_up_tasks.discard)
+    yield
+
+    logger.info("Application shutdown...")
+    # 清理資源
+    await services.get("shared_state").stop_lease("update_poller")
+    await services.shutdown()
+    shutdown_logging()
+
+
 app = FastAPI(
     title="Wallet Tracker API",
     description="Telegram Bot for tracking wallet transactions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS設定
@@ -27,13 +72,4 @@ app.add_middleware(
 # 路由設定
 app.include_router(health.router, prefix="/health", tags=["health"])
 app.include_router(telegram.router, prefix="/webhook", tags=["telegram"])
-
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Application startup...")
-    # 初始化各項服務
-    
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Application shutdown...")
-    # 清理資源
\ No newline at end of file
+app.include_router(metrics.router, tags=["metrics"])
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+from app.utils import fastjson
 
 class TelegramUser(BaseModel):
     id: int
@@ -33,4 +34,51 @@ class TelegramMessage(BaseModel):
             chat=TelegramChat(**data["chat"]),
             date=datetime.fromtimestamp(data["date"]),
             text=data.get("text")
-        )
\ No newline at end of file
+        )
+
+# 一般訊息更新的頂層 key；原始內容不含此字串時必定是不處理的更新類型
+_MESSAGE_KEY = b'"message"'
+
+
+def parse_update(body: bytes) -> Optional[dict]:
+    """解析 webhook 原始內容，不處理的更新類型（編輯訊息、頻道貼文等）不做 JSON 解碼直接回傳 None"""
+    if _MESSAGE_KEY not in body:
+        return None
+    data = fastjson.loads(body)
+    return data if isinstance(data, dict) else None
+
+
+class MessageRecord:
+    """熱路徑使用的精簡訊息紀錄，只保留路由所需欄位；需要完整資料時才建立 TelegramMessage"""
+
+    __slots__ = ("update_id", "chat_id", "text", "photos", "_data")
+
+    def __init__(
+        self,
+        update_id: Optional[int],
+        chat_id: int,
+        text: Optional[str],
+        photos: Optional[List[dict]],
+        data: dict
+    ):
+        self.update_id = update_id
+        self.chat_id = chat_id
+        self.text = text
+        self.photos = photos
+        self._data = data
+
+    @classmethod
+    def from_update(cls, update: dict) -> Optional["MessageRecord"]:
+        """從更新取出需要處理的訊息，貼圖、編輯訊息等不處理的更新回傳 None"""
+        message = update.get("message")
+        if not isinstance(message, dict):
+            return None
+        photos = message.get("photo")
+        text = message.get("text")
+        if photos is None and not text:
+            return None
+        return cls(update.get("update_id"), message["chat"]["id"], text, photos, message)
+
+    def to_model(self) -> TelegramMessage:
+        """建立完整的 TelegramMessage 模型"""
+        return TelegramMessage.from_webhook(self._data)
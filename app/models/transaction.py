@@ -18,10 +18,11 @@ class Transaction(BaseModel):
     transaction_id: str
     tokenInfo: TokenInfo
     finalResult: str
+    block: Optional[int] = None
 
 class TransactionResponse(BaseModel):
-    total: int
-    token_transfers: List[Transaction]
+    total: int = 0
+    token_transfers: List[Transaction] = []
     error: Optional[dict] = None
 
     def format_message(self) -> str:
@@ -0,0 +1,37 @@
+import logging
+import uvicorn
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """啟動 uvicorn；WORKERS 大於 1 時以多個行程執行，快取、去重與限流額度經由共用狀態協調"""
+    settings = get_settings()
+    if settings.WORKERS > 1:
+        if not settings.SHARED_STATE_PATH:
+            raise SystemExit("SHARED_STATE_PATH must be set when WORKERS > 1")
+        if settings.TRONSCAN_INGESTION_MODE == "scanner" and settings.SCANNER_STATE_PATH:
+            # 每個 worker 各自掃描並維護索引，檢查點檔案不能共用
+            raise SystemExit("SCANNER_STATE_PATH must be empty when WORKERS > 1 in scanner mode")
+        # 監控清單只存在各自行程的記憶體中，不經由共用狀態協調
+        logging.basicConfig()
+        logger.warning(
+            "Wallet watches are kept per worker and are not supported when WORKERS > 1: "
+            "取消監控 only reaches the worker that received 監控, and per-chat limits apply per worker"
+        )
+        if settings.LOG_FILE:
+            # RotatingFileHandler 無法安全地由多個行程同時輪替
+            logger.warning("LOG_FILE is shared by multiple workers; consider logging to stdout only")
+
+    uvicorn.run(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=settings.WORKERS,
+        log_level=settings.LOG_LEVEL.lower()
+    )
+
+
+if __name__ == "__main__":
+    main()
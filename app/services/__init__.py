@@ -0,0 +1,33 @@
+from app.core.config import get_settings
+from app.core.registry import services
+
+settings = get_settings()
+
+# 服務註冊：依序啟動、反向關閉；資料庫與 HTTP session 皆在第一次使用時才開啟
+services.register("shared_state", "app.services.shared_state:shared_state", stop=lambda state: state.close())
+services.register(
+    "update_deduplicator", "app.services.dedup:update_deduplicator",
+    start=lambda dedup: dedup.start(), stop=lambda dedup: dedup.close(), eager=True
+)
+services.register("transaction_store", "app.services.store:transaction_store", stop=lambda store: store.close())
+services.register(
+    "image_analysis_cache", "app.services.image_cache:image_analysis_cache", stop=lambda cache: cache.close()
+)
+services.register("tronscan_api", "app.services.tronscan:tronscan_api", stop=lambda api: api.close())
+if settings.TRONSCAN_INGESTION_MODE == "scanner":
+    # 預設的 wallet 模式不需要掃描器，啟動時不載入 tronscan 相關模組
+    services.register(
+        "block_scanner", "app.services.tronscan:block_scanner",
+        start=lambda scanner: scanner.start(), stop=lambda scanner: scanner.stop(), eager=True
+    )
+services.register("telegram_bot", "app.services.telegram:telegram_bot", stop=lambda bot: bot.close())
+services.register("ai_service", "app.services.ai:ai_service", stop=lambda ai: ai.close())
+services.register(
+    "job_queue", "app.services.queue:job_queue",
+    start=lambda queue: queue.start(),
+    stop=lambda queue: queue.stop(timeout=settings.QUEUE_SHUTDOWN_TIMEOUT),
+    eager=True
+)
+# 監控清單在第一次新增監控時才啟動輪詢
+services.register("wallet_watchlist", "app.services.watchlist:wallet_watchlist", stop=lambda watchlist: watchlist.stop())
+services.register("update_poller", "app.services.polling:update_poller", stop=lambda poller: poller.stop())
@@ -1,14 +1,59 @@
-from typing import Optional, Dict, List
+from typing import AsyncIterator, Optional, Dict, List
+import asyncio
 import logging
-import openai
+import re
+import time
 from app.core.config import get_settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import observe_upstream
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+RESPONSE_FALLBACK = "抱歉，我現在遇到一些問題。請稍後再試。河，超級舒服。"
+IMAGE_ANALYSIS_FALLBACK = "抱歉，我無法分析這張圖片。河，超級舒服。"
+
+# 常見意圖的固定回覆，命中時不呼叫模型
+FAST_PATH_TEMPLATES = [
+    (
+        ("你好", "您好", "哈囉", "嗨", "hi", "hello", "hey"),
+        "你好，我是負責取代哥哥的AI助理！有什麼可以幫你的嗎？"
+        "如果想查帳，請提供錢包地址和交易金額。河，超級舒服。"
+    ),
+    (
+        ("怎麼查帳", "如何查帳", "查帳", "怎麼查收", "如何查收", "查帳方式"),
+        "你好，我是負責取代哥哥的AI助理！查帳請按照以下格式輸入：\n\n"
+        "查收\n"
+        "錢包地址\n"
+        "金額\n\n"
+        "河，超級舒服。"
+    ),
+    (
+        ("謝謝", "感謝", "thanks", "thank you"),
+        "你好，我是負責取代哥哥的AI助理！不客氣，有需要隨時找我。河，超級舒服。"
+    ),
+]
+
+_TRAILING_PUNCTUATION = "?？!！。.~～,，"
+
+
+def normalize_message(text: str) -> str:
+    """正規化使用者訊息，作為快取與固定回覆的比對 key"""
+    text = re.sub(r"\s+", " ", text.strip().lower())
+    return text.strip(_TRAILING_PUNCTUATION).strip()
+
+def _load_openai():
+    """匯入 openai 並建立非同步用戶端；匯入約需數百毫秒，因此延後到第一次使用"""
+    from openai import AsyncOpenAI
+
+    # openai 1.x 的模組層級設定不影響用戶端，自訂網址必須傳給用戶端
+    return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_API_BASE_URL or None)
+
 class AIService:
+    IMAGE_ANALYSIS_FALLBACK = IMAGE_ANALYSIS_FALLBACK
+
     def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
+        self._openai_client = None
         self._system_prompt = """
 你是一個負責取代人工客服的AI助理。請遵循以下規則：
 1. 用「你好，我是負責取代哥哥的AI助理！」開始對話
@@ -18,51 +63,232 @@ class AIService:
    - 交易金額
 4. 保持友善和專業的態度
 """
+        self._templates = {
+            keyword: reply for keywords, reply in FAST_PATH_TEMPLATES for keyword in keywords
+        }
+        self.response_cache = TTLCache(
+            maxsize=settings.AI_RESPONSE_CACHE_MAXSIZE,
+            ttl=settings.AI_RESPONSE_CACHE_TTL
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._paths = {
+            path: {"count": 0, "latency_seconds_total": 0.0}
+            for path in ("template", "cache", "model", "stream")
+        }
+        self._stream_ttfb_seconds_total = 0.0
+        self._tokens = {"prompt": 0, "completion": 0}
+
+    async def _client(self):
+        """取得 openai 用戶端，第一次呼叫時在執行緒中匯入以免阻塞事件迴圈"""
+        if self._openai_client is None:
+            self._openai_client = await asyncio.to_thread(_load_openai)
+        return self._openai_client
+
+    async def close(self) -> None:
+        """關閉 openai 用戶端的連線池"""
+        if self._openai_client is not None:
+            await self._openai_client.close()
+            self._openai_client = None
+
+    async def warm_up(self) -> None:
+        """預先載入 openai，讓第一則 AI 訊息不必等待匯入"""
+        try:
+            await self._client()
+        except Exception as e:
+            logger.error(f"Error loading OpenAI client: {str(e)}")
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """限制同時進行中的模型呼叫數量"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+        return self._semaphore
+
+    def _record(self, path: str, started: float) -> None:
+        stats = self._paths[path]
+        stats["count"] += 1
+        stats["latency_seconds_total"] += time.perf_counter() - started
+
+    def _record_usage(self, response) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self._tokens["prompt"] += getattr(usage, "prompt_tokens", 0) or 0
+            self._tokens["completion"] += getattr(usage, "completion_tokens", 0) or 0
+
+    def stats(self) -> Dict:
+        """回傳各路徑的次數、延遲與 token 用量"""
+        return {
+            "paths": self._paths,
+            "stream_ttfb_seconds_total": self._stream_ttfb_seconds_total,
+            "tokens": self._tokens,
+            "cache": self.response_cache.stats()
+        }
 
     async def get_response(self, user_message: str) -> str:
-        """獲取 AI 回應"""
+        """獲取 AI 回應，依序嘗試固定回覆、回應快取，最後才呼叫模型"""
+        started = time.perf_counter()
+        normalized = normalize_message(user_message)
+
+        template = self._templates.get(normalized)
+        if template is not None:
+            self._record("template", started)
+            return template
+
+        called = False
+
+        async def complete() -> str:
+            nonlocal called
+            called = True
+            return await self._complete(user_message)
+
+        response = await self.response_cache.get_or_fetch(
+            normalized,
+            complete,
+            should_cache=lambda reply: reply != RESPONSE_FALLBACK
+        )
+        self._record("model" if called else "cache", started)
+        return response
+
+    def cached_response(self, user_message: str) -> Optional[str]:
+        """只查詢固定回覆與回應快取，未命中時回傳 None"""
+        started = time.perf_counter()
+        normalized = normalize_message(user_message)
+
+        template = self._templates.get(normalized)
+        if template is not None:
+            self._record("template", started)
+            return template
+
+        cached = self.response_cache.get(normalized)
+        if cached is None:
+            self.response_cache.misses += 1
+            return None
+        self.response_cache.hits += 1
+        self._record("cache", started)
+        return cached
+
+    async def _read_stream(self, user_message: str, started: float, deltas: asyncio.Queue) -> None:
+        """在並行上限內讀完模型串流，文字逐段放入佇列，結束時放入 None"""
+        try:
+            async with self.semaphore:
+                try:
+                    client = await self._client()
+                    response = await client.chat.completions.create(
+                        model=settings.OPENAI_MODEL,
+                        messages=[
+                            {"role": "system", "content": self._system_prompt},
+                            {"role": "user", "content": user_message}
+                        ],
+                        temperature=0.7,
+                        max_tokens=500,
+                        stream=True,
+                        # 最後一段回傳 token 用量（choices 為空）
+                        stream_options={"include_usage": True}
+                    )
+                except Exception:
+                    observe_upstream("openai", "error", started)
+                    raise
+                observe_upstream("openai", "ok", started)
+                try:
+                    async for chunk in response:
+                        if chunk.usage is not None:
+                            self._record_usage(chunk)
+                        if not chunk.choices:
+                            continue
+                        delta = getattr(chunk.choices[0].delta, "content", None)
+                        if delta:
+                            deltas.put_nowait(delta)
+                finally:
+                    await response.close()
+        finally:
+            deltas.put_nowait(None)
+
+    async def stream_response(self, user_message: str) -> AsyncIterator[str]:
+        """以串流方式取得模型回應，逐段產生文字；完成後寫入回應快取
+
+        模型串流由背景任務讀取，並行名額在讀完後即釋放，不會因呼叫端等待 Telegram 發送而被佔住。
+        """
+        started = time.perf_counter()
+        chunks: List[str] = []
+        deltas: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.create_task(self._read_stream(user_message, started, deltas))
+        try:
+            while True:
+                delta = await deltas.get()
+                if delta is None:
+                    break
+                if not chunks:
+                    self._stream_ttfb_seconds_total += time.perf_counter() - started
+                chunks.append(delta)
+                yield delta
+            # 串流中途失敗時在此拋出
+            await reader
+        finally:
+            if not reader.done():
+                reader.cancel()
+                await asyncio.gather(reader, return_exceptions=True)
+
+        reply = "".join(chunks)
+        if reply:
+            self.response_cache.set(normalize_message(user_message), reply)
+        self._record("stream", started)
+
+    async def _complete(self, user_message: str) -> str:
+        """呼叫模型產生回應"""
+        started = time.perf_counter()
         try:
-            response = await openai.ChatCompletion.acreate(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": self._system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
+            async with self.semaphore:
+                client = await self._client()
+                response = await client.chat.completions.create(
+                    model=settings.OPENAI_MODEL,
+                    messages=[
+                        {"role": "system", "content": self._system_prompt},
+                        {"role": "user", "content": user_message}
+                    ],
+                    temperature=0.7,
+                    max_tokens=500
+                )
+            self._record_usage(response)
+            observe_upstream("openai", "ok", started)
             return response.choices[0].message.content
         except Exception as e:
+            observe_upstream("openai", "error", started)
             logger.error(f"Error getting AI response: {str(e)}")
-            return "抱歉，我現在遇到一些問題。請稍後再試。河，超級舒服。"
+            return RESPONSE_FALLBACK
 
     async def analyze_image(self, image_data: bytes) -> str:
         """分析圖片內容"""
+        started = time.perf_counter()
         try:
-            response = await openai.ChatCompletion.acreate(
-                model="gpt-4-vision-preview",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Please describe what you see in this image."
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_data}"
+            async with self.semaphore:
+                client = await self._client()
+                response = await client.chat.completions.create(
+                    model="gpt-4-vision-preview",
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "text",
+                                    "text": "Please describe what you see in this image."
+                                },
+                                {
+                                    "type": "image_url",
+                                    "image_url": {
+                                        "url": f"data:image/jpeg;base64,{image_data}"
+                                    }
                                 }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=300
-            )
+                            ]
+                        }
+                    ],
+                    max_tokens=300
+                )
+            self._record_usage(response)
+            observe_upstream("openai", "ok", started)
             return response.choices[0].message.content
         except Exception as e:
+            observe_upstream("openai", "error", started)
             logger.error(f"Error analyzing image: {str(e)}")
-            return "抱歉，我無法分析這張圖片。河，超級舒服。"
+            return IMAGE_ANALYSIS_FALLBACK
 
 ai_service = AIService()
\ No newline at end of file
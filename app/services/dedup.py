@@ -0,0 +1,114 @@
+from typing import Deque, Optional, Set
+from collections import deque
+import asyncio
+import logging
+import sqlite3
+import threading
+from app.core.config import get_settings
+from app.services.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class UpdateDeduplicator:
+    """記錄最近處理過的 update_id，過濾 Telegram 重送的更新"""
+
+    def __init__(self, capacity: int, db_path: Optional[str] = None):
+        self.capacity = capacity
+        self.db_path = db_path
+        self._order: Deque[int] = deque()
+        self._seen: Set[int] = set()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self.duplicates = 0
+
+    def start(self) -> None:
+        """開啟 SQLite 持久化並載入最近的 update_id"""
+        if not self.db_path or self._conn is not None:
+            return
+        self._conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_updates (update_id INTEGER PRIMARY KEY)"
+        )
+        rows = self._conn.execute(
+            "SELECT update_id FROM seen_updates ORDER BY update_id DESC LIMIT ?",
+            (self.capacity,)
+        ).fetchall()
+        for (update_id,) in reversed(rows):
+            self._remember(update_id)
+        logger.info(f"Loaded {len(rows)} recent update ids from {self.db_path}")
+
+    def close(self) -> None:
+        """關閉 SQLite 連線"""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def _remember(self, update_id: int) -> None:
+        self._order.append(update_id)
+        self._seen.add(update_id)
+        if len(self._order) > self.capacity:
+            self._seen.discard(self._order.popleft())
+
+    def _persist(self, update_id: int) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO seen_updates (update_id) VALUES (?)", (update_id,)
+                )
+                self._inserts += 1
+                # 定期清除超出容量的舊紀錄
+                if self._inserts >= self.capacity:
+                    self._inserts = 0
+                    self._conn.execute(
+                        "DELETE FROM seen_updates WHERE update_id <= ?", (update_id - self.capacity,)
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Error persisting update id: {str(e)}")
+
+    async def seen(self, update_id: int) -> bool:
+        """若 update_id 已處理過回傳 True，否則先登記在記憶體後回傳 False
+
+        登記後須在成功排入工作時呼叫 commit 寫入資料庫，失敗時呼叫 forget，
+        避免行程中止或佇列已滿時把之後的重送也當成重複。
+        """
+        if update_id in self._seen:
+            self.duplicates += 1
+            return True
+        # 多 worker 時由共用狀態決定哪個行程負責處理
+        if shared_state.enabled and not await shared_state.claim_update(update_id):
+            self._remember(update_id)
+            self.duplicates += 1
+            return True
+        self._remember(update_id)
+        return False
+
+    async def commit(self, update_id: int) -> None:
+        """更新已成功排入處理，寫入資料庫；資料庫寫入在執行緒中進行"""
+        if self._conn is not None:
+            await asyncio.to_thread(self._persist, update_id)
+
+    async def forget(self, update_id: int) -> None:
+        """更新未能排入處理，撤銷登記讓重送的更新可以再被處理"""
+        if update_id in self._seen:
+            self._seen.discard(update_id)
+            self._order.remove(update_id)
+        if shared_state.enabled:
+            await shared_state.release_update(update_id)
+
+    def stats(self) -> dict:
+        """回傳去重統計"""
+        return {"size": len(self._order), "duplicates": self.duplicates}
+
+
+update_deduplicator = UpdateDeduplicator(
+    capacity=settings.DEDUP_CAPACITY,
+    db_path=settings.DEDUP_DB_PATH
+)
@@ -0,0 +1,126 @@
+from typing import Dict, Iterable, Optional
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class ImageAnalysisCache:
+    """以 SQLite 保存圖片分析結果，依 file_unique_id 或內容雜湊查詢，超過容量時淘汰最久未使用的項目"""
+
+    def __init__(self, db_path: Optional[str], max_bytes: int):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path)
+
+    def start(self) -> None:
+        """開啟快取資料庫"""
+        if not self.enabled or self._conn is not None:
+            return
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_analysis ("
+            "cache_key TEXT PRIMARY KEY, analysis TEXT NOT NULL, "
+            "size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_image_analysis_accessed ON image_analysis (accessed_at)"
+        )
+
+    def close(self) -> None:
+        """關閉快取資料庫"""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.start()
+        return self._conn
+
+    def _get(self, cache_key: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT analysis FROM image_analysis WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is not None:
+                with conn:
+                    conn.execute(
+                        "UPDATE image_analysis SET accessed_at = ? WHERE cache_key = ?",
+                        (time.time(), cache_key)
+                    )
+        return row[0] if row else None
+
+    def _set(self, cache_keys: Iterable[str], analysis: str) -> None:
+        size = len(analysis.encode())
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO image_analysis (cache_key, analysis, size, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(cache_key, analysis, size, now) for cache_key in cache_keys]
+                )
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM image_analysis").fetchone()[0]
+                while total > self.max_bytes:
+                    row = conn.execute(
+                        "SELECT cache_key, size FROM image_analysis ORDER BY accessed_at LIMIT 1"
+                    ).fetchone()
+                    if row is None:
+                        break
+                    conn.execute("DELETE FROM image_analysis WHERE cache_key = ?", (row[0],))
+                    total -= row[1]
+                    self.evictions += 1
+
+    async def get(self, *cache_keys: Optional[str], count_miss: bool = True) -> Optional[str]:
+        """依序以多個 key 查詢快取，任一命中即回傳；之後還會以其他 key 再查時傳入 count_miss=False"""
+        if not self.enabled:
+            return None
+        for cache_key in cache_keys:
+            if not cache_key:
+                continue
+            analysis = await asyncio.to_thread(self._get, cache_key)
+            if analysis is not None:
+                self.hits += 1
+                return analysis
+        if count_miss:
+            self.misses += 1
+        return None
+
+    async def set(self, analysis: str, *cache_keys: Optional[str]) -> None:
+        """以多個 key 寫入同一份分析結果"""
+        cache_keys = [cache_key for cache_key in cache_keys if cache_key]
+        if not self.enabled or not cache_keys:
+            return
+        try:
+            await asyncio.to_thread(self._set, cache_keys, analysis)
+        except sqlite3.Error as e:
+            logger.error(f"Error writing image analysis cache: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        """回傳快取統計"""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+image_analysis_cache = ImageAnalysisCache(
+    db_path=settings.IMAGE_CACHE_PATH,
+    max_bytes=settings.IMAGE_CACHE_MAX_BYTES
+)
@@ -0,0 +1,93 @@
+from typing import Container, List, Optional, Tuple, Union
+from decimal import Decimal
+import bisect
+from app.models.transaction import Transaction
+
+Amount = Union[Decimal, float, int, str]
+
+
+def to_decimal(amount: Amount) -> Decimal:
+    """轉換為 Decimal，float 先轉字串以避免二進位誤差"""
+    if isinstance(amount, Decimal):
+        return amount
+    return Decimal(str(amount))
+
+
+class TransferIndex:
+    """依金額排序的轉帳索引，以二分搜尋找出誤差範圍內的交易
+
+    只收錄轉入指定錢包、指定代幣合約且執行成功的轉帳，金額以整數最小單位保存。
+    """
+
+    def __init__(
+        self,
+        wallet_address: str,
+        token_id: str,
+        tolerance: Amount,
+        token_decimals: int = 6
+    ):
+        self.wallet_address = wallet_address
+        self.token_id = token_id
+        self.token_decimals = token_decimals
+        self.tolerance_units = self.to_units(tolerance)
+        self._amounts: List[int] = []
+        self._transfers: List[Transaction] = []
+
+    def __len__(self) -> int:
+        return len(self._amounts)
+
+    def to_units(self, amount: Amount) -> int:
+        """將金額轉換為代幣最小單位"""
+        return int(to_decimal(amount).scaleb(self.token_decimals).to_integral_value())
+
+    def accepts(self, tx: Transaction) -> bool:
+        """檢查是否為轉入本錢包的目標代幣轉帳"""
+        return (
+            tx.to_address == self.wallet_address
+            and tx.tokenInfo.tokenId == self.token_id
+            and tx.finalResult == "SUCCESS"
+        )
+
+    def add(self, tx: Transaction) -> bool:
+        """加入一筆轉帳，不符合條件時回傳 False"""
+        if not self.accepts(tx):
+            return False
+        units = int(tx.quant)
+        position = bisect.bisect_right(self._amounts, units)
+        self._amounts.insert(position, units)
+        self._transfers.insert(position, tx)
+        return True
+
+    def extend(self, transfers: List[Transaction]) -> "TransferIndex":
+        """批次加入轉帳後一次排序"""
+        accepted = [tx for tx in transfers if self.accepts(tx)]
+        entries = sorted(
+            zip(self._amounts + [int(tx.quant) for tx in accepted], self._transfers + accepted),
+            key=lambda entry: entry[0]
+        )
+        self._amounts = [units for units, _ in entries]
+        self._transfers = [tx for _, tx in entries]
+        return self
+
+    def find(
+        self,
+        expected_amount: Amount,
+        exclude: Container[str] = ()
+    ) -> Optional[Tuple[Transaction, Decimal]]:
+        """找出誤差範圍內最接近預期金額的轉帳，金額相同時取最新的一筆
+
+        exclude 為已被其他查詢認領的 transaction_id。
+        """
+        expected_units = self.to_units(expected_amount)
+        low = bisect.bisect_left(self._amounts, expected_units - self.tolerance_units)
+        high = bisect.bisect_right(self._amounts, expected_units + self.tolerance_units)
+        candidates = [i for i in range(low, high) if self._transfers[i].transaction_id not in exclude]
+        if not candidates:
+            return None
+
+        best = min(
+            candidates,
+            key=lambda i: (abs(self._amounts[i] - expected_units), -self._transfers[i].block_ts)
+        )
+        tx = self._transfers[best]
+        return tx, Decimal(self._amounts[best]).scaleb(-tx.tokenInfo.tokenDecimal)
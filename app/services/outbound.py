@@ -0,0 +1,144 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple, Union
+from collections import OrderedDict, deque
+import asyncio
+import logging
+import time
+from app.services.shared_state import Limiter, create_limiter
+from app.utils.metrics import metrics
+from app.utils.ratelimit import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+ChatId = Union[int, str]
+
+# 保留的 per-chat 限流器數量上限
+MAX_CHAT_LIMITERS = 10000
+
+
+class OutboundScheduler:
+    """Telegram 發送排程器：遵守全域與單一聊天室的頻率限制，並維持聊天室內的訊息順序"""
+
+    def __init__(
+        self,
+        send: Callable[[str, Dict], Awaitable[Dict]],
+        global_rate: float,
+        chat_rate: float,
+        group_rate: float,
+        chat_burst: int,
+        max_buffer: int,
+        max_retries: int
+    ):
+        self._send = send
+        # 多 worker 時全域與 per-chat 額度皆跨行程共用
+        self._global = create_limiter("telegram:global", global_rate, max(1, int(global_rate)))
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_buffer = max_buffer
+        self.max_retries = max_retries
+        self._queues: Dict[ChatId, Deque[Tuple[str, Dict, asyncio.Future, float]]] = {}
+        self._workers: Dict[ChatId, asyncio.Task] = {}
+        self._limiters: "OrderedDict[ChatId, Limiter]" = OrderedDict()
+        self.pending = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.dropped = 0
+        self.latency = metrics.histogram(
+            "wallet_tracker_telegram_send_duration_seconds",
+            "Time from queuing an outbound Telegram message until it is sent"
+        ).labels()
+
+    def _limiter(self, chat_id: ChatId) -> Limiter:
+        limiter = self._limiters.get(chat_id)
+        if limiter is None:
+            # 群組（負數 chat_id）的限制比私聊嚴格
+            is_group = str(chat_id).startswith("-")
+            rate = self.group_rate if is_group else self.chat_rate
+            limiter = self._limiters[chat_id] = create_limiter(
+                f"telegram:chat:{chat_id}", rate, self.chat_burst
+            )
+            while len(self._limiters) > MAX_CHAT_LIMITERS:
+                self._limiters.popitem(last=False)
+        else:
+            self._limiters.move_to_end(chat_id)
+        return limiter
+
+    async def submit(self, chat_id: ChatId, method: str, data: Dict) -> Dict:
+        """排入發送佇列並等待 Telegram 回應"""
+        if self.pending >= self.max_buffer:
+            self.dropped += 1
+            logger.warning(f"Outbound buffer full, dropping {method} to chat {chat_id}")
+            return {"ok": False, "error": "Outbound buffer full"}
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(chat_id, deque()).append((method, data, future, time.monotonic()))
+        self.pending += 1
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._drain(chat_id))
+        return await asyncio.shield(future)
+
+    async def _drain(self, chat_id: ChatId) -> None:
+        """依序發送同一聊天室的訊息"""
+        queue = self._queues[chat_id]
+        try:
+            while queue:
+                method, data, future, enqueued_at = queue[0]
+                try:
+                    result = await self._send_with_retry(chat_id, method, data)
+                except Exception as e:
+                    # 單則訊息失敗（例如共用限流器的資料庫錯誤）不中止發送，等待者收到錯誤結果
+                    logger.error(f"Error sending {method} to chat {chat_id}: {str(e)}")
+                    result = {"ok": False, "error": str(e)}
+                queue.popleft()
+                self.pending -= 1
+                self.latency.observe(time.monotonic() - enqueued_at)
+                if result.get("ok"):
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._workers.pop(chat_id, None)
+            if not queue:
+                self._queues.pop(chat_id, None)
+
+    async def _send_with_retry(self, chat_id: ChatId, method: str, data: Dict) -> Dict:
+        limiter = self._limiter(chat_id)
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            await self._global.acquire()
+            result = await self._send(method, data)
+            if result.get("error_code") != 429 or attempt == self.max_retries:
+                return result
+            self.retries += 1
+            delay = result.get("retry_after") or backoff_delay(attempt, 1.0, 30.0)
+            logger.warning(f"Telegram rate limited chat {chat_id}, retrying in {delay}s")
+            await asyncio.sleep(delay)
+        return result
+
+    async def stop(self) -> None:
+        """停止所有發送工作，未發送的訊息回傳錯誤"""
+        workers = list(self._workers.values())
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for queue in self._queues.values():
+            for _, _, future, _ in queue:
+                if not future.done():
+                    future.set_result({"ok": False, "error": "Outbound scheduler stopped"})
+        self._queues.clear()
+        self.pending = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """回傳發送統計"""
+        return {
+            "pending": self.pending,
+            "active_chats": len(self._workers),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "latency": self.latency.snapshot()
+        }
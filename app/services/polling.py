@@ -0,0 +1,92 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+from app.core.config import get_settings
+from app.services.telegram import telegram_bot
+from app.utils.ratelimit import backoff_delay
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+UpdateHandler = Callable[[Dict], Awaitable[None]]
+
+
+class UpdatePoller:
+    """以 getUpdates long polling 取得更新，適用於 webhook 無法連入的部署環境"""
+
+    def __init__(self):
+        self.offset: Optional[int] = None
+        self._handler: Optional[UpdateHandler] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.updates = 0
+        self.errors = 0
+
+    async def _process_batch(self, updates: List[Dict]) -> None:
+        """依序將更新交給 handler；handler 只負責排入工作佇列，與 webhook 路徑相同不保證同一聊天室的完成順序"""
+        for update in updates:
+            try:
+                await self._handler(update)
+            except Exception as e:
+                logger.error(f"Error processing polled update {update.get('update_id')}: {str(e)}")
+
+    async def _run(self) -> None:
+        result = await telegram_bot.delete_webhook()
+        if not result.get("ok"):
+            logger.warning(f"Failed to delete webhook before polling: {result.get('error')}")
+
+        failures = 0
+        while True:
+            try:
+                result = await telegram_bot.get_updates(
+                    self.offset, settings.TELEGRAM_POLL_LIMIT, settings.TELEGRAM_POLL_TIMEOUT
+                )
+                if not result.get("ok"):
+                    self.errors += 1
+                    failures += 1
+                    await asyncio.sleep(backoff_delay(failures, 1.0, 30.0))
+                    continue
+
+                failures = 0
+                updates = result.get("result", [])
+                if not updates:
+                    continue
+
+                self.batches += 1
+                self.updates += len(updates)
+                # 先推進 offset，下次請求即向 Telegram 確認本批已收到
+                self.offset = max(update["update_id"] for update in updates) + 1
+                await self._process_batch(updates)
+            except Exception:
+                # 任何意外錯誤都不能結束 polling，否則持有 lease 的行程將不再接收更新
+                logger.exception("Error in polling loop")
+                self.errors += 1
+                failures += 1
+                await asyncio.sleep(backoff_delay(failures, 1.0, 30.0))
+
+    async def start(self, handler: UpdateHandler) -> None:
+        """啟動 long polling 迴圈"""
+        if self._task is None:
+            self._handler = handler
+            self._task = asyncio.create_task(self._run())
+            logger.info("Telegram long polling started")
+
+    async def stop(self) -> None:
+        """停止 long polling 迴圈"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """回傳 polling 統計"""
+        return {
+            "running": self._task is not None,
+            "offset": self.offset,
+            "batches": self.batches,
+            "updates": self.updates,
+            "errors": self.errors
+        }
+
+
+update_poller = UpdatePoller()
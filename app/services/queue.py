@@ -0,0 +1,199 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from collections import deque
+from dataclasses import dataclass, field
+import asyncio
+import logging
+import time
+from app.core.config import get_settings
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+QUEUE_WAIT = metrics.histogram(
+    "wallet_tracker_job_queue_wait_seconds",
+    "Time jobs spend waiting in the job queue",
+    ("job_type",)
+)
+RUN_TIME = metrics.histogram(
+    "wallet_tracker_job_run_seconds",
+    "Time spent running jobs",
+    ("job_type",)
+)
+
+JOB_WALLET_QUERY = "wallet_query"
+JOB_IMAGE = "image"
+JOB_AI_REPLY = "ai_reply"
+JOB_REPLY = "reply"
+
+
+@dataclass
+class Job:
+    job_type: str
+    func: Callable[..., Awaitable[Any]]
+    args: tuple
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class JobTypeStats:
+    submitted: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    run_seconds_total: float = 0.0
+    run_seconds_max: float = 0.0
+
+
+class JobQueue:
+    """有界的非同步工作佇列，依工作類型限制並行數量"""
+
+    def __init__(
+        self,
+        workers: int,
+        max_depth: int,
+        type_limits: Optional[Dict[str, int]] = None
+    ):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.type_limits = dict(type_limits or {})
+        self._pending: Dict[str, Deque[Job]] = {}
+        self._running: Dict[str, int] = {}
+        self._stats: Dict[str, JobTypeStats] = {}
+        self._order: List[str] = []
+        self._next = 0
+        self._changed: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    @property
+    def depth(self) -> int:
+        """目前排隊中的工作數"""
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    def _ensure_type(self, job_type: str) -> None:
+        if job_type not in self._pending:
+            self._pending[job_type] = deque()
+            self._running[job_type] = 0
+            self._stats[job_type] = JobTypeStats()
+            self._order.append(job_type)
+
+    def submit(self, job_type: str, func: Callable[..., Awaitable[Any]], *args: Any) -> bool:
+        """提交工作，佇列已滿時回傳 False"""
+        self._ensure_type(job_type)
+        stats = self._stats[job_type]
+        if self.depth >= self.max_depth:
+            stats.rejected += 1
+            logger.warning(f"Job queue full, rejecting {job_type} job")
+            return False
+
+        self._pending[job_type].append(Job(job_type, func, args))
+        stats.submitted += 1
+        if self._changed is not None:
+            self._changed.set()
+        return True
+
+    def _pop_runnable(self) -> Optional[Job]:
+        """以輪詢方式挑選尚未達到並行上限的工作類型"""
+        count = len(self._order)
+        for offset in range(count):
+            job_type = self._order[(self._next + offset) % count]
+            limit = self.type_limits.get(job_type, self.workers)
+            if self._pending[job_type] and self._running[job_type] < limit:
+                self._next = (self._next + offset + 1) % count
+                return self._pending[job_type].popleft()
+        return None
+
+    async def _worker(self) -> None:
+        while True:
+            job = self._pop_runnable()
+            if job is None:
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+
+            stats = self._stats[job.job_type]
+            started = time.monotonic()
+            wait = started - job.enqueued_at
+            stats.wait_seconds_total += wait
+            stats.wait_seconds_max = max(stats.wait_seconds_max, wait)
+            QUEUE_WAIT.labels(job.job_type).observe(wait)
+            self._running[job.job_type] += 1
+            try:
+                await job.func(*job.args)
+                stats.completed += 1
+            except asyncio.CancelledError:
+                if self._stopping:
+                    raise
+                # 工作內部被取消（例如共用的上游請求被取消）時只算失敗，worker 繼續執行
+                stats.failed += 1
+                logger.error(f"{job.job_type} job was cancelled")
+            except Exception as e:
+                stats.failed += 1
+                logger.error(f"Error running {job.job_type} job: {str(e)}")
+            finally:
+                elapsed = time.monotonic() - started
+                stats.run_seconds_total += elapsed
+                stats.run_seconds_max = max(stats.run_seconds_max, elapsed)
+                RUN_TIME.labels(job.job_type).observe(elapsed)
+                self._running[job.job_type] -= 1
+                self._changed.set()
+
+    async def start(self) -> None:
+        """啟動 worker"""
+        if self._tasks:
+            return
+        self._changed = asyncio.Event()
+        if self.depth:
+            self._changed.set()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} workers")
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """等待佇列清空（最多 timeout 秒）後停止 worker"""
+        if not self._tasks:
+            return
+        deadline = time.monotonic() + (timeout or 0)
+        while (self.depth or any(self._running.values())) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.depth:
+            logger.warning(f"Job queue stopped with {self.depth} pending jobs")
+
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._stopping = False
+
+    def stats(self) -> Dict[str, Any]:
+        """回傳佇列深度與各工作類型的延遲統計"""
+        types = {}
+        for job_type, stats in self._stats.items():
+            started = stats.completed + stats.failed
+            types[job_type] = {
+                "pending": len(self._pending[job_type]),
+                "running": self._running[job_type],
+                "submitted": stats.submitted,
+                "rejected": stats.rejected,
+                "completed": stats.completed,
+                "failed": stats.failed,
+                "wait_ms_avg": stats.wait_seconds_total / started * 1000 if started else 0.0,
+                "wait_ms_max": stats.wait_seconds_max * 1000,
+                "run_ms_avg": stats.run_seconds_total / started * 1000 if started else 0.0,
+                "run_ms_max": stats.run_seconds_max * 1000
+            }
+        return {"depth": self.depth, "max_depth": self.max_depth, "types": types}
+
+
+job_queue = JobQueue(
+    workers=settings.QUEUE_WORKERS,
+    max_depth=settings.QUEUE_MAX_DEPTH,
+    type_limits={
+        JOB_WALLET_QUERY: settings.QUEUE_WALLET_QUERY_CONCURRENCY,
+        JOB_IMAGE: settings.QUEUE_IMAGE_CONCURRENCY,
+        JOB_AI_REPLY: settings.QUEUE_AI_REPLY_CONCURRENCY
+    }
+)
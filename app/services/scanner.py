@@ -0,0 +1,479 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from app.core.config import get_settings
+from app.models.transaction import Transaction
+from app.utils.ratelimit import PRIORITY_BACKGROUND
+
+if TYPE_CHECKING:
+    from app.services.tronscan import TronScanAPI
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scanner_checkpoint (
+    contract TEXT PRIMARY KEY,
+    block_ts INTEGER NOT NULL,
+    block INTEGER,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scanner_wallets (
+    wallet_address TEXT PRIMARY KEY,
+    backfill_since INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scanner_transfers (
+    transaction_id TEXT PRIMARY KEY,
+    wallet_address TEXT NOT NULL,
+    block_ts INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scanner_transfers_wallet ON scanner_transfers (wallet_address);
+"""
+
+# 清理過期錢包與過舊轉帳的間隔（秒）
+SWEEP_INTERVAL = 60
+# 超過此時間仍未確認的轉帳不再重新查詢（秒）
+CONFIRMATION_WINDOW = 600
+
+
+@dataclass
+class TrackedWallet:
+    transfers: Dict[str, Transaction] = field(default_factory=dict)
+    expires_at: float = 0.0  # time.time()，可跨行程重啟比較
+    backfill_since: Optional[int] = None  # 已回補的最早時間戳（毫秒）
+    backfill: Optional[asyncio.Task] = None
+
+
+class BlockScanner:
+    """依時間順序掃描 USDT 合約的所有轉帳事件，以雜湊索引比對等待驗證的錢包
+
+    每輪只向上游查詢一段新的區塊範圍（以區塊時間界定），成本隨區塊內的轉帳量增加，
+    與索引中的錢包數量無關。錢包第一次查詢時以逐錢包查詢回補歷史，之後由事件流更新。
+    掃描進度、索引中的錢包與符合的轉帳保存在 SQLite，重啟後從檢查點接續。
+    """
+
+    def __init__(self, api: "TronScanAPI", db_path: Optional[str], contract: str):
+        self.api = api
+        self.db_path = db_path
+        self.contract = contract
+        self.checkpoint = 0  # 此時間戳（毫秒）之前的事件都已掃描
+        self.rescan_checkpoint = 0  # 此時間戳之前的事件都已再掃描一次
+        self.block: Optional[int] = None
+        self._wallets: Dict[str, TrackedWallet] = {}
+        self._dirty: Dict[str, TrackedWallet] = {}
+        # 區塊時間戳 -> 該區塊中未確認的符合轉帳 (收款地址, transaction_id)
+        self._unconfirmed: Dict[int, Set[Tuple[str, str]]] = {}
+        # 超過 CONFIRMATION_WINDOW 的區塊改以逐錢包查詢，記錄下次查詢的時間（毫秒）
+        self._reverify_at: Dict[int, float] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_sweep = 0.0
+        self.cycles = 0
+        self.pages = 0
+        self.events = 0
+        self.matched = 0
+        self.errors = 0
+        self.backfills = 0
+        self.rechecks = 0
+        self.rescans = 0
+        self.reverifies = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.TRONSCAN_INGESTION_MODE == "scanner"
+
+    @property
+    def lag(self) -> float:
+        """掃描進度落後現在的秒數"""
+        return max(0.0, time.time() - self.checkpoint / 1000)
+
+    @property
+    def serving(self) -> bool:
+        """掃描器正在執行且進度夠新時才由索引回答查詢"""
+        return self._task is not None and self.lag <= settings.SCANNER_MAX_LAG
+
+    def _open(self) -> None:
+        if not self.db_path or self._conn is not None:
+            return
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        logger.info(f"Block scanner state opened at {self.db_path}")
+
+    def _restore(self) -> None:
+        """載入檢查點與索引；檢查點過舊時捨棄，讓錢包重新回補"""
+        now = time.time()
+        self.checkpoint = self.rescan_checkpoint = int((now - settings.SCANNER_INDEX_LAG) * 1000)
+        self._open()
+        if self._conn is None:
+            return
+        with self._lock:
+            conn = self._conn
+            row = conn.execute(
+                "SELECT block_ts, block FROM scanner_checkpoint WHERE contract = ?", (self.contract,)
+            ).fetchone()
+            if row is None or now - row[0] / 1000 > settings.SCANNER_MAX_CATCHUP:
+                if row is not None:
+                    logger.warning("Block scanner checkpoint is too old, starting from the chain head")
+                with conn:
+                    conn.execute("DELETE FROM scanner_wallets")
+                    conn.execute("DELETE FROM scanner_transfers")
+                return
+            self.checkpoint, self.block = row
+            # 重啟前最後一段範圍可能還沒再掃描
+            self.rescan_checkpoint = self.checkpoint - int(settings.SCANNER_RESCAN_DELAY * 1000)
+            wallets = conn.execute(
+                "SELECT wallet_address, backfill_since, expires_at FROM scanner_wallets WHERE expires_at > ?",
+                (now,)
+            ).fetchall()
+            transfers = conn.execute(
+                "SELECT wallet_address, data FROM scanner_transfers"
+            ).fetchall()
+        for wallet_address, backfill_since, expires_at in wallets:
+            self._wallets[wallet_address] = TrackedWallet(
+                expires_at=expires_at, backfill_since=backfill_since
+            )
+        for wallet_address, data in transfers:
+            wallet = self._wallets.get(wallet_address)
+            if wallet is not None:
+                self._merge(wallet, Transaction.model_validate_json(data))
+        logger.info(f"Block scanner resumed at {self.checkpoint} with {len(self._wallets)} wallets")
+
+    def _save(
+        self,
+        checkpoint: int,
+        block: Optional[int],
+        wallet_rows: List[Tuple[str, int, float]],
+        transfer_rows: List[Tuple[str, str, int, str]],
+        removed: List[str]
+    ) -> None:
+        """以單一交易寫入檢查點、有變動的錢包與其轉帳"""
+        with self._lock:
+            conn = self._conn
+            with conn:
+                for wallet_address in removed:
+                    conn.execute("DELETE FROM scanner_wallets WHERE wallet_address = ?", (wallet_address,))
+                    conn.execute("DELETE FROM scanner_transfers WHERE wallet_address = ?", (wallet_address,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO scanner_checkpoint (contract, block_ts, block, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (self.contract, checkpoint, block, time.time())
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO scanner_wallets (wallet_address, backfill_since, expires_at) "
+                    "VALUES (?, ?, ?)",
+                    wallet_rows
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO scanner_transfers (transaction_id, wallet_address, block_ts, data) "
+                    "VALUES (?, ?, ?, ?)",
+                    transfer_rows
+                )
+
+    async def _persist(self, removed: List[str] = ()) -> None:
+        if self._conn is None:
+            return
+        dirty, self._dirty = self._dirty, {}
+        # 在事件迴圈上複製資料，背景執行緒寫入時索引可能仍在變動
+        wallets = [(address, wallet) for address, wallet in dirty.items() if wallet.backfill_since is not None]
+        wallet_rows = [(address, wallet.backfill_since, wallet.expires_at) for address, wallet in wallets]
+        transfer_rows = [
+            (tx.transaction_id, address, tx.block_ts, tx.model_dump_json())
+            for address, wallet in wallets
+            for tx in wallet.transfers.values()
+        ]
+        try:
+            await asyncio.to_thread(
+                self._save, self.checkpoint, self.block, wallet_rows, transfer_rows, list(removed)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error saving block scanner state: {str(e)}")
+
+    def _merge(self, wallet: TrackedWallet, tx: Transaction) -> bool:
+        """加入或更新一筆轉帳；已確認的版本不會被未確認的舊資料覆蓋"""
+        existing = wallet.transfers.get(tx.transaction_id)
+        if existing is not None and (existing.confirmed or not tx.confirmed):
+            return False
+        wallet.transfers[tx.transaction_id] = tx
+        if not tx.confirmed:
+            self._unconfirmed.setdefault(tx.block_ts, set()).add((tx.to_address, tx.transaction_id))
+        return True
+
+    def _still_unconfirmed(self, pending: Set[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        """過濾出索引中仍未確認的轉帳，錢包已移除的不再追蹤"""
+        remaining = set()
+        for wallet_address, transaction_id in pending:
+            wallet = self._wallets.get(wallet_address)
+            tx = wallet.transfers.get(transaction_id) if wallet is not None else None
+            if tx is not None and not tx.confirmed:
+                remaining.add((wallet_address, transaction_id))
+        return remaining
+
+    def _match(self, tx: Transaction) -> None:
+        # 只看收款地址：索引中的錢包都在等待轉入的款項
+        wallet = self._wallets.get(tx.to_address)
+        if wallet is None:
+            return
+        # 重新查詢與再掃描會再次看到相同的轉帳，只計算新的 transaction_id
+        new = tx.transaction_id not in wallet.transfers
+        if self._merge(wallet, tx):
+            if new:
+                self.matched += 1
+            self._dirty[tx.to_address] = wallet
+
+    async def _fetch_range(self, start: int, end: int) -> Tuple[int, bool, bool]:
+        """逐頁比對區間內的事件，回傳 (最後處理的時間戳, 是否已掃完, 是否失敗)"""
+        page_size = settings.SCANNER_PAGE_SIZE
+        last_ts = start
+        for page in range(settings.SCANNER_MAX_PAGES):
+            response = await self.api.get_contract_transfers(
+                self.contract, start, end, page_size, page * page_size, PRIORITY_BACKGROUND
+            )
+            if response.error:
+                self.errors += 1
+                logger.warning(f"Block scan failed: {response.error.get('message')}")
+                return last_ts, False, True
+            self.pages += 1
+            for tx in response.token_transfers:
+                self.events += 1
+                self._match(tx)
+                last_ts = tx.block_ts
+                if tx.block is not None:
+                    self.block = max(tx.block, self.block or 0)
+            if len(response.token_transfers) < page_size:
+                return last_ts, True, False
+        return last_ts, False, False
+
+    async def _scan_range(self, start: int, end: int) -> Tuple[int, bool]:
+        """掃描一段範圍，回傳 (新的檢查點, 是否受頁數限制尚未掃完)"""
+        last_ts, complete, failed = await self._fetch_range(start, end)
+        if complete:
+            return end, False
+        if last_ts > start:
+            # 檢查點含當下的時間戳，同一區塊剩餘的事件下一輪重新查詢，以 transaction_id 去重
+            return last_ts, not failed
+        if not failed:
+            logger.warning(f"Block at {start} has more transfers than one scan cycle, skipping the rest")
+            return start + 1, True
+        return start, False
+
+    async def scan_once(self) -> bool:
+        """掃描檢查點之後的一段區塊範圍，回傳 True 表示受頁數限制尚未追上"""
+        end = int((time.time() - settings.SCANNER_INDEX_LAG) * 1000)
+        start = self.checkpoint
+        if end <= start:
+            return False
+
+        self.cycles += 1
+        self.checkpoint, behind = await self._scan_range(start, end)
+        await self._persist()
+        return behind
+
+    async def rescan_once(self) -> None:
+        """以 SCANNER_RESCAN_DELAY 的延遲再掃描一次已掃過的範圍
+
+        上游建立索引的時間超過 SCANNER_INDEX_LAG 時，事件的時間戳已落在檢查點之前，
+        第一次掃描不會看到；第二次掃描以 transaction_id 去重，只補上遺漏的轉帳。
+        """
+        if settings.SCANNER_RESCAN_DELAY <= 0:
+            return
+        end = min(self.checkpoint, int((time.time() - settings.SCANNER_RESCAN_DELAY) * 1000))
+        start = self.rescan_checkpoint
+        if end <= start:
+            return
+
+        self.rescans += 1
+        matched = self.matched
+        self.rescan_checkpoint, _ = await self._scan_range(start, end)
+        if self.matched > matched:
+            logger.info(f"Block rescan found {self.matched - matched} late-indexed transfers")
+            await self._persist()
+
+    async def recheck_unconfirmed(self) -> None:
+        """重新查詢含未確認符合轉帳的區塊，事件流不會再次送出確認狀態的變更
+
+        每個區塊等待 SCANNER_CONFIRM_DELAY 後只查詢該區塊的時間戳，成本與區塊數有關，與錢包數無關。
+        區塊保留到其中的符合轉帳都已確認為止；超過 CONFIRMATION_WINDOW 的區塊（例如回補或重啟
+        載入的轉帳）改為每 SCANNER_CONFIRM_DELAY 以逐錢包查詢確認一次，直到轉帳超過保存期限被清除。
+        """
+        now = time.time() * 1000
+        due = sorted(
+            ts for ts in self._unconfirmed
+            if now >= self._reverify_at.get(ts, ts + settings.SCANNER_CONFIRM_DELAY * 1000)
+        )
+        stale: Dict[str, int] = {}  # 錢包 -> 最早的未確認區塊時間戳
+        for block_ts in due:
+            if now - block_ts > CONFIRMATION_WINDOW * 1000:
+                for wallet_address, _ in self._unconfirmed[block_ts]:
+                    stale[wallet_address] = min(block_ts, stale.get(wallet_address, block_ts))
+                continue
+            self.rechecks += 1
+            await self._fetch_range(block_ts, block_ts)
+        for wallet_address, since in stale.items():
+            await self._reverify(wallet_address, since)
+
+        for block_ts in due:
+            remaining = self._still_unconfirmed(self._unconfirmed[block_ts])
+            if remaining:
+                self._unconfirmed[block_ts] = remaining
+                if now - block_ts > CONFIRMATION_WINDOW * 1000:
+                    self._reverify_at[block_ts] = now + settings.SCANNER_CONFIRM_DELAY * 1000
+            else:
+                del self._unconfirmed[block_ts]
+                self._reverify_at.pop(block_ts, None)
+        if due:
+            await self._persist()
+
+    async def _reverify(self, wallet_address: str, since: int) -> None:
+        """以逐錢包查詢更新 since（毫秒）之後仍未確認的轉帳"""
+        if wallet_address not in self._wallets:
+            return
+        self.reverifies += 1
+        hours_ago = int((time.time() * 1000 - since) // 3_600_000) + 1
+        try:
+            async for tx in self.api.iter_trc20_transfers(
+                wallet_address, hours_ago=hours_ago, priority=PRIORITY_BACKGROUND, since=since, use_cache=False
+            ):
+                if tx.to_address == wallet_address:
+                    self._match(tx)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Reverifying unconfirmed transfers of {wallet_address} failed: {str(e)}")
+
+    def _window_start(self, hours_ago: int) -> int:
+        return int((time.time() - hours_ago * 3600) * 1000)
+
+    async def _backfill(self, wallet_address: str, wallet: TrackedWallet, hours_ago: int, priority: int) -> None:
+        """以逐錢包查詢取得加入索引前的轉帳；不經快取，避免與事件流之間出現空窗"""
+        self.backfills += 1
+        since = self._window_start(hours_ago)
+        transfers = [
+            tx async for tx in self.api.iter_trc20_transfers(
+                wallet_address, hours_ago=hours_ago, priority=priority, use_cache=False
+            )
+        ]
+        for tx in transfers:
+            if tx.to_address == wallet_address:
+                self._merge(wallet, tx)
+        wallet.backfill_since = since
+        self._dirty[wallet_address] = wallet
+
+    async def load(
+        self,
+        wallet_address: str,
+        hours_ago: int = 96,
+        priority: int = PRIORITY_BACKGROUND
+    ) -> List[Transaction]:
+        """回傳錢包時間窗口內轉入的轉帳，第一次查詢時加入索引並回補歷史"""
+        since = self._window_start(hours_ago)
+        wallet = self._wallets.get(wallet_address)
+        if wallet is None:
+            wallet = self._wallets[wallet_address] = TrackedWallet()
+        wallet.expires_at = time.time() + settings.SCANNER_TRACK_TTL
+
+        if wallet.backfill is None and (wallet.backfill_since is None or since < wallet.backfill_since):
+            wallet.backfill = asyncio.create_task(self._backfill(wallet_address, wallet, hours_ago, priority))
+        if wallet.backfill is not None:
+            task = wallet.backfill
+            try:
+                # shield：呼叫端被取消時回補仍繼續，供其他查詢共用
+                await asyncio.shield(task)
+            except Exception:
+                if self._wallets.get(wallet_address) is wallet and wallet.backfill_since is None:
+                    del self._wallets[wallet_address]
+                raise
+            finally:
+                if task.done() and wallet.backfill is task:
+                    wallet.backfill = None
+
+        return sorted(
+            (tx for tx in wallet.transfers.values() if tx.block_ts >= since),
+            key=lambda tx: tx.block_ts,
+            reverse=True
+        )
+
+    async def _sweep(self) -> None:
+        """移除過期的錢包與超過保存期限的轉帳"""
+        now = time.time()
+        cutoff = int((now - settings.TRANSACTION_RETENTION_HOURS * 3600) * 1000)
+        removed = []
+        for wallet_address, wallet in list(self._wallets.items()):
+            if wallet.expires_at <= now and wallet.backfill is None:
+                del self._wallets[wallet_address]
+                self._dirty.pop(wallet_address, None)
+                removed.append(wallet_address)
+                continue
+            old = [tx_id for tx_id, tx in wallet.transfers.items() if tx.block_ts < cutoff]
+            for tx_id in old:
+                del wallet.transfers[tx_id]
+            if old:
+                # 重寫整個錢包的轉帳
+                removed.append(wallet_address)
+                self._dirty[wallet_address] = wallet
+        await self._persist(removed)
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            behind = False
+            try:
+                behind = await self.scan_once()
+                await self.rescan_once()
+                await self.recheck_unconfirmed()
+                if started - self._last_sweep >= SWEEP_INTERVAL:
+                    self._last_sweep = started
+                    await self._sweep()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error in block scanner: {str(e)}")
+            if not behind:
+                await asyncio.sleep(max(0.0, settings.SCANNER_INTERVAL - (time.monotonic() - started)))
+
+    async def start(self) -> None:
+        """載入檢查點並開始掃描，未啟用 scanner 模式時不做任何事"""
+        if not self.enabled or self._task is not None:
+            return
+        await asyncio.to_thread(self._restore)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Block scanner started for contract {self.contract}")
+
+    async def stop(self) -> None:
+        """停止掃描並保存進度"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            await self._persist()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """回傳掃描統計"""
+        return {
+            "enabled": self.enabled,
+            "serving": self.serving,
+            "checkpoint": self.checkpoint,
+            "block": self.block,
+            "lag_seconds": round(self.lag, 3) if self._task is not None else None,
+            "wallets": len(self._wallets),
+            "cycles": self.cycles,
+            "pages": self.pages,
+            "events": self.events,
+            "matched": self.matched,
+            "errors": self.errors,
+            "backfills": self.backfills,
+            "rechecks": self.rechecks,
+            "rescans": self.rescans,
+            "reverifies": self.reverifies,
+            "unconfirmed_blocks": len(self._unconfirmed)
+        }
@@ -0,0 +1,307 @@
+from typing import Awaitable, Callable, Dict, Optional, Union
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from app.core.config import get_settings
+from app.utils.ratelimit import PRIORITY_BACKGROUND, TokenBucket
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (expires_at);
+CREATE TABLE IF NOT EXISTS seen_updates (
+    update_id INTEGER PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_seen_updates_at ON seen_updates (seen_at);
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# 閒置超過此時間的 per-chat 限流紀錄可以刪除（此時額度必定已補滿）
+BUCKET_IDLE_SECONDS = 3600
+# 已處理更新的保留時間，Telegram 不會重送超過此時間的更新
+SEEN_UPDATE_RETENTION = 24 * 3600
+
+
+class SharedState:
+    """多個 worker 行程共用的本地狀態（SQLite WAL）：快取、已處理更新、限流額度與租約
+
+    所有時間使用 time.time()，因為 monotonic 時鐘在不同行程之間無法比較。
+    """
+
+    def __init__(self, db_path: Optional[str], prune_interval: float):
+        self.db_path = db_path
+        self.prune_interval = prune_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._lease_tasks: Dict[str, asyncio.Task] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rate_limit_waits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path)
+
+    def start(self) -> None:
+        """開啟資料庫並建立資料表"""
+        if not self.enabled or self._conn is not None:
+            return
+        self._conn = sqlite3.connect(
+            self.db_path, isolation_level=None, timeout=5.0, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        logger.info(f"Shared state opened at {self.db_path} ({self.owner})")
+
+    async def close(self) -> None:
+        """停止租約並關閉資料庫"""
+        for name in list(self._lease_tasks):
+            await self.stop_lease(name)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.start()
+        return self._conn
+
+    def _cache_get(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _cache_set(self, namespace: str, key: str, value: Union[bytes, str], ttl: float) -> None:
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (namespace, key, value, time.time() + ttl)
+            )
+
+    def _prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM seen_updates WHERE seen_at < ?", (now - SEEN_UPDATE_RETENTION,))
+            conn.execute("DELETE FROM rate_buckets WHERE updated_at < ?", (now - BUCKET_IDLE_SECONDS,))
+
+    async def _maybe_prune(self) -> None:
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self._last_prune = time.monotonic()
+            await asyncio.to_thread(self._prune)
+
+    async def cache_get(self, namespace: str, key: str) -> Optional[bytes]:
+        """讀取共用快取，不存在或已過期時回傳 None"""
+        value = await asyncio.to_thread(self._cache_get, namespace, key)
+        if value is None:
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+        return value
+
+    async def cache_set(self, namespace: str, key: str, value: Union[bytes, str], ttl: float) -> None:
+        """寫入共用快取"""
+        await asyncio.to_thread(self._cache_set, namespace, key, value, ttl)
+        await self._maybe_prune()
+
+    def _claim_update(self, update_id: int) -> bool:
+        with self._lock:
+            cursor = self._connection().execute(
+                "INSERT OR IGNORE INTO seen_updates (update_id, seen_at) VALUES (?, ?)",
+                (update_id, time.time())
+            )
+        return cursor.rowcount == 1
+
+    async def claim_update(self, update_id: int) -> bool:
+        """登記 update_id，回傳 True 表示本行程是第一個處理者"""
+        return await asyncio.to_thread(self._claim_update, update_id)
+
+    def _release_update(self, update_id: int) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM seen_updates WHERE update_id = ?", (update_id,))
+
+    async def release_update(self, update_id: int) -> None:
+        """撤銷 update_id 的登記，讓重送的更新可以再被處理"""
+        await asyncio.to_thread(self._release_update, update_id)
+
+    def _take_token(self, name: str, rate: float, capacity: int) -> float:
+        """以交易原子地補充並取出一個 token，成功回傳 0，否則回傳需等待的秒數"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM rate_buckets WHERE name = ?", (name,)
+                ).fetchone()
+                tokens = float(capacity) if row is None else min(
+                    capacity, row[0] + max(0.0, now - row[1]) * rate
+                )
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (name, tokens, now)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def take_token(self, name: str, rate: float, capacity: int) -> float:
+        """向共用限流額度取得 token，回傳 0 表示成功，否則為建議等待秒數"""
+        return await asyncio.to_thread(self._take_token, name, rate, capacity)
+
+    def _acquire_lease(self, name: str, ttl: float) -> bool:
+        with self._lock:
+            conn = self._connection()
+            now = time.time()
+            cursor = conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at <= ?",
+                (name, self.owner, now + ttl, now)
+            )
+        return cursor.rowcount == 1
+
+    def _release_lease(self, name: str) -> None:
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner)
+            )
+
+    def start_lease(
+        self,
+        name: str,
+        ttl: float,
+        on_acquired: Callable[[], Awaitable[None]],
+        on_lost: Callable[[], Awaitable[None]]
+    ) -> None:
+        """在背景競爭具名租約：只有持有者執行 on_acquired，持有者失效後由其他 worker 接手"""
+        if name not in self._lease_tasks:
+            self._lease_tasks[name] = asyncio.create_task(
+                self._hold_lease(name, ttl, on_acquired, on_lost)
+            )
+
+    async def stop_lease(self, name: str) -> None:
+        """停止競爭租約，持有中則釋放"""
+        task = self._lease_tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _hold_lease(
+        self,
+        name: str,
+        ttl: float,
+        on_acquired: Callable[[], Awaitable[None]],
+        on_lost: Callable[[], Awaitable[None]]
+    ) -> None:
+        held = False
+        try:
+            while True:
+                try:
+                    acquired = await asyncio.to_thread(self._acquire_lease, name, ttl)
+                except sqlite3.Error as e:
+                    logger.error(f"Error renewing lease {name}: {str(e)}")
+                    acquired = False
+                if acquired and not held:
+                    logger.info(f"Acquired lease {name} as {self.owner}")
+                    await on_acquired()
+                elif held and not acquired:
+                    logger.warning(f"Lost lease {name}")
+                    await on_lost()
+                held = acquired
+                # 在租約到期前續約
+                await asyncio.sleep(ttl / 3)
+        finally:
+            if held:
+                await on_lost()
+                await asyncio.to_thread(self._release_lease, name)
+
+    def stats(self) -> Dict[str, object]:
+        """回傳共用狀態統計"""
+        return {
+            "enabled": self.enabled,
+            "owner": self.owner,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "rate_limit_waits": self.rate_limit_waits,
+            "leases": sorted(self._lease_tasks)
+        }
+
+
+class SharedTokenBucket:
+    """跨 worker 共用額度的限流器：先以本地 TokenBucket 維持優先權順序，再向共用狀態取得 token"""
+
+    def __init__(self, state: SharedState, name: str, rate: float, capacity: int):
+        self.state = state
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._local = TokenBucket(rate, capacity)
+
+    async def acquire(self, priority: int = PRIORITY_BACKGROUND) -> None:
+        """取得一個 token，共用額度不足時等待其他 worker 釋出"""
+        await self._local.acquire(priority)
+        while True:
+            wait = await self.state.take_token(self.name, self.rate, self.capacity)
+            if wait <= 0:
+                return
+            self.state.rate_limit_waits += 1
+            await asyncio.sleep(wait)
+
+    @property
+    def waiting(self) -> int:
+        return self._local.waiting
+
+
+Limiter = Union[TokenBucket, SharedTokenBucket]
+
+
+def create_limiter(name: str, rate: float, capacity: int) -> Limiter:
+    """啟用共用狀態時回傳跨 worker 的限流器，否則回傳行程內的 TokenBucket"""
+    if shared_state.enabled:
+        return SharedTokenBucket(shared_state, name, rate, capacity)
+    return TokenBucket(rate, capacity)
+
+
+shared_state = SharedState(
+    db_path=settings.SHARED_STATE_PATH,
+    prune_interval=settings.SHARED_STATE_PRUNE_INTERVAL
+)
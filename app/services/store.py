@@ -0,0 +1,182 @@
+from typing import List, Optional
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from app.core.config import get_settings
+from app.models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    transaction_id TEXT PRIMARY KEY,
+    block_ts INTEGER NOT NULL,
+    from_address TEXT NOT NULL,
+    to_address TEXT NOT NULL,
+    confirmed INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transfers_to ON transfers (to_address, block_ts);
+CREATE INDEX IF NOT EXISTS idx_transfers_from ON transfers (from_address, block_ts);
+CREATE INDEX IF NOT EXISTS idx_transfers_ts ON transfers (block_ts);
+CREATE TABLE IF NOT EXISTS wallet_sync (
+    wallet_address TEXT PRIMARY KEY,
+    high_water_ts INTEGER NOT NULL,
+    synced_at INTEGER NOT NULL
+);
+"""
+
+
+class TransactionStore:
+    """本地 SQLite 交易資料庫，記錄每個錢包的同步進度以進行增量同步"""
+
+    def __init__(self, db_path: Optional[str], retention_hours: int, sync_lag: int):
+        self.db_path = db_path
+        self.retention_ms = retention_hours * 3600 * 1000
+        self.sync_lag_ms = sync_lag * 1000
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path)
+
+    def start(self) -> None:
+        """開啟資料庫並建立資料表"""
+        if not self.enabled or self._conn is not None:
+            return
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        logger.info(f"Transaction store opened at {self.db_path}")
+
+    def close(self) -> None:
+        """關閉資料庫"""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.start()
+        return self._conn
+
+    def _sync_since(self, wallet_address: str) -> Optional[int]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT high_water_ts FROM wallet_sync WHERE wallet_address = ?",
+                (wallet_address,)
+            ).fetchone()
+            if row is None:
+                return None
+            # 尚未確認的交易需要重新查詢以更新狀態
+            pending = conn.execute(
+                "SELECT MIN(block_ts) FROM transfers "
+                "WHERE (to_address = ? OR from_address = ?) AND confirmed = 0",
+                (wallet_address, wallet_address)
+            ).fetchone()[0]
+        return min(row[0], pending) if pending is not None else row[0]
+
+    def _save(
+        self,
+        wallet_address: str,
+        transfers: List[Transaction],
+        synced_at: int,
+        complete: bool
+    ) -> None:
+        rows = [
+            (
+                tx.transaction_id,
+                tx.block_ts,
+                tx.from_address,
+                tx.to_address,
+                int(tx.confirmed),
+                tx.model_dump_json()
+            )
+            for tx in transfers
+        ]
+        # 保留索引延遲的緩衝，下次同步會重新查詢這段時間
+        high_water_ts = synced_at - self.sync_lag_ms
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO transfers "
+                    "(transaction_id, block_ts, from_address, to_address, confirmed, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(transaction_id) DO UPDATE SET "
+                    "confirmed = excluded.confirmed, data = excluded.data",
+                    rows
+                )
+                if not complete:
+                    # 查詢被分頁上限截斷時，較舊的轉帳可能還沒取得，同步進度維持不變
+                    conn.execute(
+                        "UPDATE wallet_sync SET synced_at = ? WHERE wallet_address = ?",
+                        (synced_at, wallet_address)
+                    )
+                    return
+                conn.execute(
+                    "INSERT INTO wallet_sync (wallet_address, high_water_ts, synced_at) "
+                    "VALUES (?, ?, ?) "
+                    "ON CONFLICT(wallet_address) DO UPDATE SET "
+                    "high_water_ts = MAX(high_water_ts, excluded.high_water_ts), "
+                    "synced_at = excluded.synced_at",
+                    (wallet_address, high_water_ts, synced_at)
+                )
+
+    def _load(self, wallet_address: str, since: int) -> List[Transaction]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT data FROM transfers "
+                "WHERE (to_address = ? OR from_address = ?) AND block_ts >= ? "
+                "ORDER BY block_ts DESC",
+                (wallet_address, wallet_address, since)
+            ).fetchall()
+        return [Transaction.model_validate_json(data) for (data,) in rows]
+
+    def _prune(self) -> None:
+        cutoff = int(time.time() * 1000) - self.retention_ms
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                removed = conn.execute(
+                    "DELETE FROM transfers WHERE block_ts < ?", (cutoff,)
+                ).rowcount
+                conn.execute("DELETE FROM wallet_sync WHERE synced_at < ?", (cutoff,))
+        if removed:
+            logger.info(f"Pruned {removed} transfers older than retention window")
+
+    async def sync_since(self, wallet_address: str) -> Optional[int]:
+        """回傳下次增量同步的起始時間戳，從未同步過則回傳 None"""
+        return await asyncio.to_thread(self._sync_since, wallet_address)
+
+    async def save(
+        self,
+        wallet_address: str,
+        transfers: List[Transaction],
+        synced_at: int,
+        complete: bool = True
+    ) -> None:
+        """批次寫入轉帳並更新同步進度，complete 為 False 表示結果不完整、不推進進度；必要時清理過期資料"""
+        await asyncio.to_thread(self._save, wallet_address, transfers, synced_at, complete)
+        if time.monotonic() - self._last_prune >= settings.TRANSACTION_PRUNE_INTERVAL:
+            self._last_prune = time.monotonic()
+            await asyncio.to_thread(self._prune)
+
+    async def load(self, wallet_address: str, since: int) -> List[Transaction]:
+        """讀取錢包在指定時間之後的轉帳，依時間由新到舊排序"""
+        return await asyncio.to_thread(self._load, wallet_address, since)
+
+
+transaction_store = TransactionStore(
+    db_path=settings.TRANSACTION_STORE_PATH,
+    retention_hours=settings.TRANSACTION_RETENTION_HOURS,
+    sync_lag=settings.TRANSACTION_SYNC_LAG
+)
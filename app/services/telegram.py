@@ -1,31 +1,95 @@
-from typing import Optional, Union, Dict
+from typing import Optional, Union, Dict, List
+from decimal import Decimal
 import aiohttp
+import json
 import logging
+import re
+import time
 from app.core.config import get_settings
 from app.models.telegram import TelegramMessage
+from app.services.outbound import OutboundScheduler
+from app.utils import fastjson
+from app.utils.helpers import create_client_session
+from app.utils.metrics import observe_upstream
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+AMOUNT_PATTERN = re.compile(r"^\d+(\.\d+)?$")
+
 class TelegramBot:
     def __init__(self):
         self.token = settings.TELEGRAM_BOT_TOKEN
-        self.api_base = f"https://api.telegram.org/bot{self.token}"
+        self.api_base = f"{settings.TELEGRAM_API_BASE_URL}/bot{self.token}"
+        self.file_base = f"{settings.TELEGRAM_API_BASE_URL}/file/bot{self.token}"
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.outbound = OutboundScheduler(
+            self._make_request,
+            global_rate=settings.TELEGRAM_GLOBAL_RATE,
+            chat_rate=settings.TELEGRAM_CHAT_RATE,
+            group_rate=settings.TELEGRAM_GROUP_RATE,
+            chat_burst=settings.TELEGRAM_CHAT_BURST,
+            max_buffer=settings.TELEGRAM_SEND_BUFFER,
+            max_retries=settings.TELEGRAM_SEND_MAX_RETRIES
+        )
+
+    async def start(self) -> None:
+        """建立共用的 HTTP session"""
+        if self._session is None or self._session.closed:
+            self._session = create_client_session(settings.TELEGRAM_POOL_SIZE)
+
+    async def close(self) -> None:
+        """停止發送排程並關閉共用的 HTTP session"""
+        await self.outbound.stop()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """取得共用 session，若尚未啟動則自動建立"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
 
-    async def _make_request(self, method: str, data: Dict) -> Dict:
-        """發送請求到 Telegram API"""
+    async def _make_request(
+        self,
+        method: str,
+        data: Dict,
+        timeout: Optional[aiohttp.ClientTimeout] = None,
+        observe_latency: bool = True
+    ) -> Dict:
+        """發送請求到 Telegram API；long polling 請求的耗時主要是等待時間，不計入延遲統計"""
         url = f"{self.api_base}/{method}"
+        started = time.perf_counter()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=data) as response:
-                    if response.status != 200:
-                        logger.error(f"Telegram API error: {response.status} - {await response.text()}")
-                        return {"ok": False, "error": f"API request failed with status {response.status}"}
-                    return await response.json()
+            session = await self._get_session()
+            async with session.post(url, json=data, timeout=timeout) as response:
+                observe_upstream("telegram", response.status, started, latency=observe_latency)
+                if response.status != 200:
+                    body = await response.text()
+                    logger.error(f"Telegram API error: {response.status} - {body}")
+                    result = {
+                        "ok": False,
+                        "error": f"API request failed with status {response.status}",
+                        "error_code": response.status
+                    }
+                    if response.status == 429:
+                        result["retry_after"] = self._parse_retry_after(body)
+                    return result
+                return await response.json(loads=fastjson.loads)
         except Exception as e:
+            observe_upstream("telegram", "error", started, latency=observe_latency)
             logger.error(f"Error making request to Telegram API: {str(e)}")
             return {"ok": False, "error": str(e)}
 
+    @staticmethod
+    def _parse_retry_after(body: str) -> Optional[float]:
+        """從 429 回應中取出 retry_after 秒數"""
+        try:
+            return json.loads(body).get("parameters", {}).get("retry_after")
+        except (ValueError, AttributeError):
+            return None
+
     async def send_message(
         self,
         chat_id: Union[int, str],
@@ -36,13 +100,32 @@ class TelegramBot:
         """發送文本消息"""
         data = {
             "chat_id": chat_id,
-            "text": text,
-            "parse_mode": parse_mode
+            "text": text
         }
+        if parse_mode:
+            data["parse_mode"] = parse_mode
         if reply_to_message_id:
             data["reply_to_message_id"] = reply_to_message_id
             
-        return await self._make_request("sendMessage", data)
+        return await self.outbound.submit(chat_id, "sendMessage", data)
+
+    async def edit_message(
+        self,
+        chat_id: Union[int, str],
+        message_id: int,
+        text: str,
+        parse_mode: Optional[str] = None
+    ) -> Dict:
+        """編輯已發送的文本消息"""
+        data = {
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "text": text
+        }
+        if parse_mode:
+            data["parse_mode"] = parse_mode
+
+        return await self.outbound.submit(chat_id, "editMessageText", data)
 
     async def send_sticker(
         self,
@@ -58,13 +141,52 @@ class TelegramBot:
         if reply_to_message_id:
             data["reply_to_message_id"] = reply_to_message_id
             
-        return await self._make_request("sendSticker", data)
+        return await self.outbound.submit(chat_id, "sendSticker", data)
+
+    async def get_updates(self, offset: Optional[int], limit: int, timeout: int) -> Dict:
+        """以 long polling 取得更新"""
+        data = {"limit": limit, "timeout": timeout, "allowed_updates": ["message"]}
+        if offset is not None:
+            data["offset"] = offset
+        # 請求需等待到 Telegram 的 long polling 逾時，因此另設較長的超時
+        request_timeout = aiohttp.ClientTimeout(
+            total=timeout + settings.HTTP_TOTAL_TIMEOUT,
+            connect=settings.HTTP_CONNECT_TIMEOUT
+        )
+        return await self._make_request(
+            "getUpdates", data, timeout=request_timeout, observe_latency=False
+        )
+
+    async def delete_webhook(self) -> Dict:
+        """移除 webhook，long polling 模式需先移除才能呼叫 getUpdates"""
+        return await self._make_request("deleteWebhook", {"drop_pending_updates": False})
+
+    async def get_file(self, file_id: str) -> Dict:
+        """取得檔案資訊（包含下載路徑）"""
+        return await self._make_request("getFile", {"file_id": file_id})
 
-    def parse_wallet_query(self, message_text: str) -> Optional[Dict[str, str]]:
+    async def download_file(self, file_path: str, max_bytes: Optional[int] = None) -> bytearray:
+        """以串流方式下載檔案，超過大小上限時中止；直接回傳緩衝區，不另外複製一份 bytes"""
+        max_bytes = max_bytes or settings.TELEGRAM_MAX_DOWNLOAD_BYTES
+        session = await self._get_session()
+        async with session.get(f"{self.file_base}/{file_path}") as response:
+            if response.status != 200:
+                raise ValueError(f"File download failed with status {response.status}")
+            if response.content_length and response.content_length > max_bytes:
+                raise ValueError(f"File too large: {response.content_length} bytes")
+
+            data = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                data.extend(chunk)
+                if len(data) > max_bytes:
+                    raise ValueError(f"File exceeds {max_bytes} bytes")
+            return data
+
+    def parse_wallet_query(self, message_text: str, keyword: str = "查收") -> Optional[Dict[str, str]]:
         """解析查詢錢包的消息"""
         try:
             lines = message_text.strip().split('\n')
-            if len(lines) < 2 or "查收" not in lines[0]:
+            if len(lines) < 2 or keyword not in lines[0]:
                 return None
 
             wallet_address = lines[1].strip()
@@ -78,6 +200,27 @@ class TelegramBot:
             logger.error(f"Error parsing wallet query: {str(e)}")
             return None
 
+    def parse_wallet_batch(self, message_text: str, keyword: str = "查收") -> Optional[List[Dict]]:
+        """解析批次查詢，每組可寫成「地址 金額」同一行，或地址與金額分行"""
+        lines = message_text.strip().split('\n')
+        if len(lines) < 2 or keyword not in lines[0]:
+            return None
+
+        tokens = [token for line in lines[1:] for token in re.split(r"[\s,，]+", line.strip()) if token]
+        queries = []
+        position = 0
+        while position < len(tokens):
+            wallet_address = tokens[position]
+            if AMOUNT_PATTERN.match(wallet_address):
+                return None
+            amount = None
+            if position + 1 < len(tokens) and AMOUNT_PATTERN.match(tokens[position + 1]):
+                amount = Decimal(tokens[position + 1])
+                position += 1
+            queries.append({"wallet_address": wallet_address, "amount": amount})
+            position += 1
+        return queries or None
+
     async def handle_message(self, message: TelegramMessage) -> None:
         """處理接收到的消息"""
         if not message.text:
@@ -1,13 +1,34 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Container, List, Tuple
+import asyncio
 import aiohttp
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
 from app.core.config import get_settings
-from app.models.transaction import TransactionResponse
+from app.models.transaction import Transaction, TransactionResponse
+from app.services.matcher import Amount, TransferIndex
+from app.services.scanner import BlockScanner
+from app.services.store import transaction_store
+from app.utils import fastjson
+from app.utils.helpers import create_client_session
+from app.utils.metrics import observe_upstream
+from app.utils.cache import TTLCache
+from app.services.shared_state import create_limiter, shared_state
+from app.utils.ratelimit import PRIORITY_INTERACTIVE, backoff_delay, parse_retry_after
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# 可重試的 HTTP 狀態碼
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class TronScanAPIError(Exception):
+    """TronScan API 回傳錯誤"""
+
+    def __init__(self, error: Dict):
+        super().__init__(error.get("message", "Unknown error"))
+        self.error = error
+
 class TronScanAPI:
     def __init__(self):
         self.base_url = settings.TRONSCAN_API_BASE_URL
@@ -24,73 +45,379 @@ class TronScanAPI:
             "TRON-PRO-API-KEY": self.api_key,
             "Cache-Control": "no-cache"
         }
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.cache = TTLCache(
+            maxsize=settings.TRONSCAN_CACHE_MAXSIZE,
+            ttl=settings.TRONSCAN_CACHE_TTL
+        )
+        self.limiter = create_limiter(
+            "tronscan", settings.TRONSCAN_RATE_LIMIT, settings.TRONSCAN_RATE_BURST
+        )
+        self.scanner = BlockScanner(self, settings.SCANNER_STATE_PATH, settings.USDT_CONTRACT_ADDRESS)
+
+    async def start(self) -> None:
+        """建立共用的 HTTP session"""
+        if self._session is None or self._session.closed:
+            self._session = create_client_session(settings.TRONSCAN_POOL_SIZE, self.headers)
 
-    async def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Dict:
-        """發送 HTTP 請求到 TronScan API"""
+    async def close(self) -> None:
+        """關閉共用的 HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """取得共用 session，若尚未啟動則自動建立"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def _make_request(
+        self,
+        endpoint: str,
+        params: Dict[str, Any],
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Dict:
+        """發送 HTTP 請求到 TronScan API，遇到 429/5xx、連線錯誤或逾時時以指數退避重試"""
         url = f"{self.base_url}/{endpoint}"
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, headers=self.headers) as response:
-                    if response.status != 200:
+        max_retries = settings.TRONSCAN_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            retry_after = None
+            started = time.perf_counter()
+            try:
+                await self.limiter.acquire(priority)
+                session = await self._get_session()
+                started = time.perf_counter()
+                async with session.get(url, params=params) as response:
+                    observe_upstream("tronscan", response.status, started)
+                    if response.status == 200:
+                        return await response.json(loads=fastjson.loads)
+                    if response.status not in RETRYABLE_STATUSES or attempt == max_retries:
                         logger.error(f"TronScan API error: {response.status} - {await response.text()}")
                         return {"error": {"message": f"API request failed with status {response.status}"}}
-                    return await response.json()
-        except Exception as e:
-            logger.error(f"Error making request to TronScan API: {str(e)}")
-            return {"error": {"message": f"API request failed: {str(e)}"}}
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    logger.warning(f"TronScan API returned {response.status}, retrying ({attempt + 1}/{max_retries})")
+            except aiohttp.ContentTypeError as e:
+                # 非 JSON 回應（例如 HTML 錯誤頁）重試也不會改變結果，直接失敗
+                logger.error(f"TronScan API returned non-JSON response: {e.message}")
+                return {"error": {"message": f"API request failed: unexpected response ({e.message})"}}
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                # 只有連線錯誤與逾時值得重試，其餘錯誤直接失敗
+                observe_upstream("tronscan", "error", started)
+                if attempt == max_retries:
+                    logger.error(f"Error making request to TronScan API: {str(e)}")
+                    return {"error": {"message": f"API request failed: {str(e)}"}}
+                logger.warning(f"TronScan API request failed: {str(e)}, retrying ({attempt + 1}/{max_retries})")
+            except Exception as e:
+                logger.error(f"Error making request to TronScan API: {str(e)}")
+                return {"error": {"message": f"API request failed: {str(e)}"}}
+
+            if retry_after is None:
+                retry_after = backoff_delay(
+                    attempt, settings.TRONSCAN_BACKOFF_BASE, settings.TRONSCAN_BACKOFF_MAX
+                )
+            await asyncio.sleep(min(retry_after, settings.TRONSCAN_BACKOFF_MAX))
+
+    def _window_end(self) -> int:
+        """計算查詢窗口的結束時間戳（毫秒）"""
+        ttl = settings.TRONSCAN_CACHE_TTL
+        if ttl <= 0:
+            return int(time.time() * 1000)
+        # 以 TTL 為單位對齊結束時間，同一時間桶內的相同查詢共用快取
+        bucket = int(time.time() // ttl)
+        return (bucket + 1) * ttl * 1000
+
+    @staticmethod
+    def _window_start(end_timestamp: int, hours_ago: int) -> int:
+        return end_timestamp - int(timedelta(hours=hours_ago).total_seconds() * 1000)
 
     async def get_trc20_transfers(
         self,
         wallet_address: str,
         limit: int = 20,
-        hours_ago: int = 96
+        hours_ago: int = 96,
+        start: int = 0,
+        priority: int = PRIORITY_INTERACTIVE
     ) -> TransactionResponse:
         """獲取指定錢包的 TRC20 代幣轉帳記錄"""
-        start_timestamp = int((datetime.now() - timedelta(hours=hours_ago)).timestamp() * 1000)
-        end_timestamp = int(datetime.now().timestamp() * 1000)
+        end_timestamp = self._window_end()
+        start_timestamp = self._window_start(end_timestamp, hours_ago)
+        return await self._get_page(
+            wallet_address, limit, start, start_timestamp, end_timestamp, priority
+        )
+
+    async def iter_trc20_transfers(
+        self,
+        wallet_address: str,
+        page_size: Optional[int] = None,
+        hours_ago: int = 96,
+        max_pages: Optional[int] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        since: Optional[int] = None,
+        use_cache: bool = True
+    ) -> AsyncIterator[Transaction]:
+        """逐頁串流 TRC20 轉帳記錄，掃描當前頁時預先抓取下一頁
+
+        指定 since（毫秒時間戳）時只查詢該時間之後的轉帳；use_cache 為 False 時一律向上游查詢。
+        """
+        page_size = page_size or settings.TRONSCAN_PAGE_SIZE
+        max_pages = max_pages or settings.TRONSCAN_MAX_PAGES
+        # 所有分頁使用同一個時間窗口，避免翻頁途中新交易造成位移
+        end_timestamp = self._window_end()
+        start_timestamp = self._window_start(end_timestamp, hours_ago)
+        if since is not None:
+            start_timestamp = max(start_timestamp, since)
+
+        def fetch(page: int) -> asyncio.Task:
+            return asyncio.create_task(self._get_page(
+                wallet_address, page_size, page * page_size, start_timestamp, end_timestamp, priority,
+                use_cache
+            ))
 
+        page = 0
+        pending = fetch(page)
+        try:
+            while pending is not None:
+                response = await pending
+                pending = None
+                if response.error:
+                    raise TronScanAPIError(response.error)
+
+                fetched = (page + 1) * page_size
+                has_more = (
+                    len(response.token_transfers) == page_size
+                    and fetched < response.total
+                    and page + 1 < max_pages
+                )
+                if has_more:
+                    page += 1
+                    pending = fetch(page)
+
+                for tx in response.token_transfers:
+                    yield tx
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def _get_page(
+        self,
+        wallet_address: str,
+        limit: int,
+        start: int,
+        start_timestamp: int,
+        end_timestamp: int,
+        priority: int = PRIORITY_INTERACTIVE,
+        use_cache: bool = True
+    ) -> TransactionResponse:
+        """取得單頁轉帳記錄，啟用快取時經由 TTL 快取；多 worker 時再經由共用快取"""
+        if settings.TRONSCAN_CACHE_TTL <= 0 or not use_cache:
+            return await self._fetch_trc20_transfers(
+                wallet_address, limit, start, start_timestamp, end_timestamp, priority
+            )
+
+        key = (wallet_address, start_timestamp, end_timestamp, limit, start)
+
+        async def fetch():
+            shared_key = ":".join(map(str, key))
+            if shared_state.enabled:
+                cached = await shared_state.cache_get("tronscan", shared_key)
+                if cached is not None:
+                    return TransactionResponse.model_validate_json(cached)
+            response = await self._fetch_trc20_transfers(
+                wallet_address, limit, start, start_timestamp, end_timestamp, priority
+            )
+            if shared_state.enabled and response.error is None:
+                await shared_state.cache_set(
+                    "tronscan", shared_key, response.model_dump_json(), settings.TRONSCAN_CACHE_TTL
+                )
+            return response
+
+        return await self.cache.get_or_fetch(
+            key,
+            fetch,
+            should_cache=lambda response: response.error is None
+        )
+
+    async def _fetch_trc20_transfers(
+        self,
+        wallet_address: str,
+        limit: int,
+        start: int,
+        start_timestamp: int,
+        end_timestamp: int,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> TransactionResponse:
+        """向 TronScan 查詢 TRC20 轉帳記錄"""
         params = {
             "limit": limit,
-            "start": 0,
+            "start": start,
             "sort": "-timestamp",
-            "count": True,
+            "count": "true",
             "relatedAddress": wallet_address,
             "start_timestamp": start_timestamp,
             "end_timestamp": end_timestamp
         }
 
-        result = await self._make_request("filter/trc20/transfers", params)
+        result = await self._make_request("filter/trc20/transfers", params, priority)
+        return TransactionResponse(**result)
+
+    async def get_contract_transfers(
+        self,
+        contract_address: str,
+        start_timestamp: int,
+        end_timestamp: int,
+        limit: int,
+        start: int = 0,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> TransactionResponse:
+        """依時間由舊到新查詢代幣合約在區間內的所有轉帳事件，供區塊掃描使用"""
+        params = {
+            "limit": limit,
+            "start": start,
+            "sort": "timestamp",
+            "contract_address": contract_address,
+            "start_timestamp": start_timestamp,
+            "end_timestamp": end_timestamp
+        }
+
+        result = await self._make_request("token_trc20/transfers", params, priority)
         return TransactionResponse(**result)
 
+    async def sync_wallet(
+        self,
+        wallet_address: str,
+        hours_ago: int = 96,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> List[Transaction]:
+        """增量同步錢包轉帳到本地資料庫，並回傳時間窗口內的所有轉帳"""
+        since = await transaction_store.sync_since(wallet_address)
+        synced_at = int(time.time() * 1000)
+        transfers = [
+            tx async for tx in self.iter_trc20_transfers(
+                wallet_address, hours_ago=hours_ago, priority=priority, since=since
+            )
+        ]
+        # 取滿分頁上限時結果可能被截斷（由新到舊排序，缺的是較舊的轉帳），不推進同步進度
+        complete = len(transfers) < settings.TRONSCAN_MAX_PAGES * settings.TRONSCAN_PAGE_SIZE
+        await transaction_store.save(wallet_address, transfers, synced_at, complete)
+
+        window_start = self._window_start(synced_at, hours_ago)
+        return await transaction_store.load(wallet_address, window_start)
+
+    async def load_transfers(
+        self,
+        wallet_address: str,
+        hours_ago: int = 96,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> List[Transaction]:
+        """取得錢包時間窗口內的所有轉帳，啟用本地資料庫時走增量同步
+
+        區塊掃描運作中時改由其索引回答，只包含轉入本錢包的轉帳。
+        """
+        if self.scanner.serving:
+            return await self.scanner.load(wallet_address, hours_ago, priority)
+        if transaction_store.enabled:
+            return await self.sync_wallet(wallet_address, hours_ago, priority)
+        return [
+            tx async for tx in self.iter_trc20_transfers(
+                wallet_address, hours_ago=hours_ago, priority=priority
+            )
+        ]
+
+    def transfer_index(self, wallet_address: str, token_decimals: int = 6) -> TransferIndex:
+        """建立只收錄轉入本錢包 USDT 的金額索引"""
+        return TransferIndex(
+            wallet_address,
+            token_id=settings.USDT_CONTRACT_ADDRESS,
+            tolerance=settings.VERIFY_AMOUNT_TOLERANCE,
+            token_decimals=token_decimals
+        )
+
     async def verify_transaction(
         self,
         wallet_address: str,
-        expected_amount: float,
+        expected_amount: Amount,
         token_decimals: int = 6,  # USDT 默認小數位數
-        hours_ago: int = 96
+        hours_ago: int = 96,
+        priority: int = PRIORITY_INTERACTIVE
     ) -> Optional[Dict]:
         """驗證特定金額的交易是否存在"""
-        transfers = await self.get_trc20_transfers(wallet_address, hours_ago=hours_ago)
-        
-        if transfers.error:
-            return {"verified": False, "error": transfers.error}
-            
-        if transfers.total == 0:
+        index = self.transfer_index(wallet_address, token_decimals)
+
+        if self.scanner.serving or transaction_store.enabled:
+            try:
+                transfers = await self.load_transfers(wallet_address, hours_ago, priority)
+            except TronScanAPIError as e:
+                return {"verified": False, "error": e.error}
+            return self.match_result(index.extend(transfers), expected_amount)
+
+        try:
+            # 逐筆加入索引，找到符合的交易即停止翻頁
+            async for tx in self.iter_trc20_transfers(
+                wallet_address, hours_ago=hours_ago, priority=priority
+            ):
+                if index.add(tx) and index.find(expected_amount) is not None:
+                    break
+        except TronScanAPIError as e:
+            return {"verified": False, "error": e.error}
+
+        return self.match_result(index, expected_amount)
+
+    async def verify_transactions(
+        self,
+        queries: List[Tuple[str, Amount]],
+        token_decimals: int = 6,
+        hours_ago: int = 96,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> List[Dict]:
+        """批次驗證多組 (錢包, 金額)，相同錢包只查詢一次，結果順序與輸入相同"""
+        semaphore = asyncio.Semaphore(settings.BATCH_VERIFY_CONCURRENCY)
+        wallets = list(dict.fromkeys(wallet_address for wallet_address, _ in queries))
+
+        async def load(wallet_address: str):
+            async with semaphore:
+                try:
+                    transfers = await self.load_transfers(wallet_address, hours_ago, priority)
+                except TronScanAPIError as e:
+                    return e.error
+            return self.transfer_index(wallet_address, token_decimals).extend(transfers)
+
+        loaded = dict(zip(wallets, await asyncio.gather(*(load(w) for w in wallets))))
+
+        results = []
+        claimed = set()
+        for wallet_address, expected_amount in queries:
+            index = loaded[wallet_address]
+            if not isinstance(index, TransferIndex):
+                results.append({"verified": False, "error": index})
+                continue
+            # 同一筆交易只能對應一組查詢
+            result = self.match_result(index, expected_amount, exclude=claimed)
+            if result["verified"]:
+                claimed.add(result["transaction"]["transaction_id"])
+            results.append(result)
+        return results
+
+    @staticmethod
+    def match_result(
+        index: TransferIndex,
+        expected_amount: Amount,
+        exclude: Container[str] = ()
+    ) -> Dict:
+        """從金額索引中查詢並組成驗證結果"""
+        if not len(index):
             return {"verified": False, "reason": "No transactions found"}
 
-        # 轉換期望金額為代幣數量（考慮小數位數）
-        expected_quantity = expected_amount * (10 ** token_decimals)
-        
-        # 檢查交易
-        for tx in transfers.token_transfers:
-            tx_amount = float(tx.quant) / (10 ** tx.tokenInfo.tokenDecimal)
-            if abs(tx_amount - expected_amount) <= 2:  # 允許 2 個單位的誤差
-                return {
-                    "verified": True,
-                    "transaction": tx.dict(),
-                    "formatted_amount": tx_amount
-                }
-
-        return {"verified": False, "reason": "No matching transaction found"}
-
-tronscan_api = TronScanAPI()
\ No newline at end of file
+        match = index.find(expected_amount, exclude)
+        if match is None:
+            return {"verified": False, "reason": "No matching transaction found"}
+
+        tx, amount = match
+        return {
+            "verified": True,
+            "transaction": tx.dict(),
+            "formatted_amount": amount
+        }
+
+tronscan_api = TronScanAPI()
+block_scanner = tronscan_api.scanner
\ No newline at end of file
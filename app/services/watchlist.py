@@ -0,0 +1,252 @@
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from dataclasses import dataclass, field
+from decimal import Decimal
+import asyncio
+import heapq
+import logging
+import time
+from app.core.config import get_settings
+from app.services.matcher import Amount, TransferIndex, to_decimal
+from app.services.telegram import telegram_bot
+from app.services.tronscan import TronScanAPIError, tronscan_api
+from app.utils.ratelimit import PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ChatId = Union[int, str]
+
+
+@dataclass
+class Watch:
+    chat_id: ChatId
+    expected_amount: Decimal
+    created_at: float = field(default_factory=time.monotonic)
+    transaction_id: Optional[str] = None
+
+
+@dataclass
+class WatchedWallet:
+    watches: List[Watch] = field(default_factory=list)
+    registered_at: float = field(default_factory=time.monotonic)
+    next_poll_at: float = 0.0
+
+
+class WalletWatchlist:
+    """錢包監控清單：單一排程任務分批輪詢，相同錢包的多個監控共用一次查詢
+
+    監控只保存在本行程的記憶體中，不經由共用狀態協調，因此不支援多 worker（WORKERS > 1）。
+    """
+
+    def __init__(self):
+        self._wallets: Dict[str, WatchedWallet] = {}
+        self._schedule: List[Tuple[float, str]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.polls = 0
+        self.matches = 0
+        self.expired = 0
+
+    @property
+    def watch_count(self) -> int:
+        return sum(len(wallet.watches) for wallet in self._wallets.values())
+
+    def _schedule_poll(self, wallet_address: str, when: float) -> None:
+        self._wallets[wallet_address].next_poll_at = when
+        heapq.heappush(self._schedule, (when, wallet_address))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _poll_interval(self, wallet: WatchedWallet) -> float:
+        """剛註冊時快速輪詢，之後每經過一段時間間隔加倍"""
+        age = time.monotonic() - wallet.registered_at
+        interval = settings.WATCH_MIN_INTERVAL * 2 ** int(age // settings.WATCH_BACKOFF_AGE)
+        return min(settings.WATCH_MAX_INTERVAL, interval)
+
+    def add(self, chat_id: ChatId, wallet_address: str, expected_amount: Amount) -> Optional[str]:
+        """新增監控，失敗時回傳錯誤訊息"""
+        expected_amount = to_decimal(expected_amount)
+        wallet = self._wallets.get(wallet_address)
+        chat_watches = sum(
+            1 for state in self._wallets.values() for watch in state.watches if watch.chat_id == chat_id
+        )
+        if chat_watches >= settings.WATCH_MAX_PER_CHAT:
+            return f"每個聊天室最多同時監控 {settings.WATCH_MAX_PER_CHAT} 筆"
+        if wallet is None and len(self._wallets) >= settings.WATCH_MAX_WALLETS:
+            return "目前監控數量已達上限，請稍後再試"
+        if wallet is not None and any(
+            watch.chat_id == chat_id and watch.expected_amount == expected_amount
+            for watch in wallet.watches
+        ):
+            return "此錢包與金額已在監控中"
+
+        if wallet is None:
+            wallet = self._wallets[wallet_address] = WatchedWallet()
+        # 有新的監控時重新從最快的輪詢頻率開始
+        wallet.registered_at = time.monotonic()
+        wallet.watches.append(Watch(chat_id, expected_amount))
+        self._ensure_running()
+        self._schedule_poll(wallet_address, time.monotonic())
+        return None
+
+    def remove(self, chat_id: ChatId, wallet_address: str) -> int:
+        """移除聊天室對指定錢包的所有監控，回傳移除數量"""
+        wallet = self._wallets.get(wallet_address)
+        if wallet is None:
+            return 0
+        before = len(wallet.watches)
+        wallet.watches = [watch for watch in wallet.watches if watch.chat_id != chat_id]
+        if not wallet.watches:
+            del self._wallets[wallet_address]
+        return before - len(wallet.watches)
+
+    async def _notify(self, chat_id: ChatId, text: str) -> None:
+        result = await telegram_bot.send_message(chat_id, text)
+        if not result.get("ok"):
+            logger.error(f"Failed to notify chat {chat_id}: {result.get('error')}")
+
+    async def _poll(self, wallet_address: str) -> None:
+        """查詢一個錢包並檢查其所有監控"""
+        self.polls += 1
+        started = time.monotonic()
+        try:
+            transfers = await tronscan_api.load_transfers(
+                wallet_address, priority=PRIORITY_BACKGROUND
+            )
+        except TronScanAPIError as e:
+            logger.warning(f"Watch poll failed for {wallet_address}: {e.error.get('message')}")
+            transfers = None
+        except Exception as e:
+            logger.error(f"Error polling watched wallet {wallet_address}: {str(e)}")
+            transfers = None
+
+        wallet = self._wallets.get(wallet_address)
+        if wallet is None:
+            return
+
+        index = tronscan_api.transfer_index(wallet_address).extend(transfers or [])
+        finished = []
+        for watch in list(wallet.watches):
+            done = False
+            if transfers is not None:
+                done = await self._check(wallet_address, watch, index)
+            if not done and started - watch.created_at >= settings.WATCH_TTL:
+                self.expired += 1
+                await self._notify(
+                    watch.chat_id,
+                    f"⌛ 監控已逾時，未找到符合的交易\n\n"
+                    f"📥 錢包地址: {wallet_address}\n"
+                    f"💰 金額: {watch.expected_amount} USDT"
+                )
+                done = True
+            if done:
+                finished.append(watch)
+
+        # 通知期間可能有新的監控加入或錢包被移除，需重新讀取狀態
+        wallet = self._wallets.get(wallet_address)
+        if wallet is None:
+            return
+        wallet.watches = [watch for watch in wallet.watches if all(watch is not f for f in finished)]
+        if not wallet.watches:
+            del self._wallets[wallet_address]
+            return
+        if wallet.next_poll_at <= started:
+            self._schedule_poll(wallet_address, time.monotonic() + self._poll_interval(wallet))
+
+    async def _check(self, wallet_address: str, watch: Watch, index: TransferIndex) -> bool:
+        """檢查單一監控，交易已確認時回傳 True 表示監控結束"""
+        match = index.find(watch.expected_amount)
+        if match is None:
+            return False
+
+        tx, amount = match
+        link = f"https://tronscan.org/#/transaction/{tx.transaction_id}"
+        if tx.confirmed:
+            self.matches += 1
+            await self._notify(
+                watch.chat_id,
+                f"✅ 監控的交易已確認！\n\n"
+                f"💰 金額: {amount:.2f} USDT\n"
+                f"📱 發送地址: {tx.from_address}\n"
+                f"📥 接收地址: {tx.to_address}\n"
+                f"🔗 查看交易: {link}"
+            )
+            return True
+
+        # 找到尚未確認的交易時先通知一次，繼續監控直到確認
+        if watch.transaction_id != tx.transaction_id:
+            watch.transaction_id = tx.transaction_id
+            await self._notify(
+                watch.chat_id,
+                f"⏳ 已找到符合的交易，等待確認中\n\n"
+                f"💰 金額: {amount:.2f} USDT\n"
+                f"📥 接收地址: {tx.to_address}\n"
+                f"🔗 查看交易: {link}"
+            )
+        return False
+
+    def _due_wallets(self, now: float) -> List[str]:
+        """取出到期的錢包，略過已被重新排程或已移除的舊紀錄"""
+        due: List[str] = []
+        seen: Set[str] = set()
+        while self._schedule and self._schedule[0][0] <= now and len(due) < settings.WATCH_BATCH_SIZE:
+            when, wallet_address = heapq.heappop(self._schedule)
+            wallet = self._wallets.get(wallet_address)
+            if wallet is None or wallet.next_poll_at != when or wallet_address in seen:
+                continue
+            seen.add(wallet_address)
+            due.append(wallet_address)
+        return due
+
+    async def _poll_safely(self, wallet_address: str) -> None:
+        """輪詢單一錢包，發生未預期的錯誤時記錄並重新排程，不中止排程任務"""
+        try:
+            await self._poll(wallet_address)
+        except Exception:
+            logger.exception(f"Unexpected error polling watched wallet {wallet_address}")
+            wallet = self._wallets.get(wallet_address)
+            if wallet is not None:
+                self._schedule_poll(wallet_address, time.monotonic() + self._poll_interval(wallet))
+
+    async def _run(self) -> None:
+        while True:
+            due = self._due_wallets(time.monotonic())
+            if due:
+                await asyncio.gather(*(self._poll_safely(wallet_address) for wallet_address in due))
+                continue
+
+            self._wakeup.clear()
+            timeout = self._schedule[0][0] - time.monotonic() if self._schedule else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _ensure_running(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def start(self) -> None:
+        """啟動輪詢排程；新增監控時也會自動啟動"""
+        self._ensure_running()
+
+    async def stop(self) -> None:
+        """停止輪詢排程"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """回傳監控統計"""
+        return {
+            "wallets": len(self._wallets),
+            "watches": self.watch_count,
+            "polls": self.polls,
+            "matches": self.matches,
+            "expired": self.expired
+        }
+
+
+wallet_watchlist = WalletWatchlist()
@@ -0,0 +1,91 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import time
+
+
+class TTLCache:
+    """具 TTL 與 LRU 淘汰機制的記憶體快取，並合併相同 key 的並行請求"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """讀取快取，過期則視為未命中"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """寫入快取，超過容量時淘汰最久未使用的項目"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = lambda value: True
+    ) -> Any:
+        """命中則直接回傳；否則只發出一次 fetch，其他並行呼叫共用結果"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        # fetch 在獨立的 task 中執行：發起者被取消時不影響其他共用結果的呼叫
+        task = asyncio.create_task(self._fetch(key, fetch, should_cache))
+        # 避免沒有其他等待者時出現 "exception was never retrieved"
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool]
+    ) -> Any:
+        try:
+            value = await fetch()
+            if should_cache(value):
+                self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        """清空快取"""
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """回傳快取統計數據"""
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced
+        }
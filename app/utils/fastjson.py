@@ -0,0 +1,23 @@
+from typing import Any, Union
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson 為選用套件，未安裝時使用標準函式庫
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """解析 JSON，可直接接受 bytes 避免先解碼成字串"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """序列化為 UTF-8 編碼的 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
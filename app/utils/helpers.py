@@ -0,0 +1,44 @@
+from typing import Dict, List, Optional
+import aiohttp
+from app.core.config import get_settings
+
+
+def create_client_session(
+    pool_size: int,
+    headers: Optional[Dict[str, str]] = None
+) -> aiohttp.ClientSession:
+    """建立長連線的 aiohttp session，連線池大小與超時設定取自 Settings"""
+    settings = get_settings()
+    connector = aiohttp.TCPConnector(
+        limit=pool_size,
+        limit_per_host=pool_size,
+        ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=settings.HTTP_TOTAL_TIMEOUT,
+        connect=settings.HTTP_CONNECT_TIMEOUT,
+        sock_read=settings.HTTP_READ_TIMEOUT
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers)
+
+
+def chunk_text(text: str, limit: int = 4096) -> List[str]:
+    """依行切割長訊息，使每段不超過 Telegram 的長度限制"""
+    chunks: List[str] = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            chunks.append(current)
+            candidate = line
+        current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,48 @@
+from typing import Dict, List, Optional
+from functools import lru_cache
+import base64
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _load_pil():
+    """第一次縮圖時才匯入 Pillow；Pillow 為選用套件，未安裝時回傳 None 並略過縮圖"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+def select_photo_size(photos: List[Dict], target_size: int, max_bytes: int) -> Optional[Dict]:
+    """選擇最長邊不小於 target_size 的最小尺寸，皆不足時取最大且不超過大小上限的尺寸"""
+    candidates = [
+        photo for photo in photos
+        if photo.get("file_size") is None or photo["file_size"] <= max_bytes
+    ]
+    if not candidates:
+        return None
+    candidates.sort(key=lambda photo: max(photo.get("width", 0), photo.get("height", 0)))
+    for photo in candidates:
+        if max(photo.get("width", 0), photo.get("height", 0)) >= target_size:
+            return photo
+    return candidates[-1]
+
+
+def encode_image(image_data: bytes, target_size: int, quality: int = 85) -> str:
+    """將圖片縮小到 target_size 後轉為 base64（阻塞操作，請於執行緒中呼叫）"""
+    Image = _load_pil()
+    if Image is not None:
+        try:
+            with Image.open(io.BytesIO(image_data)) as image:
+                if max(image.size) > target_size:
+                    image.thumbnail((target_size, target_size))
+                    buffer = io.BytesIO()
+                    image.convert("RGB").save(buffer, format="JPEG", quality=quality)
+                    image_data = buffer.getvalue()
+        except Exception as e:
+            logger.warning(f"Failed to downscale image, sending original: {str(e)}")
+    return base64.b64encode(image_data).decode()
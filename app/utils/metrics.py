@@ -0,0 +1,184 @@
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+import bisect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 預設延遲分桶（秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Histogram:
+    """固定分桶的延遲直方圖"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """記錄一筆觀測值"""
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> Dict[str, int]:
+        """回傳累積分桶計數（le -> count）"""
+        result = {}
+        total = 0
+        for bound, count in zip(self.buckets, self._counts):
+            total += count
+            result[str(bound)] = total
+        result["+Inf"] = self.count
+        return result
+
+    def snapshot(self) -> Dict:
+        """回傳直方圖快照"""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": self.cumulative()
+        }
+
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class LabeledHistogram:
+    """依標籤分組的直方圖"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self._children: Dict[LabelValues, Histogram] = {}
+
+    def labels(self, *values: str) -> Histogram:
+        """取得指定標籤值的直方圖"""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = Histogram(self.buckets)
+        return child
+
+    def observe(self, value: float) -> None:
+        """記錄無標籤的觀測值"""
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for values, histogram in self._children.items():
+            for bound, count in histogram.cumulative().items():
+                labels = _format_labels(self.labelnames, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {histogram.sum}")
+            lines.append(f"{self.name}_count{labels} {histogram.count}")
+        return lines
+
+
+class Gauge:
+    """於輸出時才從回呼函式取值的指標"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+                 metric_type: str = "gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+        self.metric_type = metric_type
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        for values, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """集中管理指標並輸出 Prometheus 文字格式"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Union[LabeledHistogram, Gauge]] = {}
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> LabeledHistogram:
+        """註冊（或取得已註冊的）直方圖"""
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = LabeledHistogram(name, help_text, labelnames, buckets)
+        return metric
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str],
+              collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+              metric_type: str = "gauge") -> Gauge:
+        """註冊由回呼函式提供數值的指標；累計值請指定 metric_type="counter" """
+        metric = self._metrics[name] = Gauge(name, help_text, labelnames, collect, metric_type)
+        return metric
+
+    def render(self) -> str:
+        """輸出所有指標"""
+        lines: List[str] = []
+        # 收集時可能延遲載入服務並註冊新指標，先複製一份再迭代
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logger.error(f"Error collecting metric {metric.name}: {str(e)}")
+        return "\n".join(lines) + "\n"
+
+
+class UpstreamHealth:
+    """記錄各上游服務最近一次請求結果，供健康檢查使用"""
+
+    def __init__(self):
+        self._state: Dict[str, Dict] = {}
+
+    def record(self, upstream: str, ok: bool) -> None:
+        state = self._state.setdefault(
+            upstream, {"last_ok": None, "last_error": None, "consecutive_failures": 0}
+        )
+        if ok:
+            state["last_ok"] = time.time()
+            state["consecutive_failures"] = 0
+        else:
+            state["last_error"] = time.time()
+            state["consecutive_failures"] += 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {upstream: dict(state) for upstream, state in self._state.items()}
+
+
+metrics = MetricsRegistry()
+upstream_health = UpstreamHealth()
+
+UPSTREAM_LATENCY = metrics.histogram(
+    "wallet_tracker_upstream_request_duration_seconds",
+    "Latency of requests to upstream APIs",
+    ("upstream", "status")
+)
+
+
+def observe_upstream(
+    upstream: str,
+    status: Union[int, str],
+    started: float,
+    latency: bool = True
+) -> None:
+    """記錄一次上游請求的延遲與結果，started 為 time.perf_counter() 的值；latency=False 時只記錄結果"""
+    if latency:
+        UPSTREAM_LATENCY.labels(upstream, str(status)).observe(time.perf_counter() - started)
+    upstream_health.record(upstream, status == 200 or status == "ok")
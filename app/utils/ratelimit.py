@@ -0,0 +1,98 @@
+from typing import List, Optional, Tuple
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import heapq
+import itertools
+import random
+import time
+
+# 數字越小優先權越高
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class TokenBucket:
+    """支援優先權的非同步 token bucket 限流器"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: int = PRIORITY_BACKGROUND) -> None:
+        """取得一個 token，不足時依優先權排隊等待"""
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # token 已分配但呼叫端被取消時歸還
+            if future.done() and not future.cancelled():
+                self._tokens = min(self.capacity, self._tokens + 1)
+                self._dispatch()
+            raise
+
+    def _dispatch(self) -> None:
+        """依優先權喚醒等待者，token 不足時排程下一次喚醒"""
+        self._refill()
+        while self._waiters:
+            _, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._tokens < 1:
+                break
+            heapq.heappop(self._waiters)
+            self._tokens -= 1
+            future.set_result(None)
+
+        if self._waiters and self._wakeup is None:
+            delay = max(0.0, (1 - self._tokens) / self.rate)
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    @property
+    def waiting(self) -> int:
+        """目前排隊中的請求數"""
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """計算帶 full jitter 的指數退避時間"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 標頭（秒數或 HTTP 日期）"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
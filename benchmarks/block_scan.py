@@ -0,0 +1,192 @@
+"""區塊掃描與逐錢包查詢的上游成本比較
+
+以 TronScan 模擬伺服器重播區塊紀錄（每個錢包有一筆歷史轉帳與一筆之後才出塊的付款），
+每輪對所有錢包呼叫 verify_transactions，直到所有付款都出塊並被驗證：
+- wallet：每輪每個錢包各查詢一次 relatedAddress（TRONSCAN_INGESTION_MODE=wallet）
+- scanner：區塊掃描每個區塊範圍查詢一次合約事件，錢包只在第一次查詢時回補歷史
+
+每種配置在獨立子行程中執行，以環境變數設定應用程式。預設停用 TronScan 快取，
+對應監控輪詢間隔大於快取 TTL 的情境，可用 --env TRONSCAN_CACHE_TTL=30 改變。
+
+用法：
+    python -m benchmarks.block_scan
+    python -m benchmarks.block_scan --wallets 10 --wallets 100 --wallets 1000 --events-per-block 100
+    python -m benchmarks.block_scan --fixture recorded_blocks.json --modes scanner
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import ROOT_DIR, format_seconds, print_summary, summarize, write_results
+from benchmarks.stubs import BlockFeed, StubProfile, TronScanStub, load_blocks, record_blocks
+
+
+def child_environment(args: argparse.Namespace, mode: str, stub_url: str, workdir: str) -> Dict[str, str]:
+    """設定必須在匯入應用程式模組之前寫入環境變數"""
+    block_interval = args.block_interval_ms / 1000
+    env = {
+        "TELEGRAM_BOT_TOKEN": "bench-token",
+        "TELEGRAM_WEBHOOK_URL": "http://127.0.0.1/webhook/telegram",
+        "TRONSCAN_API_KEY": "bench",
+        "OPENAI_API_KEY": "bench",
+        "TRONSCAN_API_BASE_URL": f"{stub_url}/api",
+        "TRONSCAN_INGESTION_MODE": mode,
+        "TRONSCAN_CACHE_TTL": "0",
+        "TRONSCAN_RATE_LIMIT": "10000",
+        "TRONSCAN_RATE_BURST": "10000",
+        "TRANSACTION_STORE_PATH": "",
+        "SCANNER_STATE_PATH": os.path.join(workdir, "scanner.db"),
+        "SCANNER_INTERVAL": str(block_interval),
+        "SCANNER_INDEX_LAG": str(block_interval / 2),
+        "SCANNER_CONFIRM_DELAY": str(block_interval * args.confirm_blocks),
+        "LOG_FILE": ""
+    }
+    env.update(dict(pair.split("=", 1) for pair in args.env))
+    return env
+
+
+async def run_child(args: argparse.Namespace) -> Dict[str, Any]:
+    fixture = load_blocks(args.fixture)
+    payments = fixture["payments"]
+    feed = BlockFeed(fixture, confirm_blocks=args.confirm_blocks)
+    stub = TronScanStub(StubProfile(latency=args.latency, jitter=args.latency / 4), feed=feed)
+    await stub.start()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.update(child_environment(args, args.mode, stub.url, workdir))
+        from app.services.tronscan import tronscan_api
+
+        await tronscan_api.scanner.start()
+        queries = [(wallet_address, payment["amount"]) for wallet_address, payment in payments.items()]
+        last_offset = max(block["offset_ms"] for block in fixture["blocks"]) / 1000
+        deadline = time.monotonic() + last_offset + args.block_interval_ms / 1000 * 4
+        rounds = []
+        try:
+            while True:
+                requests_before = stub.requests
+                started = time.perf_counter()
+                results = await tronscan_api.verify_transactions(queries)
+                rounds.append({
+                    "seconds": time.perf_counter() - started,
+                    "requests": stub.requests - requests_before,
+                    "verified": sum(1 for result in results if result["verified"]),
+                    "errors": sum(1 for result in results if "error" in result)
+                })
+                if rounds[-1]["verified"] == len(queries) or time.monotonic() >= deadline:
+                    break
+                await asyncio.sleep(args.poll_interval)
+        finally:
+            scanner_stats = tronscan_api.scanner.stats()
+            await tronscan_api.scanner.stop()
+            await tronscan_api.close()
+            await stub.stop()
+
+    return {
+        "mode": args.mode,
+        "wallets": len(queries),
+        "rounds": len(rounds),
+        "verified": rounds[-1]["verified"],
+        "round_requests": summarize([r["requests"] for r in rounds]),
+        "round_seconds": summarize([r["seconds"] for r in rounds]),
+        "upstream_requests": stub.requests,
+        "endpoints": stub.stats()["endpoints"],
+        "scanner": scanner_stats
+    }
+
+
+def run_config(args: argparse.Namespace, mode: str, fixture_path: str) -> Dict[str, Any]:
+    """在子行程執行一種配置，結果以 JSON 由標準輸出傳回"""
+    command = [
+        sys.executable, "-m", "benchmarks.block_scan", "--child",
+        "--mode", mode, "--fixture", fixture_path,
+        "--block-interval-ms", str(args.block_interval_ms),
+        "--poll-interval", str(args.poll_interval),
+        "--latency", str(args.latency),
+        "--confirm-blocks", str(args.confirm_blocks)
+    ]
+    for pair in args.env:
+        command += ["--env", pair]
+    process = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True, timeout=args.timeout)
+    if process.returncode != 0:
+        raise RuntimeError(f"{mode} run failed:\n{process.stderr[-2000:]}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for wallets in args.wallets:
+            if args.fixture:
+                fixture_path = args.fixture
+            else:
+                fixture = record_blocks(
+                    [f"TWallet{index:027d}" for index in range(wallets)],
+                    history_blocks=args.history_blocks,
+                    live_blocks=args.live_blocks,
+                    events_per_block=args.events_per_block,
+                    block_interval_ms=args.block_interval_ms,
+                    seed=args.seed
+                )
+                fixture_path = os.path.join(workdir, f"blocks-{wallets}.json")
+                with open(fixture_path, "w") as f:
+                    json.dump(fixture, f)
+            for mode in args.modes:
+                result = run_config(args, mode, fixture_path)
+                results[f"{mode}_{result['wallets']}"] = result
+    return results
+
+
+def report(results: Dict[str, Any]) -> None:
+    rows = [["config", "verified", "rounds", "req/round p50", "req/round max", "total req", "round p50"]]
+    for name, result in results.items():
+        rows.append([
+            name,
+            f"{result['verified']}/{result['wallets']}",
+            str(result["rounds"]),
+            f"{result['round_requests']['p50']:.0f}",
+            f"{result['round_requests']['max']:.0f}",
+            str(result["upstream_requests"]),
+            format_seconds(result["round_seconds"]["p50"])
+        ])
+    print_summary("Upstream cost of verifying pending payments", rows)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wallets", type=int, action="append", help="wallet count, repeatable (default 10, 100)")
+    parser.add_argument("--modes", nargs="+", default=["wallet", "scanner"], choices=("wallet", "scanner"))
+    parser.add_argument("--fixture", help="recorded block fixture (JSON) instead of generated blocks")
+    parser.add_argument("--history-blocks", type=int, default=100)
+    parser.add_argument("--live-blocks", type=int, default=20)
+    parser.add_argument("--events-per-block", type=int, default=50)
+    parser.add_argument("--block-interval-ms", type=int, default=500, help="replay speed, mainnet is 3000")
+    parser.add_argument("--confirm-blocks", type=int, default=19, help="blocks until a transfer is confirmed")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between verification rounds")
+    parser.add_argument("--latency", type=float, default=0.01, help="stub latency in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--env", action="append", default=[], help="extra app setting, KEY=VALUE")
+    parser.add_argument("--output", help="result file path, default benchmarks/results/")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_child(args))))
+        return
+
+    args.wallets = args.wallets or [10, 100]
+    results = run(args)
+    report(results)
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "child", "mode")}
+    path = write_results("block_scan", config, results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""基準測試共用工具：百分位數統計、記憶體讀取與結果輸出"""
+from typing import Any, Dict, List, Optional, Sequence
+from datetime import datetime, timezone
+from pathlib import Path
+import json
+import math
+import platform
+import subprocess
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT_DIR / "benchmarks" / "results"
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """以 nearest-rank 計算百分位數，資料為空時回傳 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def summarize(values: Sequence[float]) -> Dict[str, Any]:
+    """計算延遲分佈摘要（秒）"""
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None
+    }
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, Optional[int]]:
+    """讀取行程的目前與峰值 RSS（bytes），僅支援 Linux /proc"""
+    status_path = Path(f"/proc/{pid or 'self'}/status")
+    memory: Dict[str, Optional[int]] = {"rss_bytes": None, "peak_rss_bytes": None}
+    try:
+        for line in status_path.read_text().splitlines():
+            key, _, value = line.partition(":")
+            if key == "VmRSS":
+                memory["rss_bytes"] = int(value.split()[0]) * 1024
+            elif key == "VmHWM":
+                memory["peak_rss_bytes"] = int(value.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return memory
+
+
+def process_tree_memory(pid: int) -> Dict[str, Optional[int]]:
+    """加總行程與其子行程（例如 uvicorn worker）的 RSS"""
+    pids = [pid]
+    position = 0
+    while position < len(pids):
+        try:
+            children = Path(f"/proc/{pids[position]}/task/{pids[position]}/children").read_text().split()
+        except OSError:
+            children = []
+        pids.extend(int(child) for child in children)
+        position += 1
+
+    total: Dict[str, Optional[int]] = {"rss_bytes": None, "peak_rss_bytes": None, "processes": len(pids)}
+    for member in pids:
+        for key, value in process_memory(member).items():
+            if value is not None:
+                total[key] = (total[key] or 0) + value
+    return total
+
+
+def git_info() -> Dict[str, Any]:
+    """取得目前 commit 與工作目錄是否有未提交的修改"""
+    def run(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = run("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": run("rev-parse", "--short", "HEAD"),
+        "dirty": bool(status) if status is not None else None
+    }
+
+
+def write_results(
+    name: str,
+    config: Dict[str, Any],
+    results: Dict[str, Any],
+    output: Optional[str] = None
+) -> Path:
+    """將結果寫成 JSON，預設存放於 benchmarks/results/ 以便跨 commit 比較"""
+    git = git_info()
+    timestamp = datetime.now(timezone.utc)
+    report = {
+        "benchmark": name,
+        "timestamp": timestamp.isoformat(),
+        "git": git,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "argv": sys.argv[1:],
+        "config": config,
+        "results": results
+    }
+    if output:
+        path = Path(output)
+    else:
+        commit = git["commit"] or "unknown"
+        path = RESULTS_DIR / f"{name}-{commit}-{timestamp.strftime('%Y%m%dT%H%M%SZ')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    return path
+
+
+def format_seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.1f}ms"
+
+
+def print_summary(title: str, rows: List[List[str]]) -> None:
+    """以對齊的表格輸出摘要"""
+    print(title)
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    for row in rows:
+        print("  " + "  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,90 @@
+"""比較兩份基準測試結果
+
+用法：
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/head.json
+    python -m benchmarks.compare base.json head.json --threshold 0.1
+
+逐項列出 results 中的數值差異；延遲、記憶體等「越小越好」的指標或吞吐量等「越大越好」
+的指標退步超過門檻時以非零狀態碼結束，方便在 CI 中使用。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import sys
+
+# 以這些字尾結尾的指標越大越好，其餘視為越小越好
+HIGHER_IS_BETTER = ("_rps", "per_second")
+# 只有這些指標參與退步判斷，計數類指標僅列出差異
+GATED_SUFFIXES = ("p50", "p95", "p99", "mean", "peak_rss_bytes", "_seconds") + HIGHER_IS_BETTER
+
+
+def flatten(data: Any, prefix: str = "") -> Dict[str, float]:
+    """將巢狀結果攤平成 a.b.c 形式的數值指標"""
+    flat: Dict[str, float] = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flat.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix.rstrip(".")] = float(data)
+    return flat
+
+
+def change(base: float, head: float) -> Optional[float]:
+    if base == 0:
+        return None
+    return (head - base) / abs(base)
+
+
+def regressed(metric: str, delta: Optional[float], threshold: float) -> bool:
+    leaf = metric.rsplit(".", 1)[-1]
+    if delta is None or not leaf.endswith(GATED_SUFFIXES):
+        return False
+    if leaf.endswith(HIGHER_IS_BETTER):
+        return delta < -threshold
+    return delta > threshold
+
+
+def compare(base: Dict, head: Dict, threshold: float) -> Tuple[List[List[str]], List[str]]:
+    base_metrics = flatten(base["results"])
+    head_metrics = flatten(head["results"])
+    rows = [["metric", "base", "head", "change"]]
+    regressions = []
+    for metric in sorted(set(base_metrics) & set(head_metrics)):
+        delta = change(base_metrics[metric], head_metrics[metric])
+        flag = regressed(metric, delta, threshold)
+        if flag:
+            regressions.append(metric)
+        rows.append([
+            metric,
+            f"{base_metrics[metric]:.6g}",
+            f"{head_metrics[metric]:.6g}",
+            ("-" if delta is None else f"{delta:+.1%}") + (" !" if flag else "")
+        ])
+    return rows, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    with open(args.base) as base_file, open(args.head) as head_file:
+        base, head = json.load(base_file), json.load(head_file)
+    if base.get("benchmark") != head.get("benchmark"):
+        print(f"Warning: comparing {base.get('benchmark')} with {head.get('benchmark')}")
+
+    rows, regressions = compare(base, head, args.threshold)
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+    print(
+        f"\n{base['git'].get('commit')} -> {head['git'].get('commit')}: "
+        f"{len(regressions)} regression(s) beyond {args.threshold:.0%}"
+    )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""日誌對事件迴圈阻塞時間的基準測試
+
+模擬上游持續出錯時 _make_request 大量記錄錯誤（含回應內容與例外堆疊），
+同時以 1ms 週期的計時任務量測事件迴圈延遲。比較三種配置：
+- direct：handler 直接掛在 root logger（舊配置），格式化、寫檔與檔案輪替都在事件迴圈執行
+- queue：QueueHandler 只負責放入佇列，由背景執行緒輸出
+- queue_rate_limited：佇列輸出並限制同一位置重複的錯誤
+
+日誌寫入暫存目錄，並以較小的檔案上限觸發輪替。
+
+用法：
+    python -m benchmarks.logging_stall
+    python -m benchmarks.logging_stall --duration 5 --errors-per-second 2000 --format json
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import tempfile
+import time
+from benchmarks.common import format_seconds, print_summary, summarize, write_results
+from app.core.logging import (
+    DroppingQueueHandler, ErrorRateLimitFilter, create_handlers, start_queue_logging
+)
+
+logger = logging.getLogger("app.services.tronscan")
+RESPONSE_BODY = '{"error":"upstream unavailable","detail":"' + "x" * 2000 + '"}'
+
+
+async def monitor_lag(interval: float, stop: asyncio.Event, lags: List[float]) -> None:
+    """量測每次 sleep 超出預期的時間，即事件迴圈被阻塞的程度"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - started - interval))
+
+
+def log_upstream_failure(sequence: int) -> None:
+    """重現 _make_request 的錯誤記錄：大部分是回應內容，部分附帶例外堆疊"""
+    if sequence % 10 == 0:
+        try:
+            raise ConnectionError(f"Cannot connect to host apilist.tronscanapi.com:443 ({sequence})")
+        except ConnectionError:
+            logger.exception(f"Error making request to TronScan API: attempt {sequence}")
+        return
+    logger.error(f"TronScan API error: 503 - {RESPONSE_BODY}")
+
+
+async def emit_errors(rate: float, duration: float, calls: List[float]) -> int:
+    """每 10ms 一批，以固定速率記錄錯誤，並記錄每次呼叫在事件迴圈上花費的時間"""
+    tick = 0.01
+    per_tick = max(1, int(rate * tick))
+    sequence = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        for _ in range(per_tick):
+            started = time.perf_counter()
+            log_upstream_failure(sequence)
+            calls.append(time.perf_counter() - started)
+            sequence += 1
+        await asyncio.sleep(tick)
+    return sequence
+
+
+async def run_mode(mode: str, args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    # 標準輸出改寫入檔案，模擬容器中導向 pipe 或檔案的情境
+    with open(os.path.join(workdir, f"{mode}.stdout"), "w") as stdout:
+        with contextlib.redirect_stdout(stdout):
+            handlers = create_handlers(
+                os.path.join(workdir, f"{mode}.log"), args.format, args.max_bytes, backup_count=3
+            )
+        return await measure_mode(mode, handlers, args)
+
+
+async def measure_mode(mode: str, handlers: List[logging.Handler], args: argparse.Namespace) -> Dict[str, Any]:
+    root = logging.getLogger()
+    listener = None
+    rate_limit = None
+    if mode == "direct":
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    else:
+        if mode == "queue_rate_limited":
+            rate_limit = ErrorRateLimitFilter(args.burst, args.window)
+        listener = start_queue_logging(handlers, "INFO", args.queue_size, rate_limit)
+
+    lags: List[float] = []
+    calls: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(0.001, stop, lags))
+    emitted = await emit_errors(args.errors_per_second, args.duration, calls)
+    stop.set()
+    await monitor
+
+    dropped = sum(h.dropped for h in root.handlers if isinstance(h, DroppingQueueHandler))
+    drain_started = time.perf_counter()
+    if listener is not None:
+        listener.stop()
+    drain = time.perf_counter() - drain_started
+    for handler in root.handlers[:] + handlers:
+        root.removeHandler(handler)
+        handler.close()
+
+    return {
+        "emitted": emitted,
+        "dropped": dropped,
+        "suppressed": rate_limit.suppressed if rate_limit is not None else 0,
+        "log_call_total_seconds": sum(calls),
+        "log_call": summarize(calls),
+        "loop_lag": summarize(lags),
+        "drain_seconds": drain
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in ("direct", "queue", "queue_rate_limited"):
+            results[mode] = await run_mode(mode, args, workdir)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--errors-per-second", type=float, default=1000.0)
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    parser.add_argument("--max-bytes", type=int, default=1024 * 1024, help="log file size before rotation")
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--window", type=float, default=60.0)
+    parser.add_argument("--output", help="result file path, default benchmarks/results/")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    rows = [["mode", "logged", "loop time", "call p99", "lag p50", "lag p99", "lag max"]]
+    for mode, result in results.items():
+        rows.append([
+            mode,
+            str(result["emitted"] - result["dropped"] - result["suppressed"]),
+            format_seconds(result["log_call_total_seconds"]),
+            format_seconds(result["log_call"]["p99"]),
+            format_seconds(result["loop_lag"]["p50"]),
+            format_seconds(result["loop_lag"]["p99"]),
+            format_seconds(result["loop_lag"]["max"])
+        ])
+    print_summary(f"Event loop stall while logging {args.errors_per_second:.0f} errors/s", rows)
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    path = write_results("logging_stall", config, results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
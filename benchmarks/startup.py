@@ -0,0 +1,196 @@
+"""啟動時間基準測試
+
+量測兩個項目：
+- 匯入時間：以 python -X importtime 匯入 app.main，依頂層套件彙總各自的匯入耗時
+- 就緒時間：從啟動 uvicorn 子行程到 GET /health 第一次回應 200 的時間（重複多次）
+
+上游網址指向不存在的本地連接埠，確認啟動流程不依賴任何網路呼叫。
+可用 --extra-import 模擬把延遲載入的模組改回在啟動時匯入，例如 --extra-import openai。
+
+用法：
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --top 15
+    python -m benchmarks.startup --extra-import openai --extra-import PIL.Image
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from benchmarks.common import ROOT_DIR, format_seconds, print_summary, summarize, write_results
+
+UNREACHABLE_URL = "http://127.0.0.1:9"
+
+
+def app_environment(workdir: str, overrides: Dict[str, str]) -> Dict[str, str]:
+    """最小可啟動的設定，資料庫與日誌放在暫存目錄"""
+    env = dict(os.environ)
+    env.update({
+        "TELEGRAM_BOT_TOKEN": "bench-token",
+        "TELEGRAM_WEBHOOK_URL": "http://127.0.0.1/webhook/telegram",
+        "TELEGRAM_INGESTION_MODE": "webhook",
+        "TELEGRAM_API_BASE_URL": UNREACHABLE_URL,
+        "TRONSCAN_API_KEY": "bench",
+        "TRONSCAN_API_BASE_URL": f"{UNREACHABLE_URL}/api",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_API_BASE_URL": f"{UNREACHABLE_URL}/v1",
+        "TRANSACTION_STORE_PATH": os.path.join(workdir, "transactions.db"),
+        "IMAGE_CACHE_PATH": os.path.join(workdir, "image_cache.db"),
+        "LOG_FILE": os.path.join(workdir, "app.log"),
+        "PYTHONUNBUFFERED": "1"
+    })
+    env.update(overrides)
+    return env
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """解析 -X importtime 的輸出，每列為 self/cumulative（秒）與模組名稱"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self": int(fields[0]) / 1e6,
+            "cumulative": int(fields[1]) / 1e6
+        })
+    return entries
+
+
+def measure_imports(env: Dict[str, str], extra_imports: List[str]) -> Dict[str, Any]:
+    """匯入 app.main 並依頂層套件彙總 self time"""
+    statement = "; ".join(f"import {name}" for name in extra_imports + ["app.main"])
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Import failed:\n{process.stderr[-2000:]}")
+
+    entries = parse_importtime(process.stderr)
+    packages: Dict[str, float] = {}
+    for entry in entries:
+        root = entry["module"].split(".")[0]
+        packages[root] = packages.get(root, 0.0) + entry["self"]
+    app_modules = {
+        entry["module"]: entry["cumulative"] for entry in entries if entry["module"].startswith("app")
+    }
+    return {
+        "total_seconds": sum(entry["self"] for entry in entries),
+        "modules": len(entries),
+        "packages": dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)),
+        "app_modules": dict(sorted(app_modules.items(), key=lambda item: item[1], reverse=True)),
+        "loaded": sorted({entry["module"].split(".")[0] for entry in entries})
+    }
+
+
+def wait_healthy(url: str, process: subprocess.Popen, timeout: float) -> float:
+    """輪詢健康檢查端點直到回應 200，回傳經過的秒數"""
+    started = time.perf_counter()
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Application exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(0.005)
+    raise RuntimeError("Application did not become healthy in time")
+
+
+def measure_ready(env: Dict[str, str], port: int, extra_imports: List[str], timeout: float) -> float:
+    """啟動 uvicorn 子行程並量測到第一次健康檢查成功的時間"""
+    command = [sys.executable]
+    if extra_imports:
+        # 先匯入指定模組再交給 uvicorn，模擬未延遲載入的情境
+        command += ["-c", "; ".join(
+            [f"import {name}" for name in extra_imports] + ["import sys", "import uvicorn.main",
+                                                          "sys.exit(uvicorn.main.main())"]
+        )]
+    else:
+        command += ["-m", "uvicorn"]
+    command += ["app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL)
+    try:
+        wait_healthy(f"http://127.0.0.1:{port}/health", process, timeout)
+        return time.perf_counter() - started
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    overrides = dict(pair.split("=", 1) for pair in args.env)
+    with tempfile.TemporaryDirectory() as workdir:
+        env = app_environment(workdir, overrides)
+        imports = measure_imports(env, args.extra_import)
+        ready = [
+            measure_ready(env, args.port, args.extra_import, args.timeout) for _ in range(args.runs)
+        ]
+    return {"imports": imports, "time_to_healthy": summarize(ready)}
+
+
+def report(results: Dict[str, Any], top: int) -> None:
+    imports = results["imports"]
+    rows = [["package", "self time"]]
+    for name, seconds in list(imports["packages"].items())[:top]:
+        rows.append([name, format_seconds(seconds)])
+    rows.append(["total", format_seconds(imports["total_seconds"])])
+    print_summary(f"Import time of app.main ({imports['modules']} modules)", rows)
+
+    rows = [["app module", "cumulative"]]
+    for name, seconds in list(imports["app_modules"].items())[:top]:
+        rows.append([name, format_seconds(seconds)])
+    print_summary("Application modules", rows)
+
+    ready = results["time_to_healthy"]
+    rows = [["", "count", "p50", "p95", "max"]]
+    rows.append([
+        "time to /health 200", str(ready["count"]),
+        format_seconds(ready["p50"]), format_seconds(ready["p95"]), format_seconds(ready["max"])
+    ])
+    print_summary("Startup", rows)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=18081)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--extra-import", action="append", default=[], help="module imported before app.main")
+    parser.add_argument("--env", action="append", default=[], help="extra app setting, KEY=VALUE")
+    parser.add_argument("--output", help="result file path, default benchmarks/results/")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    report(results, args.top)
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    path = write_results("startup", config, results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
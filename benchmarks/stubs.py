@@ -0,0 +1,447 @@
+"""TronScan、Telegram 與 OpenAI 的本地模擬伺服器，可設定延遲、錯誤率與 429 比例"""
+from typing import Any, Dict, List, Optional
+from collections import defaultdict
+from dataclasses import asdict, dataclass, fields
+import asyncio
+import bisect
+import hashlib
+import io
+import json
+import random
+import time
+from aiohttp import web
+
+USDT_TOKEN_INFO = {
+    "tokenId": "TR7NHqjeKQxGTCi8q8ZY4pPvMSEuxgjLj6t",
+    "tokenName": "Tether USD",
+    "tokenAbbr": "USDT",
+    "tokenDecimal": 6,
+    "tokenType": "trc20"
+}
+
+
+@dataclass
+class StubProfile:
+    latency: float = 0.05  # 秒，平均回應延遲
+    jitter: float = 0.02  # 秒，延遲的隨機浮動範圍
+    error_rate: float = 0.0  # 回傳 500 的比例
+    rate_limit_rate: float = 0.0  # 回傳 429 的比例
+    retry_after: int = 1  # 秒，429 回應建議的重試間隔
+
+    def update(self, field_name: str, value: str) -> None:
+        """以字串設定單一欄位，供命令列參數使用"""
+        types = {f.name: f.type for f in fields(self)}
+        if field_name not in types:
+            raise ValueError(f"Unknown stub setting: {field_name}")
+        caster = int if types[field_name] in (int, "int") else float
+        setattr(self, field_name, caster(value))
+
+
+class StubServer:
+    """模擬上游的基底類別，負責延遲注入、錯誤注入與請求統計"""
+
+    name = "stub"
+
+    def __init__(self, profile: Optional[StubProfile] = None, seed: int = 0):
+        self.profile = profile or StubProfile()
+        self.random = random.Random(seed)
+        self.app = web.Application()
+        self.url: Optional[str] = None
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """啟動伺服器，port 為 0 時自動分配"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _delay(self) -> float:
+        jitter = self.profile.jitter
+        return max(0.0, self.profile.latency + self.random.uniform(-jitter, jitter))
+
+    async def _inject(self) -> Optional[web.Response]:
+        """模擬延遲，並依設定比例回傳 429 或 500；正常時回傳 None"""
+        self.requests += 1
+        await asyncio.sleep(self._delay())
+        roll = self.random.random()
+        if roll < self.profile.rate_limit_rate:
+            self.rate_limited += 1
+            return self._rate_limit_response()
+        if roll < self.profile.rate_limit_rate + self.profile.error_rate:
+            self.errors += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+        return None
+
+    def _rate_limit_response(self) -> web.Response:
+        return web.json_response(
+            {"error": "Too Many Requests"},
+            status=429,
+            headers={"Retry-After": str(self.profile.retry_after)}
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "profile": asdict(self.profile),
+            "requests": self.requests,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited
+        }
+
+
+def transfers_for(wallet_address: str, count: int = 20) -> List[Dict[str, Any]]:
+    """依錢包地址產生固定的轉帳紀錄，相同地址每次結果一致"""
+    seed = int.from_bytes(hashlib.sha256(wallet_address.encode()).digest()[:8], "big")
+    rng = random.Random(seed)
+    now = int(time.time() * 1000)
+    transfers = []
+    for position in range(count):
+        amount = rng.randint(10, 5000) * 1_000_000 + rng.choice((0, 500_000))
+        transfers.append({
+            "block_ts": now - (position + 1) * 600_000,
+            "from_address": f"TSender{rng.getrandbits(96):027x}"[:34],
+            "to_address": wallet_address,
+            "quant": str(amount),
+            "confirmed": position > 0,
+            "transaction_id": hashlib.sha256(f"{wallet_address}:{position}".encode()).hexdigest(),
+            "tokenInfo": USDT_TOKEN_INFO,
+            "finalResult": "SUCCESS"
+        })
+    return transfers
+
+
+def expected_amount(wallet_address: str, position: int = 1) -> str:
+    """取得模擬錢包中某筆轉帳的金額，供產生可驗證成功的查詢"""
+    quant = int(transfers_for(wallet_address)[position]["quant"])
+    return f"{quant / 1_000_000:.2f}"
+
+
+def random_address(rng: random.Random) -> str:
+    return f"T{rng.getrandbits(160):040x}"[:34]
+
+
+def record_blocks(
+    wallets: List[str],
+    history_blocks: int = 100,
+    live_blocks: int = 20,
+    events_per_block: int = 50,
+    block_interval_ms: int = 3000,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """產生 USDT 轉帳事件的區塊紀錄，格式與由實際鏈上資料錄製的檔案相同
+
+    每個錢包在歷史區塊中有一筆舊轉帳，並在之後的區塊收到一筆等待驗證的付款
+    （payments）；其餘為與錢包無關的轉帳。offset_ms 相對於重播開始的時間，負值表示過去。
+    """
+    rng = random.Random(seed)
+    blocks = []
+    for number in range(history_blocks + live_blocks):
+        blocks.append({
+            "number": 60_000_000 + number,
+            "offset_ms": (number - history_blocks) * block_interval_ms,
+            "transfers": []
+        })
+
+    def transfer(to_address: str, quant: int, tag: str) -> Dict[str, Any]:
+        return {
+            "from_address": random_address(rng),
+            "to_address": to_address,
+            "quant": str(quant),
+            "transaction_id": hashlib.sha256(f"{seed}:{tag}".encode()).hexdigest(),
+            "tokenInfo": USDT_TOKEN_INFO,
+            "finalResult": "SUCCESS"
+        }
+
+    for position, block in enumerate(blocks):
+        for event in range(events_per_block):
+            block["transfers"].append(transfer(
+                random_address(rng), rng.randint(1, 20000) * 1_000_000, f"noise:{position}:{event}"
+            ))
+
+    payments = {}
+    for wallet_address in wallets:
+        history = rng.randrange(history_blocks)
+        blocks[history]["transfers"].append(transfer(
+            wallet_address, rng.randint(10, 5000) * 1_000_000, f"history:{wallet_address}"
+        ))
+        live = history_blocks + rng.randrange(live_blocks)
+        amount = rng.randint(10, 5000) * 1_000_000 + rng.choice((0, 500_000))
+        blocks[live]["transfers"].append(transfer(wallet_address, amount, f"payment:{wallet_address}"))
+        payments[wallet_address] = {"amount": f"{amount / 1_000_000:.2f}", "block": blocks[live]["number"]}
+
+    for block in blocks:
+        rng.shuffle(block["transfers"])
+    return {"block_interval_ms": block_interval_ms, "blocks": blocks, "payments": payments}
+
+
+def save_blocks(fixture: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(fixture, f)
+
+
+def load_blocks(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+class BlockFeed:
+    """以實際時間重播區塊紀錄：區塊時間到了才會被查到，經過 confirm_blocks 個區塊後標記為已確認
+
+    轉帳可帶 index_delay_ms，模擬上游較晚才建立索引：出塊後經過此時間才會被查到。
+    """
+
+    def __init__(self, fixture: Dict[str, Any], started_at: Optional[float] = None, confirm_blocks: int = 19):
+        started_ms = int((started_at if started_at is not None else time.time()) * 1000)
+        self.confirm_ms = confirm_blocks * fixture["block_interval_ms"]
+        self.events: List[Dict[str, Any]] = []
+        for block in fixture["blocks"]:
+            for tx in block["transfers"]:
+                self.events.append(dict(tx, block=block["number"], block_ts=started_ms + block["offset_ms"]))
+        self.events.sort(key=lambda tx: tx["block_ts"])
+        self._timestamps = [tx["block_ts"] for tx in self.events]
+        self._related: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for tx in self.events:
+            self._related[tx["to_address"]].append(tx)
+            self._related[tx["from_address"]].append(tx)
+
+    def _visible(self, transfers: List[Dict[str, Any]], start_ts: int, end_ts: int) -> List[Dict[str, Any]]:
+        now = int(time.time() * 1000)
+        end_ts = min(end_ts, now)
+        return [
+            dict(tx, confirmed=now - tx["block_ts"] >= self.confirm_ms)
+            for tx in transfers
+            if start_ts <= tx["block_ts"] <= end_ts and tx["block_ts"] + tx.get("index_delay_ms", 0) <= now
+        ]
+
+    def window(self, start_ts: int, end_ts: int) -> List[Dict[str, Any]]:
+        """時間區間內已出塊的所有事件，由舊到新"""
+        low = bisect.bisect_left(self._timestamps, start_ts)
+        high = bisect.bisect_right(self._timestamps, end_ts)
+        return self._visible(self.events[low:high], start_ts, end_ts)
+
+    def related(self, wallet_address: str, start_ts: int, end_ts: int) -> List[Dict[str, Any]]:
+        """與錢包相關且已出塊的事件，由新到舊"""
+        return self._visible(self._related.get(wallet_address, []), start_ts, end_ts)[::-1]
+
+
+class TronScanStub(StubServer):
+    """模擬 TronScan filter/trc20/transfers 與 token_trc20/transfers，支援 start/limit 分頁與時間窗口
+
+    指定 feed 時由區塊紀錄回答，否則依錢包地址產生固定的轉帳。
+    """
+
+    name = "tronscan"
+
+    def __init__(self, profile: Optional[StubProfile] = None, seed: int = 0, feed: Optional[BlockFeed] = None):
+        super().__init__(profile, seed)
+        self.feed = feed
+        self.endpoints: Dict[str, int] = defaultdict(int)
+        self.app.router.add_get("/api/filter/trc20/transfers", self.handle_transfers)
+        self.app.router.add_get("/api/token_trc20/transfers", self.handle_contract_transfers)
+
+    @staticmethod
+    def _page(request: web.Request, transfers: List[Dict[str, Any]]) -> web.Response:
+        start = int(request.query.get("start", 0))
+        limit = int(request.query.get("limit", 20))
+        return web.json_response({
+            "total": len(transfers),
+            "token_transfers": transfers[start:start + limit]
+        })
+
+    async def handle_transfers(self, request: web.Request) -> web.Response:
+        self.endpoints["filter/trc20/transfers"] += 1
+        failure = await self._inject()
+        if failure is not None:
+            return failure
+
+        query = request.query
+        start_ts = int(query.get("start_timestamp", 0))
+        end_ts = int(query.get("end_timestamp", 2 ** 63))
+        if self.feed is not None:
+            return self._page(request, self.feed.related(query.get("relatedAddress", ""), start_ts, end_ts))
+        transfers = transfers_for(query.get("relatedAddress", ""))
+        transfers = [tx for tx in transfers if start_ts <= tx["block_ts"] <= end_ts]
+        return self._page(request, transfers)
+
+    async def handle_contract_transfers(self, request: web.Request) -> web.Response:
+        self.endpoints["token_trc20/transfers"] += 1
+        failure = await self._inject()
+        if failure is not None:
+            return failure
+
+        query = request.query
+        transfers = []
+        if self.feed is not None and query.get("contract_address") == USDT_TOKEN_INFO["tokenId"]:
+            transfers = self.feed.window(
+                int(query.get("start_timestamp", 0)), int(query.get("end_timestamp", 2 ** 63))
+            )
+        if query.get("sort", "-timestamp").startswith("-"):
+            transfers = transfers[::-1]
+        return self._page(request, transfers)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["endpoints"] = dict(self.endpoints)
+        return stats
+
+
+class TelegramStub(StubServer):
+    """模擬 Telegram Bot API，記錄每個聊天室收到呼叫的時間點"""
+
+    name = "telegram"
+
+    def __init__(self, profile: Optional[StubProfile] = None, seed: int = 0):
+        super().__init__(profile, seed)
+        self.calls: Dict[int, List[float]] = defaultdict(list)
+        self.methods: Dict[str, int] = defaultdict(int)
+        self.last_call_at = 0.0
+        self._message_id = 0
+        self._photo = _sample_photo()
+        self.app.router.add_post("/bot{token}/{method}", self.handle_method)
+        self.app.router.add_get("/file/bot{token}/{path:.*}", self.handle_file)
+
+    def _rate_limit_response(self) -> web.Response:
+        retry_after = self.profile.retry_after
+        return web.json_response(
+            {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after}
+            },
+            status=429
+        )
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        body = await request.json() if request.can_read_body else {}
+        failure = await self._inject()
+        if failure is not None:
+            return failure
+
+        self.methods[method] += 1
+        chat_id = body.get("chat_id")
+        if chat_id is not None:
+            self.last_call_at = time.perf_counter()
+            self.calls[int(chat_id)].append(self.last_call_at)
+
+        if method == "getFile":
+            return web.json_response({
+                "ok": True,
+                "result": {
+                    "file_id": body.get("file_id"),
+                    "file_size": len(self._photo),
+                    "file_path": f"photos/{body.get('file_id')}.jpg"
+                }
+            })
+        if method == "getUpdates":
+            return web.json_response({"ok": True, "result": []})
+        self._message_id += 1
+        return web.json_response({
+            "ok": True,
+            "result": {"message_id": self._message_id, "chat": {"id": chat_id}}
+        })
+
+    async def handle_file(self, request: web.Request) -> web.Response:
+        failure = await self._inject()
+        if failure is not None:
+            return failure
+        return web.Response(body=self._photo, content_type="image/jpeg")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["methods"] = dict(self.methods)
+        return stats
+
+
+def _sample_photo() -> bytes:
+    """產生測試用 JPEG；未安裝 Pillow 時改用固定位元組"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return b"\xff\xd8\xff\xe0" + bytes(range(256)) * 64 + b"\xff\xd9"
+    buffer = io.BytesIO()
+    Image.new("RGB", (1280, 960), (40, 120, 200)).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class OpenAIStub(StubServer):
+    """模擬 OpenAI chat completions，支援一般回應與 SSE 串流"""
+
+    name = "openai"
+    reply = "你好，我是負責取代哥哥的AI助理！這是模擬的回覆內容。河，超級舒服。"
+
+    def __init__(self, profile: Optional[StubProfile] = None, seed: int = 0, chunks: int = 8):
+        super().__init__(profile, seed)
+        self.chunks = chunks
+        self.app.router.add_post("/v1/chat/completions", self.handle_completion)
+
+    async def handle_completion(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        if body.get("stream"):
+            return await self._stream(request, body)
+
+        failure = await self._inject()
+        if failure is not None:
+            return failure
+        return web.json_response({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.reply},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 120, "completion_tokens": 40, "total_tokens": 160}
+        })
+
+    async def _stream(self, request: web.Request, body: Dict) -> web.StreamResponse:
+        """首段延遲取總延遲的一半，其餘平均分散在各段之間"""
+        self.requests += 1
+        total = self._delay()
+        await asyncio.sleep(total / 2)
+        roll = self.random.random()
+        if roll < self.profile.rate_limit_rate:
+            self.rate_limited += 1
+            return self._rate_limit_response()
+        if roll < self.profile.rate_limit_rate + self.profile.error_rate:
+            self.errors += 1
+            return web.json_response({"error": "injected failure"}, status=500)
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        step = max(1, len(self.reply) // self.chunks)
+        for offset in range(0, len(self.reply), step):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "delta": {"content": self.reply[offset:offset + step]}}]
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            await asyncio.sleep(total / 2 / self.chunks)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "model": body.get("model"),
+                "choices": [],
+                "usage": {"prompt_tokens": 120, "completion_tokens": 40, "total_tokens": 160}
+            }
+            await response.write(f"data: {json.dumps(usage)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
@@ -0,0 +1,154 @@
+"""Webhook 更新解析基準測試
+
+比較單一 worker 在解析階段每秒可處理的更新數：
+- baseline：標準函式庫 json 解碼，凡是 message 更新都建立完整的 Pydantic 模型
+- prefilter：先以原始內容略過不處理的更新，只有需要處理的訊息才建立模型
+  （分別以標準函式庫 json 與 orjson 解碼，未安裝 orjson 時略過該項）
+
+更新組成模擬群組中的實際流量，包含編輯訊息、貼圖、入群通知、callback 等不處理的更新。
+
+用法：
+    python -m benchmarks.update_parsing
+    python -m benchmarks.update_parsing --updates 5000 --ignored-ratio 0.7
+"""
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import json
+import random
+import time
+from benchmarks.common import print_summary, write_results
+from app.models.telegram import MessageRecord, TelegramMessage, parse_update
+from app.utils import fastjson
+
+
+def _message(sequence: int, rng: random.Random, **fields: Any) -> Dict[str, Any]:
+    chat_id = -1000000000000 - rng.randrange(50)
+    message = {
+        "message_id": sequence,
+        "from": {"id": 5000 + rng.randrange(1000), "is_bot": False, "first_name": "User", "language_code": "zh-hans"},
+        "chat": {"id": chat_id, "title": "Bench Group", "type": "supergroup"},
+        "date": 1700000000 + sequence
+    }
+    message.update(fields)
+    return message
+
+
+def ignored_update(sequence: int, rng: random.Random) -> Dict[str, Any]:
+    kind = rng.choice(["edited_message", "sticker", "new_chat_members", "callback_query", "my_chat_member"])
+    if kind == "edited_message":
+        return {"update_id": sequence, "edited_message": _message(sequence, rng, text="修改後的訊息", edit_date=1700000100)}
+    if kind == "sticker":
+        sticker = {"file_id": f"sticker-{sequence}", "file_unique_id": f"s{sequence}", "width": 512, "height": 512, "is_animated": False, "emoji": "😀", "set_name": "bench"}
+        return {"update_id": sequence, "message": _message(sequence, rng, sticker=sticker)}
+    if kind == "new_chat_members":
+        member = {"id": 9000 + sequence, "is_bot": False, "first_name": "New"}
+        return {"update_id": sequence, "message": _message(sequence, rng, new_chat_members=[member], new_chat_member=member)}
+    if kind == "callback_query":
+        return {
+            "update_id": sequence,
+            "callback_query": {"id": str(sequence), "from": {"id": 1, "first_name": "User"}, "message": _message(sequence, rng, text="選單"), "data": "noop"}
+        }
+    return {
+        "update_id": sequence,
+        "my_chat_member": {"chat": {"id": -100, "type": "supergroup"}, "from": {"id": 1, "first_name": "Admin"}, "date": 1700000000, "old_chat_member": {"status": "member"}, "new_chat_member": {"status": "administrator"}}
+    }
+
+
+def handled_update(sequence: int, rng: random.Random) -> Dict[str, Any]:
+    roll = rng.random()
+    if roll < 0.15:
+        photos = [{"file_id": f"photo-{sequence}-{size}", "file_unique_id": f"p{sequence}{size}", "width": size, "height": size, "file_size": size * 100} for size in (90, 320, 800, 1280)]
+        return {"update_id": sequence, "message": _message(sequence, rng, photo=photos)}
+    if roll < 0.55:
+        text = f"查收\nTBench{rng.randrange(10 ** 8):028d}\n{rng.randint(10, 5000)}"
+    else:
+        text = rng.choice(["大家好", "今天匯率多少？", "請問怎麼查帳", "收到了謝謝", "這個要等多久"])
+    return {"update_id": sequence, "message": _message(sequence, rng, text=text)}
+
+
+def build_corpus(count: int, ignored_ratio: float, seed: int) -> List[bytes]:
+    rng = random.Random(seed)
+    corpus = []
+    for sequence in range(count):
+        builder = ignored_update if rng.random() < ignored_ratio else handled_update
+        corpus.append(json.dumps(builder(sequence, rng), ensure_ascii=False).encode())
+    return corpus
+
+
+def baseline(body: bytes) -> Optional[TelegramMessage]:
+    """舊流程：完整解碼後，所有 message 更新都建立模型"""
+    data = json.loads(body)
+    if "message" not in data:
+        return None
+    message = TelegramMessage.from_webhook(data["message"])
+    if "photo" in data["message"]:
+        return message
+    if not message.text:
+        return None
+    return message
+
+
+def prefilter(body: bytes) -> Optional[TelegramMessage]:
+    """新流程：原始內容預先過濾，只有需要處理的訊息才建立模型"""
+    data = parse_update(body)
+    if data is None:
+        return None
+    record = MessageRecord.from_update(data)
+    if record is None:
+        return None
+    return record.to_model()
+
+
+def measure(func: Callable[[bytes], Any], corpus: List[bytes], rounds: int, repeat: int) -> float:
+    """回傳最佳一輪的每秒更新數"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for body in corpus:
+                func(body)
+        best = min(best, time.perf_counter() - started)
+    return len(corpus) * rounds / best
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000, help="distinct updates in the corpus")
+    parser.add_argument("--ignored-ratio", type=float, default=0.5, help="share of updates the bot ignores")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="result file path, default benchmarks/results/")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.updates, args.ignored_ratio, args.seed)
+    handled = sum(1 for body in corpus if prefilter(body) is not None)
+    assert handled == sum(1 for body in corpus if baseline(body) is not None)
+
+    backend = fastjson.orjson
+    variants = {"baseline": None, "prefilter_json": None}
+    if backend is not None:
+        variants["prefilter_orjson"] = backend
+    results: Dict[str, Any] = {"handled": handled, "ignored": len(corpus) - handled}
+    try:
+        for name, json_backend in variants.items():
+            fastjson.orjson = json_backend
+            func = baseline if name == "baseline" else prefilter
+            results[f"{name}_updates_per_second"] = measure(func, corpus, args.rounds, args.repeat)
+    finally:
+        fastjson.orjson = backend
+
+    base_rate = results["baseline_updates_per_second"]
+    rows = [["variant", "updates/s", "speedup"]]
+    for name in variants:
+        rate = results[f"{name}_updates_per_second"]
+        rows.append([name, f"{rate:,.0f}", f"{rate / base_rate:.2f}x"])
+    print_summary(f"Update parsing, single worker ({handled} handled / {len(corpus)} updates)", rows)
+
+    config = {"updates": args.updates, "ignored_ratio": args.ignored_ratio, "rounds": args.rounds, "seed": args.seed}
+    path = write_results("update_parsing", config, results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
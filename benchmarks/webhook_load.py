@@ -0,0 +1,354 @@
+"""Webhook 壓力測試
+
+啟動 TronScan、Telegram 與 OpenAI 的本地模擬伺服器，以子行程執行應用程式並將
+上游網址指向模擬伺服器，再以固定速率（open-loop）送出合成的 Telegram 更新。
+
+量測項目：
+- webhook 回應延遲（POST /webhook/telegram 的往返時間）
+- 端到端延遲（送出更新到該聊天室最後一次收到 Telegram API 呼叫）
+- 吞吐量、錯誤數與應用程式行程的 RSS
+
+用法：
+    python -m benchmarks.webhook_load --rate 50 --duration 30
+    python -m benchmarks.webhook_load --stub tronscan.latency=0.3 --stub telegram.rate_limit_rate=0.05
+    python -m benchmarks.webhook_load --mix wallet=1 --env TRONSCAN_CACHE_TTL=0
+    python -m benchmarks.webhook_load --workers 4 --rate 200
+
+結果以 JSON 存放於 benchmarks/results/，可用 benchmarks.compare 比較不同 commit。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import aiohttp
+from benchmarks.common import (
+    ROOT_DIR, format_seconds, print_summary, process_tree_memory, summarize, write_results
+)
+from benchmarks.stubs import OpenAIStub, StubProfile, TelegramStub, TronScanStub, expected_amount
+
+BOT_TOKEN = "bench-token"
+BASE_CHAT_ID = 100000
+DEFAULT_MIX = "wallet=0.6,ai=0.3,photo=0.1"
+
+
+def parse_pairs(values: List[str]) -> Dict[str, str]:
+    pairs = {}
+    for value in values:
+        key, sep, item = value.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got {value!r}")
+        pairs[key.strip()] = item.strip()
+    return pairs
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {kind: float(weight) for kind, weight in parse_pairs(value.split(",")).items()}
+    unknown = set(mix) - set(UPDATE_BUILDERS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown update kinds: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def wallet_update(sequence: int, rng: random.Random) -> Dict[str, Any]:
+    wallet_address = f"TBench{rng.randrange(500):028d}"
+    # 約八成查詢可在模擬資料中找到符合的交易
+    amount = expected_amount(wallet_address) if rng.random() < 0.8 else "1.23"
+    return {"text": f"查收\n{wallet_address}\n{amount}"}
+
+
+def ai_update(sequence: int, rng: random.Random) -> Dict[str, Any]:
+    return {"text": rng.choice(["你好", "查帳要準備什麼？", "今天天氣如何", f"第 {sequence} 則問題"])}
+
+
+def photo_update(sequence: int, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "photo": [
+            {
+                "file_id": f"bench-photo-{sequence}-{size}",
+                "file_unique_id": f"bench-{sequence}-{size}",
+                "width": size,
+                "height": size * 3 // 4,
+                "file_size": size * 200
+            }
+            for size in (320, 1280)
+        ]
+    }
+
+
+UPDATE_BUILDERS = {"wallet": wallet_update, "ai": ai_update, "photo": photo_update}
+
+# 各類更新必定會呼叫的上游；有送出該類更新但模擬伺服器沒收到請求，代表應用程式沒有連到模擬伺服器
+REQUIRED_UPSTREAMS = {
+    "wallet": ("tronscan", "telegram"),
+    "ai": ("openai", "telegram"),
+    "photo": ("openai", "telegram")
+}
+
+
+def build_update(sequence: int, kind: str, rng: random.Random) -> Dict[str, Any]:
+    """建立合成更新，每則更新使用獨立的聊天室以追蹤端到端延遲"""
+    chat_id = BASE_CHAT_ID + sequence
+    message = {
+        "message_id": sequence,
+        "from": {"id": chat_id, "first_name": "Bench"},
+        "chat": {"id": chat_id, "type": "private"},
+        "date": int(time.time())
+    }
+    message.update(UPDATE_BUILDERS[kind](sequence, rng))
+    return {"update_id": sequence, "message": message}
+
+
+def app_environment(
+    stubs: Dict[str, Any],
+    workdir: str,
+    overrides: Dict[str, str],
+    workers: int = 1
+) -> Dict[str, str]:
+    """將應用程式的上游網址指向模擬伺服器，資料庫檔案放在暫存目錄"""
+    env = dict(os.environ)
+    env.update({
+        "TELEGRAM_BOT_TOKEN": BOT_TOKEN,
+        "TELEGRAM_WEBHOOK_URL": "http://127.0.0.1/webhook/telegram",
+        "TELEGRAM_INGESTION_MODE": "webhook",
+        "TELEGRAM_API_BASE_URL": stubs["telegram"].url,
+        "TRONSCAN_API_KEY": "bench",
+        "TRONSCAN_API_BASE_URL": f"{stubs['tronscan'].url}/api",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_API_BASE_URL": f"{stubs['openai'].url}/v1",
+        "TRANSACTION_STORE_PATH": os.path.join(workdir, "transactions.db"),
+        "IMAGE_CACHE_PATH": os.path.join(workdir, "image_cache.db"),
+        "LOG_FILE": os.path.join(workdir, "app.log"),
+        "PYTHONUNBUFFERED": "1"
+    })
+    if workers > 1:
+        env["SHARED_STATE_PATH"] = os.path.join(workdir, "shared_state.db")
+    env.update(overrides)
+    return env
+
+
+async def wait_ready(session: aiohttp.ClientSession, base_url: str, process, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Application exited with code {process.returncode}")
+        try:
+            async with session.get(f"{base_url}/webhook/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Application did not become ready in time")
+
+
+async def send_update(
+    session: aiohttp.ClientSession,
+    url: str,
+    update: Dict[str, Any]
+) -> Tuple[float, float, Optional[int]]:
+    """送出一則更新，回傳 (送出時間, 回應延遲, HTTP 狀態碼)"""
+    sent_at = time.perf_counter()
+    try:
+        async with session.post(url, json=update) as response:
+            await response.read()
+            status = response.status
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        status = None
+    return sent_at, time.perf_counter() - sent_at, status
+
+
+async def generate_load(
+    session: aiohttp.ClientSession,
+    url: str,
+    rate: float,
+    duration: float,
+    mix: Dict[str, float],
+    seed: int
+) -> Tuple[List[Dict[str, Any]], float]:
+    """依排程時間送出更新，不等待前一個請求完成以避免協調遺漏"""
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    total = int(rate * duration)
+    tasks = []
+    records = []
+    started = time.perf_counter()
+    for sequence in range(total):
+        delay = started + sequence / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = rng.choices(kinds, weights)[0]
+        records.append({"sequence": sequence, "kind": kind})
+        tasks.append(asyncio.create_task(send_update(session, url, build_update(sequence, kind, rng))))
+
+    for record, (sent_at, latency, status) in zip(records, await asyncio.gather(*tasks)):
+        record.update(sent_at=sent_at, latency=latency, status=status)
+    return records, time.perf_counter() - started
+
+
+async def wait_settled(telegram: TelegramStub, quiet: float, timeout: float) -> None:
+    """等待 Telegram 模擬伺服器一段時間沒有新呼叫，代表佇列已處理完畢"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if time.perf_counter() - telegram.last_call_at >= quiet:
+            return
+        await asyncio.sleep(0.1)
+
+
+def idle_upstreams(records: List[Dict[str, Any]], stubs: Dict[str, Any]) -> List[str]:
+    """回傳本次負載需要、卻沒有收到任何請求的模擬伺服器"""
+    required = {name for record in records for name in REQUIRED_UPSTREAMS[record["kind"]]}
+    return sorted(name for name in required if stubs[name].requests == 0)
+
+
+def analyze(records: List[Dict[str, Any]], telegram: TelegramStub, elapsed: float) -> Dict[str, Any]:
+    ok = [record for record in records if record["status"] == 200]
+    end_to_end: Dict[str, List[float]] = {}
+    incomplete: Dict[str, int] = {}
+    for record in ok:
+        calls = telegram.calls.get(BASE_CHAT_ID + record["sequence"])
+        if not calls:
+            incomplete[record["kind"]] = incomplete.get(record["kind"], 0) + 1
+            continue
+        end_to_end.setdefault(record["kind"], []).append(calls[-1] - record["sent_at"])
+
+    all_end_to_end = [value for values in end_to_end.values() for value in values]
+    return {
+        "requests": len(records),
+        "ok": len(ok),
+        "failed": len(records) - len(ok),
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else None,
+        "webhook_latency": summarize([record["latency"] for record in ok]),
+        "end_to_end_latency": summarize(all_end_to_end),
+        "end_to_end_by_kind": {kind: summarize(values) for kind, values in sorted(end_to_end.items())},
+        "incomplete": incomplete
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    profiles = {name: StubProfile() for name in ("tronscan", "telegram", "openai")}
+    profiles["openai"].latency = 0.5
+    profiles["openai"].jitter = 0.2
+    for key, value in parse_pairs(args.stub).items():
+        name, _, field_name = key.partition(".")
+        if name not in profiles:
+            raise SystemExit(f"Unknown stub: {name}")
+        profiles[name].update(field_name, value)
+
+    stubs = {
+        "tronscan": TronScanStub(profiles["tronscan"], seed=args.seed),
+        "telegram": TelegramStub(profiles["telegram"], seed=args.seed),
+        "openai": OpenAIStub(profiles["openai"], seed=args.seed)
+    }
+    for stub in stubs.values():
+        await stub.start()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as workdir:
+        env = app_environment(stubs, workdir, parse_pairs(args.env), args.workers)
+        process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning",
+                "--workers", str(args.workers)
+            ],
+            cwd=ROOT_DIR,
+            env=env
+        )
+        connector = aiohttp.TCPConnector(limit=args.connections)
+        timeout = aiohttp.ClientTimeout(total=30)
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                await wait_ready(session, base_url, process, args.startup_timeout)
+                baseline_memory = process_tree_memory(process.pid)
+                records, elapsed = await generate_load(
+                    session, f"{base_url}/webhook/telegram", args.rate, args.duration, args.mix, args.seed
+                )
+                await wait_settled(stubs["telegram"], args.settle, args.drain_timeout)
+                memory = process_tree_memory(process.pid)
+                async with session.get(f"{base_url}/webhook/health") as response:
+                    app_stats = await response.json()
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            for stub in stubs.values():
+                await stub.stop()
+
+    results = analyze(records, stubs["telegram"], elapsed)
+    results["memory"] = {
+        "baseline_rss_bytes": baseline_memory["rss_bytes"],
+        "rss_bytes": memory["rss_bytes"],
+        "peak_rss_bytes": memory["peak_rss_bytes"],
+        "processes": memory["processes"]
+    }
+    results["upstreams"] = {name: stub.stats() for name, stub in stubs.items()}
+    results["idle_upstreams"] = idle_upstreams(records, stubs)
+    results["app"] = app_stats
+    return results
+
+
+def report(results: Dict[str, Any]) -> None:
+    rows = [["", "count", "p50", "p95", "p99", "max"]]
+    series = [("webhook", results["webhook_latency"]), ("end-to-end", results["end_to_end_latency"])]
+    series += [(f"  {kind}", summary) for kind, summary in results["end_to_end_by_kind"].items()]
+    for label, summary in series:
+        rows.append([label, str(summary["count"])] + [
+            format_seconds(summary[key]) for key in ("p50", "p95", "p99", "max")
+        ])
+    print_summary("Latency", rows)
+
+    peak = results["memory"]["peak_rss_bytes"]
+    print(
+        f"Throughput: {results['throughput_rps']:.1f} req/s "
+        f"({results['ok']}/{results['requests']} ok, {results['failed']} failed)"
+    )
+    if results["incomplete"]:
+        print(f"Incomplete: {results['incomplete']}")
+    if peak is not None:
+        print(f"Peak RSS: {peak / 1024 / 1024:.1f} MiB")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=20.0, help="updates per second")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds of load")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"update mix, default {DEFAULT_MIX}")
+    parser.add_argument("--stub", action="append", default=[], metavar="NAME.FIELD=VALUE", help="stub behaviour override")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="application setting override")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers, >1 enables shared state")
+    parser.add_argument("--connections", type=int, default=100, help="client connection pool size")
+    parser.add_argument("--settle", type=float, default=2.0, help="quiet seconds that mark the end of processing")
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--startup-timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="result file path, default benchmarks/results/")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    report(results)
+    config = {
+        "rate": args.rate,
+        "duration": args.duration,
+        "mix": args.mix,
+        "stub": parse_pairs(args.stub),
+        "env": parse_pairs(args.env),
+        "workers": args.workers,
+        "seed": args.seed
+    }
+    path = write_results("webhook_load", config, results, args.output)
+    print(f"Results written to {path}")
+    if results["idle_upstreams"]:
+        raise SystemExit(f"Stubs received no traffic: {', '.join(results['idle_upstreams'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import os
+
+# 匯入 app 模組前先提供必要設定，並停用會寫入檔案的功能
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+os.environ.setdefault("TELEGRAM_WEBHOOK_URL", "http://127.0.0.1/webhook/telegram")
+os.environ.setdefault("TRONSCAN_API_KEY", "test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("TRANSACTION_STORE_PATH", "")
+os.environ.setdefault("IMAGE_CACHE_PATH", "")
+os.environ.setdefault("SCANNER_STATE_PATH", "")
+os.environ.setdefault("LOG_FILE", "")
@@ -0,0 +1,85 @@
+import asyncio
+from app.services import ai
+from benchmarks.stubs import OpenAIStub
+
+
+def test_model_calls_use_configured_base_url(monkeypatch):
+    async def scenario():
+        stub = OpenAIStub()
+        await stub.start()
+        monkeypatch.setattr(ai.settings, "OPENAI_API_BASE_URL", f"{stub.url}/v1")
+        service = ai.AIService()
+        try:
+            reply = await service._complete("第一則問題")
+            streamed = [chunk async for chunk in service.stream_response("第二則問題")]
+            analysis = await service.analyze_image("aGVsbG8=")
+        finally:
+            await service.close()
+            await stub.stop()
+        return reply, streamed, analysis, stub.requests, service.stats()
+
+    reply, streamed, analysis, requests, stats = asyncio.run(scenario())
+    assert reply == OpenAIStub.reply
+    assert "".join(streamed) == OpenAIStub.reply
+    assert analysis == OpenAIStub.reply
+    assert requests == 3
+    # 三次呼叫（含串流）都記錄 token 用量
+    assert stats["tokens"] == {"prompt": 360, "completion": 120}
+
+
+def test_stream_records_usage_and_caches_reply(monkeypatch):
+    async def scenario():
+        stub = OpenAIStub()
+        await stub.start()
+        monkeypatch.setattr(ai.settings, "OPENAI_API_BASE_URL", f"{stub.url}/v1")
+        service = ai.AIService()
+        try:
+            streamed = [chunk async for chunk in service.stream_response("串流問題")]
+        finally:
+            await service.close()
+            await stub.stop()
+        return streamed, service
+
+    streamed, service = asyncio.run(scenario())
+    assert len(streamed) > 1
+    assert service.stats()["tokens"] == {"prompt": 120, "completion": 40}
+    assert service.stats()["paths"]["stream"]["count"] == 1
+    assert service.cached_response("串流問題") == OpenAIStub.reply
+
+
+def test_slow_stream_consumer_does_not_hold_concurrency_slot(monkeypatch):
+    monkeypatch.setattr(ai.settings, "AI_MAX_CONCURRENCY", 1)
+
+    async def scenario():
+        stub = OpenAIStub()
+        await stub.start()
+        monkeypatch.setattr(ai.settings, "OPENAI_API_BASE_URL", f"{stub.url}/v1")
+        service = ai.AIService()
+        stream = service.stream_response("串流問題")
+        try:
+            first = await stream.__anext__()
+            # 呼叫端尚未讀完串流（例如等待 Telegram 編輯訊息）時，其他模型呼叫仍可取得名額
+            reply = await asyncio.wait_for(service._complete("另一則問題"), 5)
+            rest = [chunk async for chunk in stream]
+        finally:
+            await stream.aclose()
+            await service.close()
+            await stub.stop()
+        return first + "".join(rest), reply
+
+    streamed, reply = asyncio.run(scenario())
+    assert streamed == OpenAIStub.reply
+    assert reply == OpenAIStub.reply
+
+
+def test_cached_response_counts_hits_and_misses():
+    service = ai.AIService()
+    assert service.cached_response("你好") is not None
+    assert service.cached_response("沒有快取的問題") is None
+    service.response_cache.set(ai.normalize_message("快取的問題"), "回覆")
+    assert service.cached_response("快取的問題？") == "回覆"
+
+    stats = service.stats()
+    assert stats["cache"]["hits"] == 1
+    assert stats["cache"]["misses"] == 1
+    assert stats["paths"]["template"]["count"] == 1
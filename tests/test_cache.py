@@ -0,0 +1,93 @@
+import asyncio
+from app.utils.cache import TTLCache
+
+
+def test_get_or_fetch_coalesces_concurrent_calls():
+    async def scenario():
+        cache = TTLCache(ttl=30)
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "value"
+
+        results = await asyncio.gather(*(cache.get_or_fetch("key", fetch) for _ in range(5)))
+        return results, calls, cache.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 4
+
+
+def test_cancelled_owner_does_not_cancel_waiters():
+    async def scenario():
+        cache = TTLCache(ttl=30)
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "value"
+
+        owner = asyncio.create_task(cache.get_or_fetch("key", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_fetch("key", fetch))
+        await asyncio.sleep(0)
+        owner.cancel()
+        result = await waiter
+        return owner, result, cache.get("key")
+
+    owner, result, cached = asyncio.run(scenario())
+    assert owner.cancelled()
+    assert result == "value"
+    assert cached == "value"
+
+
+def test_fetch_error_is_shared_and_not_cached():
+    async def scenario():
+        cache = TTLCache(ttl=30)
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        results = await asyncio.gather(
+            cache.get_or_fetch("key", fetch), cache.get_or_fetch("key", fetch), return_exceptions=True
+        )
+        return results, cache.get("key")
+
+    results, cached = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert cached is None
+
+
+def test_should_cache_and_expiry():
+    async def scenario():
+        cache = TTLCache(ttl=0.05)
+
+        async def fetch():
+            return {"error": "x"}
+
+        await cache.get_or_fetch("error", fetch, should_cache=lambda value: "error" not in value)
+        cache.set("key", "value")
+        fresh = cache.get("key")
+        await asyncio.sleep(0.06)
+        return cache.get("error"), fresh, cache.get("key")
+
+    error, fresh, expired = asyncio.run(scenario())
+    assert error is None
+    assert fresh == "value"
+    assert expired is None
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,74 @@
+import asyncio
+from app.services import dedup
+from app.services.dedup import UpdateDeduplicator
+from app.services.shared_state import SharedState
+
+
+def test_seen_persists_and_reloads(tmp_path):
+    db_path = str(tmp_path / "dedup.db")
+
+    async def scenario():
+        first = UpdateDeduplicator(capacity=10, db_path=db_path)
+        first.start()
+        results = [await first.seen(1), await first.seen(2), await first.seen(1)]
+        await first.commit(1)
+        await first.commit(2)
+        first.close()
+
+        restarted = UpdateDeduplicator(capacity=10, db_path=db_path)
+        restarted.start()
+        results += [await restarted.seen(2), await restarted.seen(3)]
+        restarted.close()
+        return results
+
+    assert asyncio.run(scenario()) == [False, False, True, True, False]
+
+
+def test_concurrent_redelivery_is_claimed_once(tmp_path, monkeypatch):
+    state = SharedState(str(tmp_path / "shared.db"), prune_interval=300)
+    monkeypatch.setattr(dedup, "shared_state", state)
+
+    async def scenario():
+        workers = [UpdateDeduplicator(capacity=10) for _ in range(2)]
+        results = await asyncio.gather(*(worker.seen(7) for worker in workers for _ in range(3)))
+        await state.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert results.count(False) == 1
+
+
+def test_uncommitted_update_is_not_persisted(tmp_path):
+    db_path = str(tmp_path / "dedup.db")
+
+    async def scenario():
+        first = UpdateDeduplicator(capacity=10, db_path=db_path)
+        first.start()
+        results = [await first.seen(1), await first.seen(1)]
+        first.close()
+
+        # 行程在排入工作前中止，重啟後重送的更新仍會處理
+        restarted = UpdateDeduplicator(capacity=10, db_path=db_path)
+        restarted.start()
+        results.append(await restarted.seen(1))
+        restarted.close()
+        return results
+
+    assert asyncio.run(scenario()) == [False, True, False]
+
+
+def test_forget_releases_local_and_shared_claims(tmp_path, monkeypatch):
+    state = SharedState(str(tmp_path / "shared.db"), prune_interval=300)
+    monkeypatch.setattr(dedup, "shared_state", state)
+
+    async def scenario():
+        first, second = UpdateDeduplicator(capacity=10), UpdateDeduplicator(capacity=10)
+        results = [await first.seen(5)]
+        await first.forget(5)
+        results += [await second.seen(5), await first.seen(5)]
+        await state.close()
+        return results, first.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [False, False, True]
+    assert stats["size"] == 1
@@ -0,0 +1,90 @@
+import asyncio
+import base64
+import io
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.services.telegram import TelegramBot
+from app.utils import image
+from app.utils.image import encode_image, select_photo_size
+
+PHOTOS = [
+    {"file_id": "small", "width": 90, "height": 60, "file_size": 1_000},
+    {"file_id": "medium", "width": 320, "height": 240, "file_size": 20_000},
+    {"file_id": "large", "width": 1280, "height": 960, "file_size": 200_000}
+]
+
+
+def test_select_photo_size():
+    assert select_photo_size(PHOTOS, 300, 1_000_000)["file_id"] == "medium"
+    # 沒有夠大的尺寸時取最大的
+    assert select_photo_size(PHOTOS, 2000, 1_000_000)["file_id"] == "large"
+    # 超過大小上限的尺寸不列入
+    assert select_photo_size(PHOTOS, 2000, 50_000)["file_id"] == "medium"
+    assert select_photo_size(PHOTOS, 300, 500) is None
+    assert select_photo_size([{"file_id": "unknown", "width": 10, "height": 10}], 300, 500)["file_id"] == "unknown"
+
+
+def jpeg(width, height):
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (40, 120, 200)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_encode_image_downscales_large_images():
+    Image = pytest.importorskip("PIL.Image")
+    encoded = encode_image(jpeg(1280, 960), 512)
+    with Image.open(io.BytesIO(base64.b64decode(encoded))) as result:
+        assert result.size == (512, 384)
+
+    small = jpeg(100, 80)
+    assert base64.b64decode(encode_image(small, 512)) == small
+
+
+def test_encode_image_sends_original_without_pillow_or_on_bad_data(monkeypatch):
+    assert base64.b64decode(encode_image(b"not an image", 512)) == b"not an image"
+    monkeypatch.setattr(image, "_load_pil", lambda: None)
+    assert base64.b64decode(encode_image(b"\x89PNG data", 512)) == b"\x89PNG data"
+
+
+def download(path, max_bytes):
+    async def handler(request):
+        if request.match_info["name"] == "sized":
+            return web.Response(body=b"x" * 300)
+        # 不帶 Content-Length 的串流回應
+        response = web.StreamResponse()
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for _ in range(3):
+            await response.write(b"y" * 100)
+        await response.write_eof()
+        return response
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/files/{name}", handler)
+        server = TestServer(app)
+        await server.start_server()
+        bot = TelegramBot()
+        bot.file_base = str(server.make_url("/files"))
+        try:
+            return await bot.download_file(path, max_bytes=max_bytes)
+        finally:
+            await bot.close()
+            await server.close()
+
+    return asyncio.run(scenario())
+
+
+def test_download_within_limit_returns_buffer():
+    data = download("sized", 1000)
+    assert isinstance(data, bytearray)
+    assert len(data) == 300
+    assert len(download("chunked", 1000)) == 300
+
+
+@pytest.mark.parametrize("path", ["sized", "chunked"])
+def test_download_over_limit_is_aborted(path):
+    with pytest.raises(ValueError):
+        download(path, 200)
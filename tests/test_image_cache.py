@@ -0,0 +1,23 @@
+import asyncio
+from app.services.image_cache import ImageAnalysisCache
+
+
+def test_lookup_by_id_then_hash_counts_once(tmp_path):
+    async def scenario():
+        cache = ImageAnalysisCache(str(tmp_path / "images.db"), max_bytes=1024 * 1024)
+        # 未快取的圖片：先以 file_unique_id 查詢，下載後再以內容雜湊查詢
+        assert await cache.get("file-1", count_miss=False) is None
+        assert await cache.get("hash-1") is None
+        await cache.set("analysis", "file-1", "hash-1")
+        # 以內容雜湊命中的轉發圖片
+        assert await cache.get("file-2", count_miss=False) is None
+        assert await cache.get("hash-1") == "analysis"
+        # 以 file_unique_id 直接命中
+        assert await cache.get("file-1", count_miss=False) == "analysis"
+        stats = cache.stats()
+        cache.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
@@ -0,0 +1,81 @@
+import io
+import json
+import logging
+import queue
+import sys
+import time
+from app.core.logging import (
+    DroppingQueueHandler,
+    ErrorRateLimitFilter,
+    JsonFormatter,
+    start_queue_logging
+)
+
+
+def make_record(level=logging.ERROR, lineno=10, msg="failed %s", args=("x",), exc_info=None):
+    return logging.LogRecord("test", level, __file__, lineno, msg, args, exc_info)
+
+
+def test_full_queue_drops_records_without_blocking():
+    log_queue = queue.Queue(maxsize=2)
+    handler = DroppingQueueHandler(log_queue)
+    for index in range(5):
+        handler.handle(make_record(args=(index,)))
+
+    assert handler.dropped == 3
+    queued = [log_queue.get_nowait() for _ in range(2)]
+    # 訊息參數已合併，背景執行緒不需再存取原本的參數
+    assert [(record.msg, record.args) for record in queued] == [("failed 0", None), ("failed 1", None)]
+
+
+def test_exception_info_is_kept_for_the_listener():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record(exc_info=sys.exc_info())
+    log_queue = queue.Queue(maxsize=1)
+    DroppingQueueHandler(log_queue).handle(record)
+    output = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert output["message"] == "failed x"
+    assert "ValueError: boom" in output["exception"]
+
+
+def test_rate_limit_filter_suppresses_repeats_per_call_site():
+    rate_limit = ErrorRateLimitFilter(burst=2, window=0.05)
+    results = [rate_limit.filter(make_record()) for _ in range(4)]
+    assert results == [True, True, False, False]
+    # 其他位置與 INFO 以下的紀錄不受影響
+    assert rate_limit.filter(make_record(lineno=11))
+    assert all(rate_limit.filter(make_record(level=logging.INFO)) for _ in range(5))
+    assert rate_limit.suppressed == 2
+
+    time.sleep(0.06)
+    record = make_record()
+    assert rate_limit.filter(record)
+    assert record.suppressed == 2
+    assert record.getMessage() == "failed x (suppressed 2 similar messages)"
+    assert json.loads(JsonFormatter().format(record))["suppressed"] == 2
+
+
+def test_queue_logging_writes_through_the_listener():
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    root.handlers = []
+    try:
+        listener = start_queue_logging([output], "INFO", 100, ErrorRateLimitFilter(burst=1, window=60))
+        logger = logging.getLogger("test.queue_logging")
+        logger.debug("hidden")
+        logger.info("hello %s", "world")
+        for _ in range(3):
+            logger.error("repeated")
+        listener.stop()
+    finally:
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+
+    assert stream.getvalue().splitlines() == ["INFO hello world", "ERROR repeated"]
@@ -0,0 +1,84 @@
+from decimal import Decimal
+from app.models.transaction import TokenInfo, Transaction
+from app.services.matcher import TransferIndex, to_decimal
+
+WALLET = "TWalletAddress000000000000000000001"
+USDT = "TR7NHqjeKQxGTCi8q8ZY4pPvMSEuxgjLj6t"
+
+
+def transfer(tx_id, quant, to_address=WALLET, token_id=USDT, final_result="SUCCESS", block_ts=1000):
+    return Transaction(
+        block_ts=block_ts,
+        from_address="TSenderAddress00000000000000000001",
+        to_address=to_address,
+        quant=str(quant),
+        confirmed=True,
+        transaction_id=tx_id,
+        tokenInfo=TokenInfo(
+            tokenId=token_id, tokenName="Tether USD", tokenAbbr="USDT", tokenDecimal=6, tokenType="trc20"
+        ),
+        finalResult=final_result
+    )
+
+
+def index(tolerance="2"):
+    return TransferIndex(WALLET, token_id=USDT, tolerance=tolerance, token_decimals=6)
+
+
+def test_to_decimal_avoids_float_error():
+    assert to_decimal(0.1) == Decimal("0.1")
+    assert to_decimal("12.50") == Decimal("12.50")
+
+
+def test_finds_closest_amount_within_tolerance():
+    matches = index().extend([transfer("a", 98_000_000), transfer("b", 101_500_000), transfer("c", 200_000_000)])
+    tx, amount = matches.find("100")
+    assert tx.transaction_id == "b"
+    assert amount == Decimal("101.5")
+
+
+def test_tolerance_bounds_are_inclusive():
+    matches = index().extend([transfer("a", 102_000_000)])
+    assert matches.find("100") is not None
+    assert matches.find("99.999999") is None
+
+
+def test_exact_tolerance_zero():
+    matches = index(tolerance="0").extend([transfer("a", 100_000_001), transfer("b", 100_000_000)])
+    tx, _ = matches.find("100")
+    assert tx.transaction_id == "b"
+
+
+def test_equal_amounts_prefer_latest():
+    matches = index().extend([transfer("old", 100_000_000, block_ts=1), transfer("new", 100_000_000, block_ts=2)])
+    tx, _ = matches.find("100")
+    assert tx.transaction_id == "new"
+
+
+def test_outgoing_transfers_are_ignored():
+    matches = index()
+    assert not matches.add(transfer("out", 100_000_000, to_address="TSomeoneElse000000000000000000001"))
+    assert matches.find("100") is None
+
+
+def test_other_tokens_and_failed_transfers_are_ignored():
+    matches = index().extend([
+        transfer("token", 100_000_000, token_id="TOtherToken0000000000000000000001"),
+        transfer("failed", 100_000_000, final_result="REVERT")
+    ])
+    assert len(matches) == 0
+    assert matches.find("100") is None
+
+
+def test_exclude_skips_claimed_transactions():
+    matches = index().extend([transfer("a", 100_000_000), transfer("b", 100_500_000)])
+    tx, _ = matches.find("100", exclude={"a"})
+    assert tx.transaction_id == "b"
+    assert matches.find("100", exclude={"a", "b"}) is None
+
+
+def test_incremental_add_keeps_order():
+    matches = index()
+    for tx_id, quant in (("c", 300_000_000), ("a", 100_000_000), ("b", 200_000_000)):
+        matches.add(transfer(tx_id, quant))
+    assert [matches.find(amount)[0].transaction_id for amount in ("100", "200", "300")] == ["a", "b", "c"]
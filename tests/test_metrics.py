@@ -0,0 +1,58 @@
+from app.utils.metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test latency", ("route",), buckets=(0.1, 1.0))
+    assert registry.histogram("test_seconds", "Test latency", ("route",)) is histogram
+    for value in (0.05, 0.5, 5.0):
+        histogram.labels("a").observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP test_seconds Test latency",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="a",le="0.1"} 1',
+        'test_seconds_bucket{route="a",le="1.0"} 2',
+        'test_seconds_bucket{route="a",le="+Inf"} 3',
+        'test_seconds_sum{route="a"} 5.55',
+        'test_seconds_count{route="a"} 3'
+    ]
+
+
+def test_gauges_counters_and_failing_collectors():
+    registry = MetricsRegistry()
+    registry.gauge("test_depth", "Queue depth", ("queue",), lambda: [(("jobs",), 2), (("replies",), 0)])
+
+    def broken():
+        raise RuntimeError("collector failed")
+
+    registry.gauge("test_broken", "Broken", (), broken)
+    registry.gauge("test_total", "Events", (), lambda: [((), 7)], metric_type="counter")
+
+    output = registry.render()
+    assert output.endswith("\n")
+    # 收集失敗的指標不影響其他指標輸出
+    assert output.splitlines() == [
+        "# HELP test_depth Queue depth",
+        "# TYPE test_depth gauge",
+        'test_depth{queue="jobs"} 2',
+        'test_depth{queue="replies"} 0',
+        "# HELP test_total Events",
+        "# TYPE test_total counter",
+        "test_total 7"
+    ]
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.routes import metrics as routes
+
+    app = FastAPI()
+    app.include_router(routes.router)
+    with TestClient(app) as client:
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE wallet_tracker_upstream_request_duration_seconds histogram" in response.text
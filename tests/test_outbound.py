@@ -0,0 +1,124 @@
+import asyncio
+import random
+from app.services.outbound import OutboundScheduler
+
+
+def scheduler(send, max_buffer=100, max_retries=2):
+    return OutboundScheduler(
+        send, global_rate=1000, chat_rate=1000, group_rate=1000, chat_burst=1000,
+        max_buffer=max_buffer, max_retries=max_retries
+    )
+
+
+def test_messages_in_a_chat_are_sent_in_order():
+    sent = []
+    rng = random.Random(0)
+
+    async def send(method, data):
+        await asyncio.sleep(rng.uniform(0, 0.01))
+        sent.append((data["chat_id"], data["text"]))
+        return {"ok": True}
+
+    async def scenario():
+        outbound = scheduler(send)
+        results = await asyncio.gather(*(
+            outbound.submit(chat_id, "sendMessage", {"chat_id": chat_id, "text": index})
+            for index in range(10) for chat_id in (1, 2)
+        ))
+        return results, outbound.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert all(result["ok"] for result in results)
+    for chat_id in (1, 2):
+        assert [text for chat, text in sent if chat == chat_id] == list(range(10))
+    assert stats["sent"] == 20
+    assert stats["pending"] == 0
+
+
+def test_rate_limited_send_is_retried_after_retry_after():
+    calls = []
+
+    async def send(method, data):
+        calls.append(asyncio.get_running_loop().time())
+        if len(calls) == 1:
+            return {"ok": False, "error_code": 429, "retry_after": 0.05}
+        return {"ok": True}
+
+    async def scenario():
+        outbound = scheduler(send)
+        result = await outbound.submit(1, "sendMessage", {"chat_id": 1})
+        return result, outbound.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result["ok"]
+    assert stats["retries"] == 1
+    assert calls[1] - calls[0] >= 0.05
+
+
+def test_retries_are_bounded():
+    async def send(method, data):
+        return {"ok": False, "error_code": 429, "retry_after": 0}
+
+    async def scenario():
+        outbound = scheduler(send, max_retries=2)
+        result = await outbound.submit(1, "sendMessage", {"chat_id": 1})
+        return result, outbound.stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result["error_code"] == 429
+    assert stats["retries"] == 2
+    assert stats["failed"] == 1
+
+
+def test_send_error_resolves_waiter_and_keeps_draining():
+    async def send(method, data):
+        if data["text"] == "bad":
+            raise RuntimeError("database is locked")
+        return {"ok": True}
+
+    async def scenario():
+        outbound = scheduler(send)
+        results = await asyncio.wait_for(asyncio.gather(
+            outbound.submit(1, "sendMessage", {"chat_id": 1, "text": "bad"}),
+            outbound.submit(1, "sendMessage", {"chat_id": 1, "text": "good"})
+        ), 1)
+        return results, outbound.stats()
+
+    (bad, good), stats = asyncio.run(scenario())
+    assert bad == {"ok": False, "error": "database is locked"}
+    assert good["ok"]
+    assert stats["pending"] == 0
+    assert stats["failed"] == 1
+
+
+def test_full_buffer_drops_messages():
+    async def send(method, data):
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def scenario():
+        outbound = scheduler(send, max_buffer=1)
+        return await asyncio.gather(*(outbound.submit(1, "sendMessage", {}) for _ in range(2)))
+
+    first, second = asyncio.run(scenario())
+    assert first["ok"]
+    assert second == {"ok": False, "error": "Outbound buffer full"}
+
+
+def test_stop_resolves_queued_messages():
+    async def send(method, data):
+        await asyncio.sleep(10)
+        return {"ok": True}
+
+    async def scenario():
+        outbound = scheduler(send)
+        waiters = [asyncio.create_task(outbound.submit(1, "sendMessage", {})) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        await outbound.stop()
+        results = await asyncio.wait_for(asyncio.gather(*waiters), 1)
+        return results, outbound.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [{"ok": False, "error": "Outbound scheduler stopped"}] * 3
+    assert stats["pending"] == 0
+    assert stats["active_chats"] == 0
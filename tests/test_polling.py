@@ -0,0 +1,101 @@
+import asyncio
+from app.services import polling
+from app.services.polling import UpdatePoller
+
+
+class FakeBot:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.offsets = []
+
+    async def delete_webhook(self):
+        return {"ok": True}
+
+    async def get_updates(self, offset, limit, timeout):
+        self.offsets.append(offset)
+        if not self.responses:
+            await asyncio.sleep(10)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def update(update_id, chat_id=1):
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}}}
+
+
+def run_poller(monkeypatch, responses, handler):
+    bot = FakeBot(responses)
+    monkeypatch.setattr(polling, "telegram_bot", bot)
+    monkeypatch.setattr(polling, "backoff_delay", lambda *args: 0)
+
+    async def scenario():
+        poller = UpdatePoller()
+        await poller.start(handler)
+        await asyncio.sleep(0.05)
+        await poller.stop()
+        return poller
+
+    return asyncio.run(scenario()), bot
+
+
+def test_updates_are_handled_in_order_and_offset_advances(monkeypatch):
+    handled = []
+
+    async def handler(item):
+        handled.append(item["update_id"])
+
+    poller, bot = run_poller(monkeypatch, [
+        {"ok": True, "result": [update(1), update(2, chat_id=2), update(3)]},
+        {"ok": True, "result": []},
+        {"ok": True, "result": [update(4)]}
+    ], handler)
+
+    assert handled == [1, 2, 3, 4]
+    assert bot.offsets[:4] == [None, 4, 4, 5]
+    assert poller.stats()["batches"] == 2
+    assert poller.stats()["updates"] == 4
+
+
+def test_handler_errors_do_not_stop_the_batch(monkeypatch):
+    handled = []
+
+    async def handler(item):
+        if item["update_id"] == 1:
+            raise RuntimeError("boom")
+        handled.append(item["update_id"])
+
+    poller, bot = run_poller(monkeypatch, [{"ok": True, "result": [update(1), update(2)]}], handler)
+    assert handled == [2]
+    assert poller.offset == 3
+
+
+def test_unexpected_errors_back_off_and_keep_polling(monkeypatch):
+    handled = []
+
+    async def handler(item):
+        handled.append(item["update_id"])
+
+    poller, bot = run_poller(monkeypatch, [
+        RuntimeError("connection reset"),
+        {"ok": True, "result": [{"message": {}}]},
+        {"ok": False, "error": "Bad Gateway"},
+        {"ok": True, "result": [update(7)]}
+    ], handler)
+
+    assert handled == [7]
+    assert poller.errors == 3
+    assert poller.offset == 8
+
+
+def test_long_poll_requests_are_excluded_from_latency():
+    from app.utils.metrics import UPSTREAM_LATENCY, observe_upstream, upstream_health
+    import time
+
+    histogram = UPSTREAM_LATENCY.labels("polling-test", "200")
+    observe_upstream("polling-test", 200, time.perf_counter(), latency=False)
+    assert histogram.count == 0
+    assert "polling-test" in upstream_health.snapshot()
+    observe_upstream("polling-test", 200, time.perf_counter())
+    assert histogram.count == 1
@@ -0,0 +1,113 @@
+import asyncio
+from app.services.queue import JobQueue
+
+
+def test_worker_survives_cancelled_job():
+    async def scenario():
+        queue = JobQueue(workers=1, max_depth=10)
+        await queue.start()
+        done = asyncio.Event()
+
+        async def cancelled_job():
+            raise asyncio.CancelledError()
+
+        async def next_job():
+            done.set()
+
+        queue.submit("test", cancelled_job)
+        queue.submit("test", next_job)
+        await asyncio.wait_for(done.wait(), 1)
+        stats = queue.stats()["types"]["test"]
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["failed"] == 1
+    assert stats["completed"] == 1
+
+
+def test_full_queue_rejects_jobs():
+    async def job():
+        pass
+
+    queue = JobQueue(workers=1, max_depth=2)
+    assert queue.submit("test", job)
+    assert queue.submit("test", job)
+    assert not queue.submit("test", job)
+    stats = queue.stats()
+    assert stats["depth"] == 2
+    assert stats["types"]["test"]["submitted"] == 2
+    assert stats["types"]["test"]["rejected"] == 1
+
+
+def test_type_limit_caps_concurrency():
+    async def scenario():
+        queue = JobQueue(workers=4, max_depth=10, type_limits={"slow": 1})
+        running = []
+        peak = []
+
+        async def slow_job():
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.pop()
+
+        fast_done = asyncio.Event()
+
+        async def fast_job():
+            fast_done.set()
+
+        for _ in range(3):
+            queue.submit("slow", slow_job)
+        queue.submit("fast", fast_job)
+        await queue.start()
+        await asyncio.wait_for(fast_done.wait(), 1)
+        # 慢速工作受限時，其他類型的工作不必等待
+        assert queue.stats()["types"]["slow"]["completed"] == 0
+        await queue.stop(timeout=1)
+        return peak, queue.stats()["types"]["slow"]
+
+    peak, stats = asyncio.run(scenario())
+    assert max(peak) == 1
+    assert stats["completed"] == 3
+
+
+def test_stop_drains_pending_jobs_within_timeout():
+    async def scenario():
+        queue = JobQueue(workers=1, max_depth=10)
+        done = []
+
+        async def job(index):
+            await asyncio.sleep(0.01)
+            done.append(index)
+
+        await queue.start()
+        for index in range(3):
+            queue.submit("test", job, index)
+        await queue.stop(timeout=1)
+        return done, queue.stats()
+
+    done, stats = asyncio.run(scenario())
+    assert done == [0, 1, 2]
+    assert stats["depth"] == 0
+
+
+def test_stop_cancels_running_jobs_after_timeout():
+    async def scenario():
+        queue = JobQueue(workers=1, max_depth=10)
+        started = asyncio.Event()
+
+        async def job():
+            started.set()
+            await asyncio.sleep(10)
+
+        await queue.start()
+        queue.submit("test", job)
+        queue.submit("test", job)
+        await started.wait()
+        await asyncio.wait_for(queue.stop(timeout=0.05), 1)
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["depth"] == 1
+    assert stats["types"]["test"]["running"] == 0
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from app.utils.ratelimit import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, TokenBucket, backoff_delay, parse_retry_after
+)
+
+
+def test_burst_is_served_without_waiting():
+    async def scenario():
+        bucket = TokenBucket(rate=1, capacity=3)
+        started = asyncio.get_running_loop().time()
+        for _ in range(3):
+            await bucket.acquire()
+        return asyncio.get_running_loop().time() - started
+
+    assert asyncio.run(scenario()) < 0.05
+
+
+def test_interactive_requests_jump_ahead_of_background():
+    async def scenario():
+        bucket = TokenBucket(rate=50, capacity=1)
+        await bucket.acquire()
+        order = []
+
+        async def request(name, priority):
+            await bucket.acquire(priority)
+            order.append(name)
+
+        tasks = [asyncio.create_task(request(f"background-{i}", PRIORITY_BACKGROUND)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("interactive", PRIORITY_INTERACTIVE)))
+        await asyncio.gather(*tasks)
+        return order
+
+    order = asyncio.run(scenario())
+    assert order[0] == "interactive"
+    assert order[1:] == ["background-0", "background-1", "background-2"]
+
+
+def test_cancelled_waiter_does_not_consume_a_token():
+    async def scenario():
+        bucket = TokenBucket(rate=20, capacity=1)
+        await bucket.acquire()
+        cancelled = asyncio.create_task(bucket.acquire())
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.wait_for(waiter, 1)
+        return bucket.waiting
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("1.5") == 1.5
+    assert parse_retry_after("-3") == 0.0
+
+
+def test_parse_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    delay = parse_retry_after(format_datetime(retry_at, usegmt=True))
+    assert 25 <= delay <= 30
+    past = datetime.now(timezone.utc) - timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+
+
+def test_parse_retry_after_invalid():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("") is None
+    assert parse_retry_after("soon") is None
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=0.5, cap=2.0) <= 2.0
@@ -0,0 +1,53 @@
+import asyncio
+import sys
+import types
+import pytest
+from app.core.registry import ServiceRegistry
+
+
+class Service:
+    def __init__(self):
+        self.events = []
+
+    def ping(self):
+        return "pong"
+
+
+@pytest.fixture
+def module(monkeypatch):
+    module = types.ModuleType("registry_test_module")
+    module.service = Service()
+    module.other = Service()
+    monkeypatch.setitem(sys.modules, "registry_test_module", module)
+    return module
+
+
+def test_proxy_loads_service_on_first_use(module):
+    registry = ServiceRegistry()
+    registry.register("service", "registry_test_module:service")
+    proxy = registry.proxy("service")
+    assert registry.stats()["loaded"] == []
+    assert proxy.ping() == "pong"
+    assert registry.stats()["loaded"] == ["service"]
+
+
+def test_proxy_rejects_unknown_service():
+    with pytest.raises(KeyError):
+        ServiceRegistry().proxy("missing")
+
+
+def test_startup_and_shutdown_order(module):
+    registry = ServiceRegistry()
+    registry.register(
+        "service", "registry_test_module:service",
+        start=lambda service: service.events.append("start"),
+        stop=lambda service: service.events.append("stop"), eager=True
+    )
+    registry.register("other", "registry_test_module:other", stop=lambda service: service.events.append("stop"))
+
+    asyncio.run(registry.startup())
+    assert registry.stats()["started"] == ["service"]
+    asyncio.run(registry.shutdown())
+    assert module.service.events == ["start", "stop"]
+    # 模組已被匯入的服務即使沒有經由註冊表取用也會關閉
+    assert module.other.events == ["stop"]
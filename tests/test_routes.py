@@ -0,0 +1,123 @@
+import asyncio
+import itertools
+from decimal import Decimal
+import pytest
+from app.api.routes import telegram as routes
+
+WALLET = "TXYZabcdefghijklmnopqrstuvwxyz1234"
+_update_ids = itertools.count(1)
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(
+        routes, "enqueue_job",
+        lambda message, job_type, func, *args: submitted.append((func, args)) or True
+    )
+    return submitted
+
+
+def send(text, update_id=None):
+    update = {
+        "update_id": update_id or next(_update_ids),
+        "message": {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "test"},
+            "text": text
+        }
+    }
+    asyncio.run(routes.process_update(update))
+
+
+def test_single_query_without_amount_is_rejected(jobs):
+    send(f"查收\n{WALLET}")
+    assert jobs == [(routes.handle_reply, (routes.FORMAT_ERROR_MESSAGE,))]
+
+
+@pytest.mark.parametrize("text", [f"查收\n{WALLET}\n100", f"查收\n{WALLET} 100"])
+def test_single_query_uses_batch_parse(jobs, text):
+    send(text)
+    assert jobs == [(routes.handle_wallet_query, ({"wallet_address": WALLET, "amount": Decimal("100")},))]
+
+
+def test_batch_query(jobs):
+    send(f"查收\n{WALLET} 100\n{WALLET} 200")
+    func, (batch,) = jobs[0]
+    assert func is routes.handle_wallet_batch
+    assert [query["amount"] for query in batch] == [Decimal("100"), Decimal("200")]
+
+
+def test_watch_keyword_outside_first_line_goes_to_ai(jobs):
+    send("請問\n你們有監控功能嗎？")
+    assert jobs == [(routes.handle_ai_message, ())]
+
+
+def test_batch_line_escapes_user_input():
+    query = {"wallet_address": "<b>T&1", "amount": Decimal("1")}
+    line = routes.format_batch_line(1, query, {"error": {"message": "bad <html>"}})
+    assert line == "1. &lt;b&gt;T&amp;1 / 1 USDT\n   ❌ 查詢出錯: bad &lt;html&gt;"
+
+
+def test_watch_reply_escapes_wallet_address(jobs, monkeypatch):
+    class FakeWatchlist:
+        def add(self, chat_id, wallet_address, amount):
+            return None
+
+    monkeypatch.setattr(routes, "wallet_watchlist", FakeWatchlist())
+    send("監控\n<i>T&\n10")
+    func, (reply,) = jobs[0]
+    assert func is routes.handle_reply
+    assert "📥 錢包地址: &lt;i&gt;T&amp;\n" in reply
+
+
+def test_rejected_update_is_processed_again_on_redelivery(monkeypatch):
+    accepted = []
+    results = iter([False, True, True])
+
+    def enqueue_job(message, job_type, func, *args):
+        result = next(results)
+        if result:
+            accepted.append(func)
+        return result
+
+    monkeypatch.setattr(routes, "enqueue_job", enqueue_job)
+    update_id = next(_update_ids)
+    for _ in range(3):
+        send("你好", update_id=update_id)
+    assert accepted == [routes.handle_ai_message]
+
+
+def test_webhook_answers_before_the_ai_reply_runs(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.services.queue import JobQueue
+
+    queue = JobQueue(workers=1, max_depth=10)
+    monkeypatch.setattr(routes, "job_queue", queue)
+    app = FastAPI()
+    app.include_router(routes.router)
+    update = {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "test"},
+            "text": "你好"
+        }
+    }
+
+    with TestClient(app) as client:
+        response = client.post("/telegram", json=update)
+        ignored = client.post("/telegram", json={"update_id": next(_update_ids), "edited_message": {}})
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert ignored.json() == {"ok": True}
+    # AI 回覆只排入佇列，尚未開始執行
+    stats = queue.stats()
+    assert stats["depth"] == 1
+    assert stats["types"][routes.JOB_AI_REPLY]["pending"] == 1
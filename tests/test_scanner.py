@@ -0,0 +1,194 @@
+import asyncio
+import time
+import pytest
+from app.services import scanner as scanner_module
+from app.services.scanner import BlockScanner
+from app.services.tronscan import TronScanAPI
+from benchmarks.stubs import USDT_TOKEN_INFO, BlockFeed, TronScanStub, record_blocks
+
+WALLET = "TScannerTestWallet000000000000000"
+BLOCK_INTERVAL_MS = 1000
+CONFIRM_SECONDS = 0.5
+
+
+@pytest.fixture(autouse=True)
+def scanner_settings(monkeypatch):
+    settings = scanner_module.settings
+    monkeypatch.setattr(settings, "TRONSCAN_INGESTION_MODE", "scanner")
+    monkeypatch.setattr(settings, "TRONSCAN_RATE_LIMIT", 1000)
+    monkeypatch.setattr(settings, "TRONSCAN_RATE_BURST", 1000)
+    monkeypatch.setattr(settings, "SCANNER_INDEX_LAG", 0)
+    monkeypatch.setattr(settings, "SCANNER_CONFIRM_DELAY", 0)
+    monkeypatch.setattr(settings, "SCANNER_INTERVAL", 0.05)
+    return settings
+
+
+def fixture_blocks(index_delay_ms=0):
+    # 五個歷史區塊各有一筆無關轉帳，錢包在其中一個區塊有舊轉帳，付款在重播開始時出塊
+    fixture = record_blocks(
+        [WALLET], history_blocks=5, live_blocks=1, events_per_block=1, block_interval_ms=BLOCK_INTERVAL_MS
+    )
+    for tx in fixture["blocks"][-1]["transfers"]:
+        if tx["to_address"] == WALLET:
+            tx["index_delay_ms"] = index_delay_ms
+    return fixture
+
+
+async def start_stub(started_at, index_delay_ms=0):
+    feed = BlockFeed(fixture_blocks(index_delay_ms), started_at=started_at)
+    # 歷史區塊早已確認，付款在出塊 CONFIRM_SECONDS 後確認
+    feed.confirm_ms = int(CONFIRM_SECONDS * 1000)
+    stub = TronScanStub(feed=feed)
+    stub.profile.latency = stub.profile.jitter = 0
+    await stub.start()
+    return stub
+
+
+def create_scanner(stub, db_path=None):
+    api = TronScanAPI()
+    api.base_url = f"{stub.url}/api"
+    return BlockScanner(api, db_path, USDT_TOKEN_INFO["tokenId"])
+
+
+def test_scan_matches_payments_after_backfill():
+    async def scenario():
+        stub = await start_stub(time.time() + 0.3)
+        scanner = create_scanner(stub)
+        scanner.checkpoint = int(time.time() * 1000) - 10_000
+        try:
+            before = await scanner.load(WALLET)
+            await asyncio.sleep(0.4)
+            await scanner.scan_once()
+            after = await scanner.load(WALLET)
+        finally:
+            await scanner.api.close()
+            await stub.stop()
+        return before, after, scanner.stats()
+
+    before, after, stats = asyncio.run(scenario())
+    assert len(before) == 1
+    assert len(after) == 2
+    assert stats["backfills"] == 1
+    assert stats["matched"] == 1
+
+
+def test_rescan_finds_late_indexed_transfer(scanner_settings, monkeypatch):
+    monkeypatch.setattr(scanner_settings, "SCANNER_RESCAN_DELAY", 0.4)
+
+    async def scenario():
+        # 付款出塊 0.2 秒後才建立索引，晚於 SCANNER_INDEX_LAG
+        started_at = time.time()
+        stub = await start_stub(started_at, index_delay_ms=200)
+        scanner = create_scanner(stub)
+        scanner.checkpoint = scanner.rescan_checkpoint = int(started_at * 1000) - 10_000
+        try:
+            await scanner.load(WALLET)
+            await asyncio.sleep(0.05)
+            await scanner.scan_once()
+            await scanner.rescan_once()
+            missed = await scanner.load(WALLET)
+            await asyncio.sleep(0.5)
+            await scanner.scan_once()
+            await scanner.rescan_once()
+            found = await scanner.load(WALLET)
+        finally:
+            await scanner.api.close()
+            await stub.stop()
+        return missed, found, scanner.stats()
+
+    missed, found, stats = asyncio.run(scenario())
+    assert len(missed) == 1
+    assert len(found) == 2
+    assert stats["matched"] == 1
+    assert stats["rescans"] >= 1
+
+
+def test_recheck_keeps_block_until_confirmed():
+    async def scenario():
+        stub = await start_stub(time.time())
+        scanner = create_scanner(stub)
+        scanner.checkpoint = int(time.time() * 1000) - 10_000
+        try:
+            await scanner.load(WALLET)
+            await scanner.scan_once()
+            # 付款尚未確認：重新查詢後區塊仍需保留
+            await scanner.recheck_unconfirmed()
+            pending = scanner.stats()["unconfirmed_blocks"]
+            await asyncio.sleep(CONFIRM_SECONDS + 0.1)
+            await scanner.recheck_unconfirmed()
+            transfers = await scanner.load(WALLET)
+        finally:
+            await scanner.api.close()
+            await stub.stop()
+        return pending, transfers, scanner.stats()
+
+    pending, transfers, stats = asyncio.run(scenario())
+    assert pending == 1
+    assert stats["unconfirmed_blocks"] == 0
+    assert stats["rechecks"] == 2
+    assert all(tx.confirmed for tx in transfers)
+
+
+def test_old_unconfirmed_blocks_are_reverified_per_wallet(scanner_settings, monkeypatch):
+    monkeypatch.setattr(scanner_module, "CONFIRMATION_WINDOW", 0)
+    monkeypatch.setattr(scanner_settings, "SCANNER_CONFIRM_DELAY", 0.1)
+
+    async def scenario():
+        stub = await start_stub(time.time())
+        scanner = create_scanner(stub)
+        try:
+            await scanner.load(WALLET)
+            await asyncio.sleep(0.15)
+            await scanner.recheck_unconfirmed()
+            first = scanner.stats()
+            # 下一次逐錢包查詢要等 SCANNER_CONFIRM_DELAY
+            await scanner.recheck_unconfirmed()
+            second = scanner.stats()
+            await asyncio.sleep(CONFIRM_SECONDS)
+            await scanner.recheck_unconfirmed()
+            transfers = await scanner.load(WALLET)
+        finally:
+            await scanner.api.close()
+            await stub.stop()
+        return first, second, transfers, scanner.stats(), stub.endpoints
+
+    first, second, transfers, stats, endpoints = asyncio.run(scenario())
+    assert (first["unconfirmed_blocks"], first["reverifies"]) == (1, 1)
+    assert (second["unconfirmed_blocks"], second["reverifies"]) == (1, 1)
+    assert stats["unconfirmed_blocks"] == 0
+    assert stats["reverifies"] == 2
+    assert stats["rechecks"] == 0
+    assert endpoints["token_trc20/transfers"] == 0
+    assert all(tx.confirmed for tx in transfers)
+    # 確認狀態的更新不算新的符合轉帳
+    assert stats["matched"] == 0
+
+
+def test_restart_resumes_from_checkpoint(tmp_path):
+    db_path = str(tmp_path / "scanner.db")
+
+    async def scenario():
+        stub = await start_stub(time.time())
+        first = create_scanner(stub, db_path)
+        await first.start()
+        await first.load(WALLET)
+        await asyncio.sleep(0.2)
+        await first.stop()
+        await first.api.close()
+
+        restarted = create_scanner(stub, db_path)
+        await restarted.start()
+        try:
+            resumed = restarted.stats()
+            transfers = await restarted.load(WALLET)
+        finally:
+            await restarted.stop()
+            await restarted.api.close()
+            await stub.stop()
+        return first.stats(), resumed, transfers, restarted.stats()
+
+    first, resumed, transfers, stats = asyncio.run(scenario())
+    assert resumed["checkpoint"] >= first["checkpoint"]
+    assert resumed["wallets"] == 1
+    assert len(transfers) == 2
+    assert stats["backfills"] == 0
@@ -0,0 +1,59 @@
+import asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.services import tronscan
+from app.services.telegram import TelegramBot
+from app.services.tronscan import TronScanAPI
+
+
+def test_session_is_shared_and_recreated_after_close(monkeypatch):
+    monkeypatch.setattr(tronscan.settings, "TRONSCAN_POOL_SIZE", 7)
+
+    async def scenario():
+        api = TronScanAPI()
+        first = await api._get_session()
+        again = await api._get_session()
+        limit = first.connector.limit
+        await api.close()
+        closed = first.closed
+        reopened = await api._get_session()
+        await api.close()
+        await api.close()
+        return first is again, limit, closed, reopened is not first, api._session
+
+    shared, limit, closed, reopened, session = asyncio.run(scenario())
+    assert shared
+    assert limit == 7
+    assert closed
+    assert reopened
+    assert session is None
+
+
+def test_requests_reuse_pooled_connections():
+    peers = []
+
+    async def handler(request):
+        peers.append(request.transport.get_extra_info("peername"))
+        return web.json_response({"ok": True, "result": []})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", handler)
+        server = TestServer(app)
+        await server.start_server()
+        bot = TelegramBot()
+        bot.api_base = str(server.make_url("")).rstrip("/")
+        await bot.start()
+        try:
+            for _ in range(3):
+                await bot._make_request("getMe", {})
+        finally:
+            await bot.close()
+            await server.close()
+        return bot._session
+
+    session = asyncio.run(scenario())
+    assert len(peers) == 3
+    # keep-alive 連線池讓後續請求沿用同一條連線
+    assert len(set(peers)) == 1
+    assert session is None
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from app.services.shared_state import SharedState
+
+
+def workers(tmp_path, count=2):
+    """以同一個資料庫建立多個 SharedState，模擬多個 worker 行程"""
+    states = [SharedState(str(tmp_path / "shared.db"), prune_interval=300) for _ in range(count)]
+    for index, state in enumerate(states):
+        state.owner = f"worker-{index}"
+    return states
+
+
+def test_update_is_claimed_by_one_worker(tmp_path):
+    first, second = workers(tmp_path)
+
+    async def scenario():
+        results = [await first.claim_update(1), await second.claim_update(1), await first.claim_update(1)]
+        await first.release_update(1)
+        results.append(await second.claim_update(1))
+        await first.close()
+        await second.close()
+        return results
+
+    assert asyncio.run(scenario()) == [True, False, False, True]
+
+
+def test_lease_is_renewed_by_owner_and_taken_over_after_expiry(tmp_path):
+    first, second = workers(tmp_path)
+    assert first._acquire_lease("scanner", ttl=0.1)
+    assert not second._acquire_lease("scanner", ttl=0.1)
+    assert first._acquire_lease("scanner", ttl=0.1)
+    time.sleep(0.15)
+    assert second._acquire_lease("scanner", ttl=0.1)
+    assert not first._acquire_lease("scanner", ttl=0.1)
+    # 非持有者釋放租約不會影響持有者
+    first._release_lease("scanner")
+    assert not first._acquire_lease("scanner", ttl=0.1)
+    asyncio.run(first.close())
+    asyncio.run(second.close())
+
+
+def test_lease_holder_hands_over_on_stop(tmp_path):
+    first, second = workers(tmp_path)
+    events = []
+
+    def callbacks(name):
+        async def acquired():
+            events.append((name, "acquired"))
+
+        async def lost():
+            events.append((name, "lost"))
+
+        return acquired, lost
+
+    async def scenario():
+        first.start_lease("poller", 0.06, *callbacks("first"))
+        await asyncio.sleep(0.01)
+        second.start_lease("poller", 0.06, *callbacks("second"))
+        await asyncio.sleep(0.05)
+        await first.stop_lease("poller")
+        await asyncio.sleep(0.1)
+        stats = second.stats()
+        await first.close()
+        await second.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert events == [
+        ("first", "acquired"), ("first", "lost"), ("second", "acquired"), ("second", "lost")
+    ]
+    assert stats["leases"] == ["poller"]
+
+
+def test_cache_and_rate_buckets_are_shared(tmp_path):
+    first, second = workers(tmp_path)
+
+    async def scenario():
+        await first.cache_set("tronscan", "key", b"value", ttl=60)
+        await first.cache_set("tronscan", "expired", b"old", ttl=-1)
+        cached = [await second.cache_get("tronscan", "key"), await second.cache_get("tronscan", "expired")]
+        waits = [
+            await first.take_token("telegram:global", rate=1, capacity=2),
+            await second.take_token("telegram:global", rate=1, capacity=2),
+            await first.take_token("telegram:global", rate=1, capacity=2)
+        ]
+        stats = second.stats()
+        await first.close()
+        await second.close()
+        return cached, waits, stats
+
+    cached, waits, stats = asyncio.run(scenario())
+    assert cached == [b"value", None]
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.9 < waits[2] <= 1.0
+    assert (stats["cache_hits"], stats["cache_misses"]) == (1, 1)
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from app.models.transaction import Transaction
+from app.services import tronscan
+from app.services.store import TransactionStore
+
+WALLET = "TXYZabcdefghijklmnopqrstuvwxyz1234"
+SENDER = "TSenderabcdefghijklmnopqrstuvwxyz1"
+
+
+def transfer(txid, block_ts, confirmed=True):
+    return Transaction(
+        block_ts=block_ts,
+        from_address=SENDER,
+        to_address=WALLET,
+        quant="1000000",
+        confirmed=confirmed,
+        transaction_id=txid,
+        tokenInfo={
+            "tokenId": "usdt", "tokenName": "Tether USD", "tokenAbbr": "USDT",
+            "tokenDecimal": 6, "tokenType": "trc20"
+        },
+        finalResult="SUCCESS"
+    )
+
+
+def make_store(tmp_path):
+    return TransactionStore(str(tmp_path / "store.db"), retention_hours=96, sync_lag=60)
+
+
+def test_sync_since_keeps_lag_and_pending_transfers(tmp_path):
+    store = make_store(tmp_path)
+    now = int(time.time() * 1000)
+
+    async def scenario():
+        first = await store.sync_since(WALLET)
+        await store.save(WALLET, [transfer("a", now - 10_000)], now)
+        synced = await store.sync_since(WALLET)
+        await store.save(WALLET, [transfer("b", now - 120_000, confirmed=False)], now)
+        pending = await store.sync_since(WALLET)
+        return first, synced, pending
+
+    first, synced, pending = asyncio.run(scenario())
+    store.close()
+    assert first is None
+    assert synced == now - 60_000
+    assert pending == now - 120_000
+
+
+def test_truncated_sync_does_not_advance(tmp_path):
+    store = make_store(tmp_path)
+    now = int(time.time() * 1000)
+
+    async def scenario():
+        await store.save(WALLET, [transfer("a", now - 5_000)], now, complete=False)
+        never_synced = await store.sync_since(WALLET)
+        await store.save(WALLET, [], now - 3_600_000)
+        await store.save(WALLET, [transfer("b", now - 1_000)], now, complete=False)
+        return never_synced, await store.sync_since(WALLET), await store.load(WALLET, 0)
+
+    never_synced, since, stored = asyncio.run(scenario())
+    store.close()
+    assert never_synced is None
+    assert since == now - 3_600_000 - 60_000
+    # 截斷時取得的轉帳仍會寫入
+    assert [tx.transaction_id for tx in stored] == ["b", "a"]
+
+
+def test_saved_transfers_are_updated_in_place(tmp_path):
+    store = make_store(tmp_path)
+    now = int(time.time() * 1000)
+
+    async def scenario():
+        await store.save(WALLET, [transfer("a", now - 1_000, confirmed=False)], now)
+        await store.save(WALLET, [transfer("a", now - 1_000)], now)
+        return await store.load(WALLET, now - 2_000)
+
+    stored = asyncio.run(scenario())
+    store.close()
+    assert len(stored) == 1
+    assert stored[0].confirmed
+
+
+def test_sync_wallet_keeps_high_water_when_pages_run_out(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    monkeypatch.setattr(tronscan, "transaction_store", store)
+    monkeypatch.setattr(tronscan.settings, "TRONSCAN_MAX_PAGES", 1)
+    monkeypatch.setattr(tronscan.settings, "TRONSCAN_PAGE_SIZE", 2)
+    now = int(time.time() * 1000)
+    feeds = [
+        [transfer("a", now - 1_000)],
+        [transfer("c", now - 500), transfer("b", now - 700)]
+    ]
+    seen_since = []
+
+    async def iter_transfers(wallet_address, hours_ago=96, priority=0, since=None):
+        seen_since.append(since)
+        for tx in feeds.pop(0):
+            yield tx
+
+    api = tronscan.TronScanAPI()
+    monkeypatch.setattr(api, "iter_trc20_transfers", iter_transfers)
+
+    async def scenario():
+        await api.sync_wallet(WALLET)
+        complete_since = await store.sync_since(WALLET)
+        await api.sync_wallet(WALLET)
+        return complete_since, await store.sync_since(WALLET)
+
+    complete_since, truncated_since = asyncio.run(scenario())
+    store.close()
+    assert seen_since[0] is None
+    assert truncated_since == complete_since
@@ -0,0 +1,50 @@
+import json
+from app.models.telegram import MessageRecord, parse_update
+
+MESSAGE = {
+    "message_id": 5,
+    "date": 1_700_000_000,
+    "chat": {"id": 42, "type": "private"},
+    "from": {"id": 7, "is_bot": False, "first_name": "test", "username": "tester"},
+    "text": "查收\nTWallet\n10"
+}
+
+
+def test_parse_update_skips_other_update_types_without_decoding():
+    # 不含 "message" 的內容不做 JSON 解碼，即使內容不是合法 JSON 也不會出錯
+    assert parse_update(b'{"update_id": 1, "edited_channel_post": {') is None
+    assert parse_update(b'["message"]') is None
+    body = json.dumps({"update_id": 1, "message": MESSAGE}, ensure_ascii=False).encode()
+    assert parse_update(body) == {"update_id": 1, "message": MESSAGE}
+
+
+def test_nested_message_key_is_not_routed():
+    # callback_query 內含 "message" key，會通過預先過濾，但不是要處理的訊息
+    update = parse_update(json.dumps({"update_id": 2, "callback_query": {"message": MESSAGE}}).encode())
+    assert update is not None
+    assert MessageRecord.from_update(update) is None
+
+
+def test_message_record_keeps_routing_fields():
+    record = MessageRecord.from_update({"update_id": 3, "message": MESSAGE})
+    assert (record.update_id, record.chat_id, record.text, record.photos) == (3, 42, MESSAGE["text"], None)
+
+    photos = [{"file_id": "a", "width": 90, "height": 90}]
+    photo = MessageRecord.from_update({"update_id": 4, "message": {**MESSAGE, "text": None, "photo": photos}})
+    assert photo.photos == photos
+
+
+def test_message_record_skips_unhandled_messages():
+    sticker = {key: value for key, value in MESSAGE.items() if key != "text"}
+    sticker["sticker"] = {"file_id": "s"}
+    assert MessageRecord.from_update({"update_id": 5, "message": sticker}) is None
+    assert MessageRecord.from_update({"update_id": 6, "message": {**MESSAGE, "text": ""}}) is None
+    assert MessageRecord.from_update({"update_id": 7, "message": "oops"}) is None
+
+
+def test_message_record_builds_full_model_on_demand():
+    message = MessageRecord.from_update({"update_id": 8, "message": MESSAGE}).to_model()
+    assert message.message_id == 5
+    assert message.chat.id == 42
+    assert message.from_user.username == "tester"
+    assert message.text == MESSAGE["text"]
@@ -0,0 +1,189 @@
+import asyncio
+import time
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.services import tronscan
+from app.models.transaction import TransactionResponse
+from app.services.tronscan import TronScanAPI
+
+
+def run_api(monkeypatch, responses, scenario=None):
+    """以腳本化的 HTTP 回應啟動測試伺服器，回傳請求結果與伺服器收到的請求數"""
+    monkeypatch.setattr(tronscan.settings, "TRONSCAN_BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(tronscan.settings, "TRONSCAN_BACKOFF_MAX", 0.05)
+    requests = []
+
+    async def handler(request):
+        requests.append(request.query)
+        return responses.pop(0)
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/{endpoint:.*}", handler)
+        server = TestServer(app)
+        await server.start_server()
+        api = TronScanAPI()
+        api.base_url = str(server.make_url("")).rstrip("/")
+        try:
+            started = time.monotonic()
+            result = await api._make_request("token_trc20/transfers", {"limit": 1})
+            return result, time.monotonic() - started
+        finally:
+            await api.close()
+            await server.close()
+
+    result, elapsed = asyncio.run(run())
+    return result, len(requests), elapsed
+
+
+def test_server_errors_are_retried(monkeypatch):
+    result, calls, _ = run_api(monkeypatch, [
+        web.Response(status=503),
+        web.Response(status=502),
+        web.json_response({"total": 0})
+    ])
+    assert result == {"total": 0}
+    assert calls == 3
+
+
+def test_retry_after_is_honoured_and_capped(monkeypatch):
+    result, calls, elapsed = run_api(monkeypatch, [
+        web.Response(status=429, headers={"Retry-After": "30"}),
+        web.json_response({"total": 1})
+    ])
+    assert result == {"total": 1}
+    assert calls == 2
+    # Retry-After 受 TRONSCAN_BACKOFF_MAX 限制
+    assert 0.05 <= elapsed < 1
+
+
+def test_retries_stop_after_max_retries(monkeypatch):
+    monkeypatch.setattr(tronscan.settings, "TRONSCAN_MAX_RETRIES", 1)
+    result, calls, _ = run_api(monkeypatch, [web.Response(status=500), web.Response(status=500)])
+    assert result == {"error": {"message": "API request failed with status 500"}}
+    assert calls == 2
+
+
+def test_client_errors_fail_fast(monkeypatch):
+    result, calls, _ = run_api(monkeypatch, [web.Response(status=404, text="<html>not found</html>")])
+    assert result == {"error": {"message": "API request failed with status 404"}}
+    assert calls == 1
+
+
+def test_non_json_response_fails_fast(monkeypatch):
+    result, calls, _ = run_api(monkeypatch, [
+        web.Response(status=200, text="<html>blocked</html>", content_type="text/html"),
+        web.json_response({"total": 0})
+    ])
+    assert "unexpected response" in result["error"]["message"]
+    assert calls == 1
+
+
+def test_connection_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(tronscan.settings, "TRONSCAN_MAX_RETRIES", 2)
+    monkeypatch.setattr(tronscan.settings, "TRONSCAN_BACKOFF_BASE", 0.001)
+    attempts = []
+    monkeypatch.setattr(tronscan, "backoff_delay", lambda attempt, base, cap: attempts.append(attempt) or 0)
+
+    async def run():
+        api = TronScanAPI()
+        api.base_url = "http://127.0.0.1:1"
+        try:
+            return await api._make_request("token_trc20/transfers", {})
+        finally:
+            await api.close()
+
+    result = asyncio.run(run())
+    assert result["error"]["message"].startswith("API request failed: ")
+    assert attempts == [0, 1]
+
+
+def page_of(start, count, total):
+    transfers = [
+        {
+            "block_ts": 1_000_000 - index, "from_address": "TFrom", "to_address": "TTo",
+            "quant": "1", "confirmed": True, "transaction_id": f"tx{index}", "finalResult": "SUCCESS",
+            "tokenInfo": {
+                "tokenId": "usdt", "tokenName": "Tether USD", "tokenAbbr": "USDT",
+                "tokenDecimal": 6, "tokenType": "trc20"
+            }
+        }
+        for index in range(start, start + count)
+    ]
+    return TransactionResponse(total=total, token_transfers=transfers)
+
+
+def paged_api(monkeypatch, total, available=None, error_at=None):
+    """以假分頁取代上游查詢，記錄每次請求的 start 與事件順序"""
+    available = total if available is None else available
+    api = TronScanAPI()
+    events = []
+
+    async def get_page(wallet_address, limit, start, start_timestamp, end_timestamp, priority, use_cache):
+        events.append(("fetch", start))
+        await asyncio.sleep(0.001)
+        events.append(("done", start))
+        if start == error_at:
+            return TransactionResponse(error={"message": "boom"})
+        count = max(0, min(limit, available - start))
+        return page_of(start, count, total)
+
+    monkeypatch.setattr(api, "_get_page", get_page)
+    return api, events
+
+
+def collect(api, events, stop_after=None, **kwargs):
+    async def scenario():
+        seen = []
+        async for tx in api.iter_trc20_transfers("TWallet", **kwargs):
+            events.append(("yield", tx.transaction_id))
+            seen.append(tx.transaction_id)
+            if stop_after is not None and len(seen) >= stop_after:
+                break
+            # 模擬呼叫端處理每筆交易的時間
+            await asyncio.sleep(0.002)
+        # 讓被取消的預取任務有機會結束
+        await asyncio.sleep(0.01)
+        return seen
+
+    return asyncio.run(scenario())
+
+
+def test_next_page_is_prefetched_before_current_page_is_consumed(monkeypatch):
+    api, events = paged_api(monkeypatch, total=5)
+    seen = collect(api, events, page_size=2)
+    assert seen == [f"tx{index}" for index in range(5)]
+    fetches = [start for kind, start in events if kind == "fetch"]
+    assert fetches == [0, 2, 4]
+    # 呼叫端處理第一頁的同時，第二頁已經取回
+    assert events.index(("done", 2)) < events.index(("yield", "tx2"))
+    assert events.index(("fetch", 2)) < events.index(("yield", "tx1"))
+
+
+def test_pagination_stops_on_short_page_total_and_max_pages(monkeypatch):
+    api, events = paged_api(monkeypatch, total=100, available=3)
+    assert len(collect(api, events, page_size=2)) == 3
+
+    api, events = paged_api(monkeypatch, total=4)
+    assert len(collect(api, events, page_size=2)) == 4
+    assert [start for kind, start in events if kind == "fetch"] == [0, 2]
+
+    api, events = paged_api(monkeypatch, total=100)
+    assert len(collect(api, events, page_size=2, max_pages=3)) == 6
+
+
+def test_early_exit_cancels_prefetch(monkeypatch):
+    api, events = paged_api(monkeypatch, total=100)
+    seen = collect(api, events, stop_after=1, page_size=2)
+    assert seen == ["tx0"]
+    assert ("done", 2) not in events
+
+
+def test_page_error_is_raised(monkeypatch):
+    api, events = paged_api(monkeypatch, total=10, error_at=2)
+    try:
+        collect(api, events, page_size=2)
+    except tronscan.TronScanAPIError as e:
+        assert e.error == {"message": "boom"}
+    else:
+        raise AssertionError("expected TronScanAPIError")
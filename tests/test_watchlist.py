@@ -0,0 +1,185 @@
+import asyncio
+import pytest
+from app.models.transaction import TokenInfo, Transaction
+from app.services import watchlist as watchlist_module
+from app.services.matcher import TransferIndex
+from app.services.tronscan import TronScanAPIError
+from app.services.watchlist import WalletWatchlist
+
+WALLET = "TWatchedWallet0000000000000000001"
+USDT = "TR7NHqjeKQxGTCi8q8ZY4pPvMSEuxgjLj6t"
+
+
+def transfer(tx_id, quant, confirmed=True):
+    return Transaction(
+        block_ts=1000,
+        from_address="TSenderAddress00000000000000000001",
+        to_address=WALLET,
+        quant=str(quant),
+        confirmed=confirmed,
+        transaction_id=tx_id,
+        tokenInfo=TokenInfo(
+            tokenId=USDT, tokenName="Tether USD", tokenAbbr="USDT", tokenDecimal=6, tokenType="trc20"
+        ),
+        finalResult="SUCCESS"
+    )
+
+
+class FakeTronScan:
+    def __init__(self):
+        self.transfers = []
+        self.error = None
+        self.calls = 0
+
+    async def load_transfers(self, wallet_address, priority=None):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return list(self.transfers)
+
+    def transfer_index(self, wallet_address):
+        return TransferIndex(wallet_address, token_id=USDT, tolerance="2")
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.failures = 0
+
+    async def send_message(self, chat_id, text):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("send failed")
+        self.sent.append((chat_id, text))
+        return {"ok": True}
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    tronscan, bot = FakeTronScan(), FakeBot()
+    monkeypatch.setattr(watchlist_module, "tronscan_api", tronscan)
+    monkeypatch.setattr(watchlist_module, "telegram_bot", bot)
+    return tronscan, bot
+
+
+def run_with_watchlist(scenario):
+    async def wrapper():
+        watchlist = WalletWatchlist()
+        try:
+            return await scenario(watchlist)
+        finally:
+            await watchlist.stop()
+
+    return asyncio.run(wrapper())
+
+
+def test_add_and_remove(upstreams, monkeypatch):
+    monkeypatch.setattr(watchlist_module.settings, "WATCH_MAX_PER_CHAT", 2)
+
+    async def scenario(watchlist):
+        results = [
+            watchlist.add(1, WALLET, "100"),
+            watchlist.add(1, WALLET, "100"),
+            watchlist.add(1, WALLET, "200"),
+            watchlist.add(1, "TOtherWallet", "300"),
+            watchlist.add(2, WALLET, "100")
+        ]
+        running = watchlist._task is not None
+        removed = watchlist.remove(1, WALLET)
+        return results, running, removed, watchlist.stats()
+
+    results, running, removed, stats = run_with_watchlist(scenario)
+    assert results[0] is None
+    assert results[1] == "此錢包與金額已在監控中"
+    assert results[2] is None
+    assert results[3] == "每個聊天室最多同時監控 2 筆"
+    assert results[4] is None
+    # 第一次新增監控時才啟動輪詢
+    assert running
+    assert removed == 2
+    assert stats["watches"] == 1
+
+
+def test_confirmed_match_notifies_and_finishes(upstreams):
+    tronscan, bot = upstreams
+    tronscan.transfers = [transfer("tx1", 100_500_000)]
+
+    async def scenario(watchlist):
+        watchlist.add(1, WALLET, "100")
+        await watchlist._poll(WALLET)
+        return watchlist.stats()
+
+    stats = run_with_watchlist(scenario)
+    assert stats["matches"] == 1
+    assert stats["watches"] == 0
+    assert len(bot.sent) == 1 and bot.sent[0][1].startswith("✅")
+
+
+def test_unconfirmed_match_notifies_once_and_keeps_watching(upstreams):
+    tronscan, bot = upstreams
+    tronscan.transfers = [transfer("tx1", 100_000_000, confirmed=False)]
+
+    async def scenario(watchlist):
+        watchlist.add(1, WALLET, "100")
+        await watchlist._poll(WALLET)
+        await watchlist._poll(WALLET)
+        pending = watchlist.stats()
+        tronscan.transfers = [transfer("tx1", 100_000_000)]
+        await watchlist._poll(WALLET)
+        return pending, watchlist.stats()
+
+    pending, stats = run_with_watchlist(scenario)
+    assert pending["watches"] == 1
+    assert stats["watches"] == 0
+    assert [text[:1] for _, text in bot.sent] == ["⏳", "✅"]
+
+
+def test_watch_expires(upstreams, monkeypatch):
+    _, bot = upstreams
+    monkeypatch.setattr(watchlist_module.settings, "WATCH_TTL", 0)
+
+    async def scenario(watchlist):
+        watchlist.add(1, WALLET, "100")
+        await watchlist._poll(WALLET)
+        return watchlist.stats()
+
+    stats = run_with_watchlist(scenario)
+    assert stats["expired"] == 1
+    assert stats["wallets"] == 0
+    assert bot.sent[0][1].startswith("⌛")
+
+
+def test_upstream_error_keeps_watch(upstreams):
+    tronscan, bot = upstreams
+    tronscan.error = TronScanAPIError({"message": "rate limited"})
+
+    async def scenario(watchlist):
+        watchlist.add(1, WALLET, "100")
+        await watchlist._poll(WALLET)
+        return watchlist.stats()
+
+    stats = run_with_watchlist(scenario)
+    assert stats["watches"] == 1
+    assert bot.sent == []
+
+
+def test_unexpected_poll_error_does_not_stop_scheduler(upstreams, monkeypatch):
+    tronscan, bot = upstreams
+    tronscan.transfers = [transfer("tx1", 100_000_000)]
+    bot.failures = 1
+    monkeypatch.setattr(watchlist_module.settings, "WATCH_MIN_INTERVAL", 0.05)
+
+    async def scenario(watchlist):
+        watchlist.add(1, WALLET, "100")
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if bot.sent:
+                break
+        return watchlist._task.done(), watchlist.stats()
+
+    stopped, stats = run_with_watchlist(scenario)
+    assert not stopped
+    # 第一次通知失敗後重新排程，第二次輪詢完成監控
+    assert stats["polls"] == 2
+    assert stats["watches"] == 0
+    assert len(bot.sent) == 1